@@ -0,0 +1,12 @@
+# coding: utf-8
+"""
+Benchmarks of Resource Keeper. Run all of them with
+
+::
+
+    python -m benchmarks --output result.json
+    python -m benchmarks --baseline result.json
+
+See ``python -m benchmarks --help`` for the options.
+
+"""
@@ -0,0 +1,72 @@
+# coding: utf-8
+import argparse
+import json
+import platform
+import sys
+import time
+
+from benchmarks import suite
+
+
+def int_list(text):
+    return [int(float(i)) for i in text.split(",") if i]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+        description="Benchmark Resource Keeper.")
+    parser.add_argument("--sizes", type=int_list, default=[100, 10000],
+        help="comma separated pool sizes, e.g. 1e2,1e4,1e6 "
+             "(default: 100,10000)")
+    parser.add_argument("--ops", type=int, default=10000,
+        help="get/release pairs per measurement (default: %(default)s)")
+    parser.add_argument("--threads", type=int_list, default=[1, 4, 16],
+        help="comma separated thread counts (default: 1,4,16)")
+    parser.add_argument("--only", type=lambda s: s.split(","),
+        help="comma separated cases: get_release, load, contention, "
+             "memory")
+    parser.add_argument("--output", help="write the results as json here")
+    parser.add_argument("--baseline", 
+        help="json results of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.1,
+        help="relative change counted as a regression "
+             "(default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    results = suite.run(args.sizes, args.ops, args.threads, args.only)
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "sizes": args.sizes,
+            "ops": args.ops,
+            "threads": args.threads,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    else:
+        json.dump(report, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write("\n")
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    regressions = 0
+    for name, base, value, change, regressed in suite.compare(
+            results, baseline, args.threshold):
+        regressions += regressed
+        sys.stderr.write("{0:<60} {1:>14.3f} {2:>14.3f} {3:>+8.1%}{4}\n"
+            .format(name, base, value, change, 
+                    "  REGRESSION" if regressed else ""))
+    sys.stderr.write("{0} regression(s)\n".format(regressions))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+# coding: utf-8
+"""
+This module contains the benchmark cases. Each case returns a dict of
+metrics, ``{name: {"value": float, "unit": str, "better": "higher" or
+"lower"}}``, so results from different runs can be compared by name.
+
+"""
+
+import csv
+import gc
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from reskeeper import availsets, poolmaps
+from reskeeper.core import ResourceKeeper, ThreadSafeResourceKeeper
+from reskeeper.sharded import ShardedResourceKeeper
+
+# avail sets scanning the whole container, too slow for large pools
+LINEAR_AVAIL_SETS = ("ArrayStack", "ArrayQueue", "LinkedQueue")
+LINEAR_MAX_SIZE = 10000
+
+AVAIL_SETS = {
+    "ArrayStack": availsets.ArrayStack,
+    "ArrayQueue": availsets.ArrayQueue,
+    "LinkedQueue": availsets.LinkedQueue,
+    "HashQueue": availsets.HashQueue,
+    "HashStack": availsets.HashStack,
+    "OrderedSet": availsets.OrderedSet,
+    "IntRingQueue": availsets.IntRingQueue,
+    "PriorityHeap": availsets.PriorityHeap,
+}
+
+POOL_MAPS = {
+    "DictMap": lambda tmpdir: poolmaps.DictMap(),
+    "SimpleSqliteMap": lambda tmpdir: poolmaps.SimpleSqliteMap(
+        os.path.join(tmpdir, "simple.db")),
+    "SqliteMap": lambda tmpdir: poolmaps.SqliteMap(
+        os.path.join(tmpdir, "pool.db")),
+    "CachedSqliteMap": lambda tmpdir: poolmaps.CachedPoolMap(
+        poolmaps.SqliteMap(os.path.join(tmpdir, "cached.db")),
+        max_items=100000),
+}
+
+# sqlite maps commit on every write, keep their pools small
+SQLITE_MAX_SIZE = 100000
+
+
+def metric(value, unit, better):
+    return {"value": value, "unit": unit, "better": better}
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    pos = min(int(q * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[pos]
+
+
+def make_data(n):
+    return ["10.0.{0}.{1}:8080".format(i // 256 % 256, i % 256)
+            for i in range(n)]
+
+
+def bench_get_release(sizes, ops, tmpdir):
+    """
+    get/release throughput and latency percentiles for every pool map
+    and avail set combination
+    """
+    results = {}
+    for map_name, make_map in POOL_MAPS.items():
+        for set_name, make_set in AVAIL_SETS.items():
+            for size in sizes:
+                if set_name in LINEAR_AVAIL_SETS and size > LINEAR_MAX_SIZE:
+                    continue
+                if map_name != "DictMap" and size > SQLITE_MAX_SIZE:
+                    continue
+                workdir = tempfile.mkdtemp(dir=tmpdir)
+                pool_map = make_map(workdir)
+                keeper = ResourceKeeper(pool_map=pool_map, 
+                    avail_set=make_set())
+                keeper.load(make_data(size))
+                latencies = []
+                clock = time.perf_counter
+                gc.disable()
+                try:
+                    start = clock()
+                    for _ in range(ops):
+                        t0 = clock()
+                        keeper.release(keeper.get())
+                        latencies.append(clock() - t0)
+                    elapsed = clock() - start
+                finally:
+                    gc.enable()
+                if hasattr(pool_map, "close"):
+                    pool_map.close()
+                shutil.rmtree(workdir)
+                latencies.sort()
+                key = "{0}/{1}/{2}".format(map_name, set_name, size)
+                results["get_release.throughput/" + key] = metric(
+                    ops / elapsed, "ops/s", "higher")
+                for q in (0.5, 0.9, 0.99):
+                    results["get_release.p{0}/{1}".format(
+                        int(q * 100), key)] = metric(
+                        percentile(latencies, q) * 1e6, "us", "lower")
+    return results
+
+
+def bench_load_files(sizes, tmpdir):
+    """
+    Time to load csv and json files into a keeper with a DictMap
+    """
+    results = {}
+    for size in sizes:
+        rows = [{"host": host, "port": "8080"} for host in make_data(size)]
+        csv_path = os.path.join(tmpdir, "load.csv")
+        with open(csv_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerows((r["host"], r["port"]) for r in rows)
+        json_path = os.path.join(tmpdir, "load.json")
+        with open(json_path, "w") as f:
+            json.dump(rows, f)
+        for name, path in (("csv", csv_path), ("json", json_path)):
+            keeper = ResourceKeeper()
+            start = time.perf_counter()
+            if name == "csv":
+                keeper.load_csv_file(path)
+            else:
+                keeper.load_json_file(path)
+            elapsed = time.perf_counter() - start
+            results["load_{0}.seconds/{1}".format(name, size)] = metric(
+                elapsed, "s", "lower")
+    return results
+
+
+def bench_contention(threads_list, ops, size):
+    """
+    get/release throughput of a ThreadSafeResourceKeeper and of a 
+    ShardedResourceKeeper shared by several threads
+    """
+    results = {}
+    keepers = {
+        "throughput": ThreadSafeResourceKeeper,
+        "sharded_throughput": ShardedResourceKeeper,
+    }
+    for (name, make_keeper), n_threads in itertools.product(
+            keepers.items(), threads_list):
+        keeper = make_keeper(make_data(size))
+        per_thread = max(ops // n_threads, 1)
+        barrier = threading.Barrier(n_threads + 1)
+
+        def worker():
+            barrier.wait()
+            for _ in range(per_thread):
+                keeper.release(keeper.get())
+
+        workers = [threading.Thread(target=worker) 
+                   for _ in range(n_threads)]
+        for w in workers:
+            w.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for w in workers:
+            w.join()
+        elapsed = time.perf_counter() - start
+        results["contention.{0}/{1}".format(name, n_threads)] = metric(
+            per_thread * n_threads / elapsed, "ops/s", "higher")
+    return results
+
+
+def bench_memory(sizes):
+    """
+    Memory allocated per resource by a DictMap keeper, for each avail set
+    """
+    results = {}
+    for set_name, make_set in AVAIL_SETS.items():
+        for size in sizes:
+            if set_name in LINEAR_AVAIL_SETS and size > LINEAR_MAX_SIZE:
+                continue
+            data = make_data(size)
+            tracemalloc.start()
+            keeper = ResourceKeeper(data, avail_set=make_set())
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            del keeper
+            results["memory.bytes_per_resource/{0}/{1}".format(
+                set_name, size)] = metric(current / size, "B", "lower")
+    return results
+
+
+def run(sizes, ops, threads_list, only=None):
+    """
+    Run the benchmark cases.
+
+    :param sizes: list of int, pool sizes
+    :param ops: int, get/release pairs per measurement
+    :param threads_list: list of int, thread counts for contention
+    :param only: collection of case names to run, None for all
+    :return: dict of metrics
+    """
+    results = {}
+    tmpdir = tempfile.mkdtemp()
+    try:
+        cases = {
+            "get_release": lambda: bench_get_release(sizes, ops, tmpdir),
+            "load": lambda: bench_load_files(sizes, tmpdir),
+            "contention": lambda: bench_contention(
+                threads_list, ops, min(sizes)),
+            "memory": lambda: bench_memory(sizes),
+        }
+        for name, case in cases.items():
+            if only is None or name in only:
+                results.update(case())
+    finally:
+        shutil.rmtree(tmpdir)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare results with a baseline.
+
+    :param threshold: float, relative change counted as a regression, 
+        e.g. 0.1 for 10%
+    :return: list of (name, baseline value, value, relative change, 
+        regressed) for the metrics present in both
+    """
+    rows = []
+    for name, current in sorted(results.items()):
+        base = baseline.get(name)
+        if base is None or not base["value"]:
+            continue
+        change = (current["value"] - base["value"]) / base["value"]
+        if current["better"] == "higher":
+            regressed = change < -threshold
+        else:
+            regressed = change > threshold
+        rows.append((name, base["value"], current["value"], change, 
+                     regressed))
+    return rows
@@ -1,4 +1,7 @@
-from reskeeper.core import Resource, ResourceKeeper
+from reskeeper.core import Resource, ResourceKeeper, ThreadSafeResourceKeeper
+from reskeeper.aio import AsyncResourceKeeper
+from reskeeper.persistent import PersistentResourceKeeper
+from reskeeper.sharded import ShardedResourceKeeper
 from reskeeper import poolmaps
 from reskeeper import availsets
 
@@ -7,6 +10,10 @@ name = "reskeeper"
 __all__ = [
     "Resource",
     "ResourceKeeper",
+    "ThreadSafeResourceKeeper",
+    "AsyncResourceKeeper",
+    "PersistentResourceKeeper",
+    "ShardedResourceKeeper",
     "poolmaps",
     "availsets",
 ]
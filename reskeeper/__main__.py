@@ -0,0 +1,4 @@
+# coding: utf-8
+from reskeeper.server import main
+
+main()
@@ -0,0 +1,192 @@
+# coding: utf-8
+"""
+This module contains an asyncio flavoured Resource Keeper, which lets
+coroutines wait for a resource without occupying any thread.
+
+"""
+
+import asyncio
+from collections import deque
+
+from reskeeper.core import ResourceKeeper
+
+
+class AsyncResourceKeeper(ResourceKeeper):
+    """
+    Resource manager for coroutines running on one event loop.
+
+    It keeps the plain ``get``, ``release``, ``add`` and ``remove`` of
+    ``ResourceKeeper`` and adds ``acquire``, which suspends the calling
+    coroutine until a resource is released. Like asyncio primitives,
+    an instance is not thread-safe and should only be used from the
+    event loop it runs on.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """
+        Instanciate an asyncio resource manager, accepts the same
+        arguments as ``ResourceKeeper``
+        """
+        self._waiters = deque()
+        # number of coroutines waiting for a matching resource
+        self._picky = 0
+        super().__init__(*args, **kwargs)
+
+    async def acquire(self, timeout=None, ttl=None, where=None):
+        """
+        Get a resource, waiting until one is available.
+
+        :param timeout: float, seconds to wait at most, None to wait forever
+        :param ttl: float, if given, return a ``Lease``, see 
+            ``ResourceKeeper.get``
+        :param where: dict, only return a matching resource, see 
+            ``ResourceKeeper.get``
+        :return: a resource, or None if none became available in time
+        """
+        # do not overtake coroutines already waiting for any resource
+        if where or len(self._waiters) <= self._picky:
+            resource = self._take(ttl, where)
+            if resource is not None:
+                return resource
+        if where:
+            self._picky += 1
+            try:
+                return await self._acquire_wait(timeout, ttl, where)
+            finally:
+                self._picky -= 1
+        return await self._acquire_wait(timeout, ttl, where)
+
+    async def _acquire_wait(self, timeout, ttl, where):
+        loop = asyncio.get_event_loop()
+        start = loop.time()
+        deadline = None if timeout is None else start + timeout
+        while True:
+            wait = None if deadline is None else deadline - loop.time()
+            if wait is not None and wait <= 0:
+                if self.metrics is not None:
+                    self.metrics.observe_wait(loop.time() - start)
+                return self._miss()
+            # also wake up when an expired lease can be taken back
+            event = self._next_event()
+            if event is not None and (wait is None or event < wait):
+                wait = event
+            waiter = loop.create_future()
+            self._waiters.append(waiter)
+            try:
+                if wait is None:
+                    await waiter
+                else:
+                    await asyncio.wait_for(waiter, wait)
+            except asyncio.TimeoutError:
+                pass
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self._wakeup()
+                raise
+            finally:
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            resource = self._take(ttl, where)
+            if resource is not None:
+                if self.metrics is not None:
+                    self.metrics.observe_wait(loop.time() - start)
+                return resource
+
+    def lease(self, timeout=None):
+        """
+        Return an async context manager that acquires a resource on
+        enter and releases it on exit.
+
+        ::
+
+            async with keeper.lease() as res:
+                ...
+
+        :param timeout: float, seconds to wait at most, None to wait forever
+        """
+        return _Lease(self, timeout)
+
+    def release(self, resourse):
+        """
+        Release a resource and wake up one coroutine waiting in ``acquire``.
+
+        :param resource: Resource, the resource to be released
+        """
+        before = self.avail_num, self.cooling_num
+        super().release(resourse)
+        # a resource cooling down changes how long waiters sleep
+        if (self.avail_num, self.cooling_num) != before:
+            self._wakeup()
+
+    def add(self, data):
+        """
+        Add data to the resources pool and wake up one waiting coroutine
+
+        :param resource: obj, the resource to be added
+        """
+        super().add(data)
+        self._wakeup()
+
+    def reap(self, now=None):
+        """
+        Make the resources whose lease has expired available again and 
+        wake up waiting coroutines, see ``ResourceKeeper.reap``
+        """
+        res_ids = super().reap(now)
+        if res_ids:
+            self._wakeup(len(res_ids))
+        return res_ids
+
+    def _promote(self, now=None):
+        res_ids = super()._promote(now)
+        if res_ids:
+            self._wakeup(len(res_ids))
+        return res_ids
+
+    def load(self, resources_data, batch_size=1000):
+        """
+        Load a batch of data into the resources pool and wake up as
+        many waiting coroutines as resources were added
+
+        :param resources_data: should be iterable
+        :param batch_size: int, number of items per ``put_many`` call
+        """
+        before = self.avail_num
+        super().load(resources_data, batch_size)
+        self._wakeup(self.avail_num - before)
+
+    def _wakeup(self, n=1):
+        # a coroutine waiting for a matching resource may not be able to
+        # use a single wakeup, so hand it to every waiter in that case
+        if self._picky:
+            n = len(self._waiters)
+        for waiter in self._waiters:
+            if n <= 0:
+                return
+            if not waiter.done():
+                waiter.set_result(None)
+                n -= 1
+
+
+class _Lease:
+    """
+    Async context manager returned by ``AsyncResourceKeeper.lease``
+    """
+    def __init__(self, keeper, timeout):
+        self.keeper = keeper
+        self.timeout = timeout
+        self.resource = None
+
+    async def __aenter__(self):
+        self.resource = await self.keeper.acquire(self.timeout)
+        if self.resource is None:
+            raise asyncio.TimeoutError("no resource available in time")
+        return self.resource
+
+    async def __aexit__(self, exc_type, exc, tb):
+        resource, self.resource = self.resource, None
+        # the body may have released it already
+        if resource.res_id is not None:
+            self.keeper.release(resource)
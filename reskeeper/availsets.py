@@ -7,6 +7,12 @@ and implements all its abstract methods.
 """
 
 import abc
+import itertools
+import math
+import random
+import time
+from array import array
+from collections import deque, OrderedDict
 
 
 class AvailSetABC:
@@ -37,6 +43,16 @@ class AvailSetABC:
         """
         pass
 
+    def add_many(self, items):
+        """
+        Add a batch of items, in order. Subclasses are suggested to 
+        override it when they can add a batch faster.
+
+        :param items: iterable of items
+        """
+        for item in items:
+            self.add(item)
+
     @abc.abstractmethod
     def pop(self):
         """
@@ -122,10 +138,14 @@ class ArrayQueue(AvailSetABC):
 
 class LinkedQueue(AvailSetABC):
     """
-    A simple queue-like implementation of AvailSetABC, 
-    essentially a linked list.
+    A queue-like implementation of AvailSetABC, essentially a doubly
+    linked list plus a dict from item to its node, so ``contain``,
+    ``add``, ``pop`` and ``delete`` are all O(1). Items are added at
+    the head and popped from the tail.
     """
     class Node:
+        __slots__ = ("next", "prev", "item")
+
         def __init__(self, item):
             self.next = None
             self.prev = None 
@@ -135,54 +155,676 @@ class LinkedQueue(AvailSetABC):
         self.head = None
         self.tail = None
         self.size = 0
+        self.nodes = dict()
 
     def __len__(self):
         return self.size
 
     def contain(self, item):
-        ptr = self.head
-        while ptr:
-            if ptr.item == item:
-                return True
-            ptr = ptr.next
-        return False
+        return item in self.nodes
 
     def add(self, item):
-        if self.contain(item):
+        if item in self.nodes:
             return
-        node = self.Node(item)
-        if self.size == 0:
-            self.head = node
+        node = self.nodes[item] = self.Node(item)
+        if self.head is None:
             self.tail = node
-            self.size += 1
         else:
             self.head.prev = node
             node.next = self.head
-            self.head = node
-            self.size += 1
+        self.head = node
+        self.size += 1
         
     def pop(self):
         if self.size == 0:
             raise IndexError("LinkedQueue is empty")
-        if self.size == 1:
-            item = self.tail.item
-            self.head = None
-            self.tail = None
-            self.size -= 1
-            return item
+        node = self.tail
+        self._unlink(node)
+        return node.item
+
+    def delete(self, item):
+        node = self.nodes.get(item)
+        if node is None:
+            raise KeyError("res_id {0} not found".format(item))
+        self._unlink(node)
+
+    def _unlink(self, node):
+        if node.prev is None:
+            self.head = node.next
         else:
-            item = self.tail.item
-            self.tail.prev.next = None
-            self.tail = self.tail.prev
-            self.size -= 1
+            node.prev.next = node.next
+        if node.next is None:
+            self.tail = node.prev
+        else:
+            node.next.prev = node.prev
+        node.prev = node.next = None
+        del self.nodes[node.item]
+        self.size -= 1
+
+
+class HashQueue(AvailSetABC):
+    """
+    A queue-like implementation of AvailSetABC, inside is a deque
+    for ordering and a python set for membership. ``contain``,
+    ``add``, ``pop`` and ``delete`` are all O(1) (``pop`` amortized).
+
+    Deleted items are not removed from the deque, they are counted
+    as stale and skipped when they reach the front; the deque is
+    compacted once stale items outnumber live ones.
+    """
+    def __init__(self):
+        self.queue = deque()
+        self.members = set()
+        self._stale = dict()
+
+    def __len__(self):
+        return len(self.members)
+
+    def contain(self, item):
+        return item in self.members
+
+    def add(self, item):
+        if item in self.members:
+            return
+        self.members.add(item)
+        self.queue.append(item)
+
+    def add_many(self, items):
+        members = self.members
+        new = [item for item in dict.fromkeys(items) if item not in members]
+        members.update(new)
+        self.queue.extend(new)
+
+    def pop(self):
+        while self.queue:
+            item = self.queue.popleft()
+            stale = self._stale.get(item)
+            if stale:
+                if stale == 1:
+                    del self._stale[item]
+                else:
+                    self._stale[item] = stale - 1
+                continue
+            self.members.discard(item)
+            return item
+        raise IndexError("HashQueue is empty")
+
+    def delete(self, item):
+        try:
+            self.members.remove(item)
+        except KeyError:
+            raise KeyError("res_id {0} not found".format(item))
+        self._stale[item] = self._stale.get(item, 0) + 1
+        if len(self.queue) > 2 * len(self.members) + 16:
+            self._compact()
+
+    def _compact(self):
+        # skip stale items the way pop does, keeping the order of the rest
+        stale = self._stale
+        live = deque()
+        for item in self.queue:
+            count = stale.get(item)
+            if count:
+                stale[item] = count - 1
+            else:
+                live.append(item)
+        self.queue = live
+        self._stale = dict()
+
+
+class HashStack(AvailSetABC):
+    """
+    A stack-like implementation of AvailSetABC, inside is a python
+    list and a dict mapping each item to its index in the list.
+    ``contain``, ``add``, ``pop`` and ``delete`` are all O(1)
+    (``pop`` amortized).
+
+    Deleted items leave a hole in the list which is skipped by
+    ``pop``; the list is compacted once holes outnumber items.
+    """
+    _HOLE = object()
+
+    def __init__(self):
+        self.stack = list()
+        self.index = dict()
+
+    def __len__(self):
+        return len(self.index)
+
+    def contain(self, item):
+        return item in self.index
+
+    def add(self, item):
+        if item in self.index:
+            return
+        self.index[item] = len(self.stack)
+        self.stack.append(item)
+
+    def pop(self):
+        while self.stack:
+            item = self.stack.pop()
+            if item is self._HOLE:
+                continue
+            del self.index[item]
             return item
+        raise IndexError("HashStack is empty")
+
+    def delete(self, item):
+        try:
+            pos = self.index.pop(item)
+        except KeyError:
+            raise KeyError("res_id {0} not found".format(item))
+        self.stack[pos] = self._HOLE
+        if len(self.stack) > 2 * len(self.index) + 16:
+            self._compact()
 
+    def _compact(self):
+        self.stack = [i for i in self.stack if i is not self._HOLE]
+        self.index = {item: pos for pos, item in enumerate(self.stack)}
+
+
+class OrderedSet(AvailSetABC):
+    """
+    A queue-like implementation of AvailSetABC, inside is an
+    insertion-ordered dict. ``contain``, ``add``, ``pop`` and
+    ``delete`` are all O(1).
+    """
+    def __init__(self):
+        self.ordered = OrderedDict()
+
+    def __len__(self):
+        return len(self.ordered)
+
+    def contain(self, item):
+        return item in self.ordered
+
+    def add(self, item):
+        if item in self.ordered:
+            return
+        self.ordered[item] = None
+
+    def pop(self):
+        try:
+            return self.ordered.popitem(last=False)[0]
+        except KeyError:
+            raise IndexError("OrderedSet is empty")
 
     def delete(self, item):
-        ptr = self.head
-        while ptr:
-            if ptr.item == item:
-                ptr.prev.next = ptr.next
+        try:
+            del self.ordered[item]
+        except KeyError:
+            raise KeyError("res_id {0} not found".format(item))
+
+
+class IntRingQueue(AvailSetABC):
+    """
+    A compact queue-like implementation of AvailSetABC for non-negative
+    integer items such as res_ids. Items are kept in a ring buffer of 
+    64-bit integers, membership in a bitmap, so an available item costs
+    about 8 bytes and ``pop`` allocates nothing. ``contain``, ``add``,
+    ``pop`` and ``delete`` are all O(1) (``add`` and ``pop`` amortized).
+
+    A deleted item stays in the ring and is skipped by ``pop``; adding
+    it back before it is skipped keeps its old position in the queue.
+    """
+    def __init__(self, capacity=16):
+        """
+        :param capacity: int, initial size of the ring buffer
+        """
+        self.ring = array("q", bytes(8 * max(capacity, 1)))
+        self.head = 0
+        self.count = 0
+        self.size = 0
+        self._live = bytearray()
+        self._queued = bytearray()
+
+    def __len__(self):
+        return self.size
+
+    @staticmethod
+    def _test(bitmap, item):
+        pos = item >> 3
+        return pos < len(bitmap) and bitmap[pos] & (1 << (item & 7))
+
+    def contain(self, item):
+        return bool(item >= 0 and self._test(self._live, item))
+
+    def add(self, item):
+        if item < 0:
+            raise ValueError("IntRingQueue only holds non-negative ints")
+        if self._test(self._live, item):
+            return
+        pos = item >> 3
+        if pos >= len(self._live):
+            grow = max(pos + 1, 2 * len(self._live)) - len(self._live)
+            self._live.extend(bytes(grow))
+            self._queued.extend(bytes(grow))
+        mask = 1 << (item & 7)
+        self._live[pos] |= mask
+        self.size += 1
+        if self._queued[pos] & mask:
+            return
+        self._queued[pos] |= mask
+        if self.count == len(self.ring):
+            self._grow()
+        self.ring[(self.head + self.count) % len(self.ring)] = item
+        self.count += 1
+
+    def pop(self):
+        ring = self.ring
+        while self.count:
+            item = ring[self.head]
+            self.head = (self.head + 1) % len(ring)
+            self.count -= 1
+            pos, mask = item >> 3, 1 << (item & 7)
+            self._queued[pos] &= ~mask
+            if self._live[pos] & mask:
+                self._live[pos] &= ~mask
                 self.size -= 1
-            ptr = ptr.next
-        raise KeyError("res_id {0} not found".format(item))
\ No newline at end of file
+                return item
+        raise IndexError("IntRingQueue is empty")
+
+    def delete(self, item):
+        if not self.contain(item):
+            raise KeyError("res_id {0} not found".format(item))
+        self._live[item >> 3] &= ~(1 << (item & 7))
+        self.size -= 1
+
+    def _grow(self):
+        cap = len(self.ring)
+        ring = self.ring[self.head:]
+        ring.extend(self.ring[:self.head])
+        ring.frombytes(bytes(8 * cap))
+        self.ring = ring
+        self.head = 0
+
+
+class SqliteAvailSet(AvailSetABC):
+    """
+    A queue-like implementation of AvailSetABC stored in the database of
+    a ``reskeeper.poolmaps.SqliteMap``, so availability survives a 
+    restart. ``pop`` moves the item into a lease table and ``add`` moves
+    it back, each in one transaction, so the database always knows 
+    which items are checked out.
+    """
+    def __init__(self, sqlite_map):
+        """
+        :param sqlite_map: SqliteMap, whose database and connections 
+            are shared
+        """
+        self.map = sqlite_map
+        with self.map.conn as conn:
+            conn.execute("create table if not exists avail("
+                "seq integer primary key autoincrement, "
+                "res_id integer not null unique)")
+            conn.execute("create table if not exists lease("
+                "res_id integer primary key, leased_at real not null)")
+
+    def __len__(self):
+        return self.map.conn.execute(
+            "select count(*) from avail").fetchone()[0]
+
+    def contain(self, item):
+        return self.map.conn.execute("select 1 from avail where res_id=?",
+            (item,)).fetchone() is not None
+
+    def add(self, item):
+        with self.map.conn as conn:
+            conn.execute("begin immediate")
+            conn.execute("delete from lease where res_id=?", (item,))
+            conn.execute(
+                "insert or ignore into avail(res_id) values(?)", (item,))
+
+    def add_many(self, items):
+        items = [(item,) for item in items]
+        with self.map.conn as conn:
+            conn.execute("begin immediate")
+            conn.executemany("delete from lease where res_id=?", items)
+            conn.executemany(
+                "insert or ignore into avail(res_id) values(?)", items)
+
+    def pop(self):
+        with self.map.conn as conn:
+            conn.execute("begin immediate")
+            row = conn.execute("select seq, res_id from avail "
+                "order by seq limit 1").fetchone()
+            if row is None:
+                raise IndexError("SqliteAvailSet is empty")
+            conn.execute("delete from avail where seq=?", (row[0],))
+            conn.execute("insert or replace into lease values(?, ?)",
+                (row[1], time.time()))
+        return row[1]
+
+    def delete(self, item):
+        with self.map.conn as conn:
+            cur = conn.execute("delete from avail where res_id=?", (item,))
+        if cur.rowcount == 0:
+            raise KeyError("res_id {0} not found".format(item))
+
+    def leases(self):
+        """
+        Return the items checked out by ``pop`` and not added back
+
+        :return: dict, mapping item to the unix time it was popped
+        """
+        return dict(self.map.conn.execute("select res_id, leased_at "
+            "from lease order by leased_at"))
+
+
+class PriorityHeap(AvailSetABC):
+    """
+    A priority implementation of AvailSetABC, inside is an indexed 
+    binary heap. ``pop`` returns the item with the lowest priority 
+    value (the highest one if ``reverse``), items with equal priority
+    come out in insertion order. ``contain`` is O(1), ``add``, ``pop``,
+    ``delete`` and ``update_priority`` are O(log n).
+
+    The priority of an item is remembered after it is popped, so an 
+    item added back without a priority, e.g. by ``ResourceKeeper.release``,
+    keeps its last priority.
+    """
+    def __init__(self, default_priority=0, reverse=False):
+        """
+        :param default_priority: priority of items added without one
+        :param reverse: bool, pop the highest priority first
+        """
+        self.default_priority = default_priority
+        self.reverse = reverse
+        self.heap = list()
+        self.index = dict()
+        self.priorities = dict()
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return len(self.heap)
+
+    def _key(self, priority):
+        return -priority if self.reverse else priority
+
+    def contain(self, item):
+        return item in self.index
+
+    def add(self, item, priority=None):
+        """
+        Add an item to the set. If it is in the set already, only update
+        its priority when one is given.
+
+        :param item: item to be added to the set
+        :param priority: priority of the item, by default its last 
+            priority or ``default_priority``
+        """
+        if item in self.index:
+            if priority is not None:
+                self.update_priority(item, priority)
+            return
+        if priority is None:
+            priority = self.priorities.get(item, self.default_priority)
+        self.priorities[item] = priority
+        self.heap.append([self._key(priority), next(self._seq), item])
+        self.index[item] = len(self.heap) - 1
+        self._sift_up(len(self.heap) - 1)
+
+    def pop(self):
+        if not self.heap:
+            raise IndexError("PriorityHeap is empty")
+        return self._remove_at(0)
+
+    def delete(self, item):
+        try:
+            pos = self.index[item]
+        except KeyError:
+            raise KeyError("res_id {0} not found".format(item))
+        self._remove_at(pos)
+
+    def peek(self):
+        """
+        Return the item ``pop`` would return, without removing it.
+        Raise an IndexError if the set is empty.
+        """
+        if not self.heap:
+            raise IndexError("PriorityHeap is empty")
+        return self.heap[0][2]
+
+    def update_priority(self, item, priority):
+        """
+        Change the priority of an item. The priority of an item not in 
+        the set is remembered for when it is added.
+
+        :param item: item whose priority changes
+        :param priority: new priority
+        """
+        self.priorities[item] = priority
+        pos = self.index.get(item)
+        if pos is None:
+            return
+        entry = self.heap[pos]
+        old_key, entry[0] = entry[0], self._key(priority)
+        if entry[0] < old_key:
+            self._sift_up(pos)
+        else:
+            self._sift_down(pos)
+
+    def forget(self, item):
+        """
+        Drop the remembered priority of an item not in the set
+        """
+        if item not in self.index:
+            self.priorities.pop(item, None)
+
+    def _remove_at(self, pos):
+        heap = self.heap
+        item = heap[pos][2]
+        last = heap.pop()
+        del self.index[item]
+        if pos < len(heap):
+            heap[pos] = last
+            self.index[last[2]] = pos
+            self._sift_up(pos)
+            self._sift_down(self.index[last[2]])
+        return item
+
+    def _sift_up(self, pos):
+        heap, index = self.heap, self.index
+        entry = heap[pos]
+        while pos > 0:
+            parent = (pos - 1) >> 1
+            if heap[parent][:2] <= entry[:2]:
+                break
+            heap[pos] = heap[parent]
+            index[heap[pos][2]] = pos
+            pos = parent
+        heap[pos] = entry
+        index[entry[2]] = pos
+
+    def _sift_down(self, pos):
+        heap, index = self.heap, self.index
+        size = len(heap)
+        entry = heap[pos]
+        while True:
+            child = 2 * pos + 1
+            if child >= size:
+                break
+            if child + 1 < size and heap[child + 1][:2] < heap[child][:2]:
+                child += 1
+            if entry[:2] <= heap[child][:2]:
+                break
+            heap[pos] = heap[child]
+            index[heap[pos][2]] = pos
+            pos = child
+        heap[pos] = entry
+        index[entry[2]] = pos
+
+
+class WeightedRandomSet(AvailSetABC):
+    """
+    A weighted random implementation of AvailSetABC. ``pop`` picks an
+    item with probability proportional to its weight, using a Fenwick
+    tree of weights. ``contain`` is O(1), ``add``, ``pop``, ``delete`` 
+    and ``update_priority`` are O(log n) (``add`` amortized).
+
+    Like ``PriorityHeap``, the weight of a popped item is remembered 
+    for when it is added back without one.
+    """
+    def __init__(self, default_weight=1.0, rng=None):
+        """
+        :param default_weight: float, weight of items added without one
+        :param rng: random.Random instance, by default the random module
+        """
+        self.default_weight = default_weight
+        self.rng = rng if rng is not None else random
+        self.items = list()
+        self.weights = list()
+        self.tree = [0.0]
+        self.slots = dict()
+        self.free = list()
+        self.priorities = dict()
+        self.total = 0.0
+
+    def __len__(self):
+        return len(self.slots)
+
+    def contain(self, item):
+        return item in self.slots
+
+    def add(self, item, weight=None):
+        """
+        Add an item to the set. If it is in the set already, only update
+        its weight when one is given.
+
+        :param item: item to be added to the set
+        :param weight: positive float, by default the last weight of the
+            item or ``default_weight``
+        """
+        if item in self.slots:
+            if weight is not None:
+                self.update_priority(item, weight)
+            return
+        if weight is None:
+            weight = self.priorities.get(item, self.default_weight)
+        if weight <= 0:
+            raise ValueError("weight should be positive")
+        self.priorities[item] = weight
+        if not self.free:
+            self._grow()
+        slot = self.free.pop()
+        self.items[slot] = item
+        self.slots[item] = slot
+        self._set_weight(slot, weight)
+
+    def pop(self):
+        if not self.slots:
+            raise IndexError("WeightedRandomSet is empty")
+        slot = self._draw()
+        if slot is None:
+            # rounding errors piled up in the tree, e.g. a total cancelled
+            # down to zero, so sum the weights again
+            self._rebuild()
+            slot = self._draw()
+            if slot is None:
+                slot = self._scan(self.rng.random() * self.total)
+        item = self.items[slot]
+        self._remove_slot(slot)
+        return item
+
+    def delete(self, item):
+        try:
+            slot = self.slots[item]
+        except KeyError:
+            raise KeyError("res_id {0} not found".format(item))
+        self._remove_slot(slot)
+
+    def update_priority(self, item, weight):
+        """
+        Change the weight of an item. The weight of an item not in the 
+        set is remembered for when it is added.
+
+        :param item: item whose weight changes
+        :param weight: positive float, new weight
+        """
+        if weight <= 0:
+            raise ValueError("weight should be positive")
+        self.priorities[item] = weight
+        slot = self.slots.get(item)
+        if slot is not None:
+            self._set_weight(slot, weight)
+
+    def forget(self, item):
+        """
+        Drop the remembered weight of an item not in the set
+        """
+        if item not in self.slots:
+            self.priorities.pop(item, None)
+
+    def _remove_slot(self, slot):
+        del self.slots[self.items[slot]]
+        self.items[slot] = None
+        self._set_weight(slot, 0.0)
+        self.free.append(slot)
+        if not self.slots:
+            # start over from exact zeros so rounding errors do not pile up
+            self.tree = [0.0] * len(self.tree)
+            self.total = 0.0
+
+    def _set_weight(self, slot, weight):
+        delta = weight - self.weights[slot]
+        self.weights[slot] = weight
+        self.total += delta
+        tree = self.tree
+        i = slot + 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def _draw(self, tries=4):
+        # a slot drawn from the tree, None if the draws land on no item
+        if self.total <= 0:
+            return None
+        for _ in range(tries):
+            slot = self._find(self.rng.random() * self.total)
+            # rounding may land beyond the last weighted slot, draw again
+            if slot < len(self.items) and self.items[slot] is not None:
+                return slot
+        return None
+
+    def _scan(self, target):
+        # the slot _find should give, by a linear scan of the weights
+        slot = None
+        for i, weight in enumerate(self.weights):
+            if self.items[i] is None:
+                continue
+            slot = i
+            target -= weight
+            if target < 0:
+                break
+        return slot
+
+    def _find(self, target):
+        # smallest slot whose prefix sum of weights exceeds target
+        tree = self.tree
+        pos = 0
+        step = 1 << (len(tree) - 1).bit_length()
+        while step:
+            nxt = pos + step
+            if nxt < len(tree) and tree[nxt] <= target:
+                pos = nxt
+                target -= tree[nxt]
+            step >>= 1
+        return pos
+
+    def _grow(self):
+        old = len(self.items)
+        new = max(2 * old, 8)
+        self.items.extend([None] * (new - old))
+        self.weights.extend([0.0] * (new - old))
+        self.free.extend(range(new - 1, old - 1, -1))
+        self._rebuild()
+
+    def _rebuild(self):
+        # the tree and total from the weights, in O(n)
+        tree = [0.0] + self.weights
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self.tree = tree
+        self.total = math.fsum(self.weights)
@@ -0,0 +1,291 @@
+# coding: utf-8
+"""
+This module contains the client of ``reskeeper.server``. It offers the
+``get``/``release``/``add``/``remove`` API of ``ResourceKeeper`` for a
+keeper living in another process or host.
+
+"""
+
+import itertools
+import json
+import queue
+import socket
+import threading
+import uuid
+
+from reskeeper.core import Resource
+
+
+class KeeperError(Exception):
+    """
+    Error raised by the server, other than KeyError
+    """
+
+
+class _Connection:
+    """
+    One socket to the server, used by one thread at a time
+    """
+    def __init__(self, host, port, timeout, session):
+        self.sock = socket.create_connection((host, port), timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile("rb")
+        self.ids = itertools.count(1)
+        try:
+            # share held resources with the other connections of the pool
+            _result(self.call_many([("hello", {"session": session})])[0])
+        except Exception:
+            self.close()
+            raise
+
+    def call_many(self, calls):
+        """
+        Send all calls at once, then wait for all responses.
+
+        :param calls: list of (op, args) pairs
+        :return: list of responses in the order of calls
+        """
+        req_ids = []
+        lines = []
+        for op, args in calls:
+            req_id = next(self.ids)
+            req_ids.append(req_id)
+            lines.append(json.dumps(
+                {"id": req_id, "op": op, "args": args}).encode("utf8"))
+        self.sock.sendall(b"\n".join(lines) + b"\n")
+        responses = dict()
+        while len(responses) < len(req_ids):
+            line = self.reader.readline()
+            if not line:
+                raise ConnectionError("connection closed by the server")
+            response = json.loads(line)
+            if response["id"] is None:
+                # a request the server could not read, e.g. too long
+                _result(response)
+            responses[response["id"]] = response
+        return [responses[req_id] for req_id in req_ids]
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+
+def _result(response):
+    if response["ok"]:
+        return response["result"]
+    if response["error"] == "KeyError":
+        raise KeyError(response["message"])
+    raise KeeperError("{0}: {1}".format(
+        response["error"], response["message"]))
+
+
+def _resource(result):
+    if result is None:
+        return None
+    return Resource(result["res_id"], result["data"])
+
+
+class KeeperClient:
+    """
+    Thread-safe client of a keeper server.
+
+    It keeps a pool of up to ``pool_size`` connections, each used by one
+    thread at a time. The connections join one session on the server,
+    so a resource got on one can be released on another. Resources and
+    their data travel as JSON, so data must be JSON serializable.
+    """
+
+    def __init__(self, host="127.0.0.1", port=7890, pool_size=4,
+                 timeout=None):
+        """
+        :param host: str, address of the server
+        :param port: int, port of the server
+        :param pool_size: int, maximum number of connections
+        :param timeout: float, socket timeout in seconds, None for none
+        """
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.Semaphore(pool_size)
+        self._conns = []
+        self._lock = threading.Lock()
+        self._session = uuid.uuid4().hex
+
+    def _call_many(self, calls):
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = _Connection(self.host, self.port, self.timeout,
+                                   self._session)
+                with self._lock:
+                    self._conns.append(conn)
+            try:
+                responses = conn.call_many(calls)
+            except Exception:
+                # the stream may be out of sync, do not reuse it
+                with self._lock:
+                    self._conns.remove(conn)
+                conn.close()
+                raise
+            self._idle.put(conn)
+            return responses
+        finally:
+            self._slots.release()
+
+    def _call(self, op, **args):
+        return _result(self._call_many([(op, args)])[0])
+
+    def get(self, block=True, timeout=None):
+        """
+        Get a resource from the server.
+
+        :param block: bool, wait for a resource if none is available
+        :param timeout: float, seconds to wait at most, None to wait forever
+        :return: a resource, or None if none became available in time
+        """
+        return _resource(self._call("get", block=block, timeout=timeout))
+
+    def get_many(self, n, all_or_nothing=False):
+        """
+        Get a batch of resources, see ``ResourceKeeper.get_many``
+        """
+        return [_resource(r) for r in self._call(
+            "get_many", n=n, all_or_nothing=all_or_nothing)]
+
+    def release(self, resource):
+        """
+        Release a resource.
+
+        :param resource: Resource, the resource to be released
+        """
+        self._call("release", res_id=resource.res_id)
+        resource.destroy()
+
+    def release_many(self, resources):
+        """
+        Release a batch of resources.
+
+        :param resources: iterable of Resource
+        """
+        resources = list(resources)
+        self._call("release_many", res_ids=[r.res_id for r in resources])
+        for resource in resources:
+            resource.destroy()
+
+    def add(self, data):
+        """
+        Add data to the resources pool
+
+        :param data: obj, JSON serializable resource data
+        :return: int, res_id of the added resource
+        """
+        return self._call("add", data=data)
+
+    def remove(self, resource):
+        """
+        Remove the resource from the resources pool
+
+        :param resource: Resource, the resource to be removed
+        """
+        self._call("remove", res_id=resource.res_id)
+
+    def stats(self):
+        """
+        Return the size and avail_num of the keeper
+
+        :return: dict with keys ``size`` and ``avail_num``
+        """
+        return self._call("stats")
+
+    def pipeline(self):
+        """
+        Return a ``Pipeline`` that sends several calls in one round trip
+        """
+        return Pipeline(self)
+
+    def close(self):
+        """
+        Close all connections
+        """
+        with self._lock:
+            for conn in self._conns:
+                conn.close()
+            self._conns = []
+        self._idle = queue.LifoQueue()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class Pipeline:
+    """
+    Queue calls and send them together with ``execute``.
+
+    ::
+
+        pipe = client.pipeline()
+        pipe.release(res1)
+        pipe.get()
+        pipe.add({"host": "127.0.0.1"})
+        _, res2, res_id = pipe.execute()
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+        self.converters = []
+
+    def _queue(self, op, converter=None, **args):
+        self.calls.append((op, args))
+        self.converters.append(converter)
+        return self
+
+    def get(self, block=False, timeout=None):
+        """
+        Queue a ``get``, by default it does not wait
+        """
+        return self._queue("get", _resource, block=block, timeout=timeout)
+
+    def release(self, resource):
+        """
+        Queue a ``release``
+        """
+        resource_id = resource.res_id
+        resource.destroy()
+        return self._queue("release", res_id=resource_id)
+
+    def add(self, data):
+        """
+        Queue an ``add``
+        """
+        return self._queue("add", data=data)
+
+    def remove(self, resource):
+        """
+        Queue a ``remove``
+        """
+        return self._queue("remove", res_id=resource.res_id)
+
+    def execute(self):
+        """
+        Send the queued calls and return their results in order.
+        Raise the error of the first failed call, if any.
+
+        :return: list of results
+        """
+        calls, converters = self.calls, self.converters
+        self.calls, self.converters = [], []
+        if not calls:
+            return []
+        results = []
+        for response, converter in zip(
+                self.client._call_many(calls), converters):
+            result = _result(response)
+            results.append(converter(result) if converter else result)
+        return results
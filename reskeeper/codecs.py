@@ -0,0 +1,190 @@
+# coding: utf-8
+"""
+This module contains the codecs turning resource data into bytes for
+pool maps that store bytes, e.g. ``SqliteMap(codec=...)``, and back.
+
+"""
+
+import abc
+import json
+import marshal
+import pickle
+import struct
+
+
+class Codec:
+    """
+    Base class of codecs. ``encode`` returns bytes, ``decode`` takes a
+    bytes-like object and returns a new object on every call, so the
+    keeper does not need to copy what it decoded.
+    """
+    __metaclass__ = abc.ABCMeta
+    name = None
+
+    @abc.abstractmethod
+    def encode(self, obj):
+        """
+        Return the bytes of an object.
+
+        :param obj: object to be encoded
+        :return: bytes
+        """
+        pass
+
+    @abc.abstractmethod
+    def decode(self, data):
+        """
+        Return a new object decoded from bytes.
+
+        :param data: bytes-like object written by ``encode``
+        :return: object
+        """
+        pass
+
+
+class PickleCodec(Codec):
+    """
+    Pickle codec. With protocol 5, buffers that support out-of-band
+    pickling (``pickle.PickleBuffer``, numpy arrays, ...) are stored
+    after the pickle stream and decoded as views of the stored bytes
+    instead of copies.
+
+    Only decode data written by trusted code, unpickling can run
+    arbitrary code.
+    """
+    name = "pickle"
+    # number of buffers, then the length of the stream and of each buffer
+    _COUNT = struct.Struct("<I")
+    _LENGTH = struct.Struct("<Q")
+
+    def __init__(self, protocol=None):
+        """
+        :param protocol: int, pickle protocol, by default 5 when the
+            python version supports it
+        """
+        if protocol is None:
+            protocol = min(5, pickle.HIGHEST_PROTOCOL)
+        self.protocol = protocol
+
+    def encode(self, obj):
+        buffers = []
+        if self.protocol >= 5:
+            stream = pickle.dumps(obj, self.protocol,
+                                  buffer_callback=buffers.append)
+        else:
+            stream = pickle.dumps(obj, self.protocol)
+        raws = [buf.raw() for buf in buffers]
+        parts = [self._COUNT.pack(len(raws)),
+                 self._LENGTH.pack(len(stream))]
+        parts.extend(self._LENGTH.pack(raw.nbytes) for raw in raws)
+        parts.append(stream)
+        parts.extend(raws)
+        return b"".join(parts)
+
+    def decode(self, data):
+        view = memoryview(data)
+        count, = self._COUNT.unpack_from(view)
+        pos = self._COUNT.size
+        lengths = []
+        for _ in range(count + 1):
+            lengths.append(self._LENGTH.unpack_from(view, pos)[0])
+            pos += self._LENGTH.size
+        stream = view[pos:pos + lengths[0]]
+        pos += lengths[0]
+        buffers = []
+        for length in lengths[1:]:
+            buffers.append(view[pos:pos + length])
+            pos += length
+        if count:
+            return pickle.loads(stream, buffers=buffers)
+        return pickle.loads(stream)
+
+
+class JsonCodec(Codec):
+    """
+    JSON codec, utf-8 encoded; tuples come back as lists
+    """
+    name = "json"
+
+    def encode(self, obj):
+        return json.dumps(obj, separators=(",", ":"),
+                          ensure_ascii=False).encode("utf-8")
+
+    def decode(self, data):
+        return json.loads(bytes(data))
+
+
+class MarshalCodec(Codec):
+    """
+    marshal codec, fast for builtin types, but the format may change
+    between python versions
+    """
+    name = "marshal"
+
+    def encode(self, obj):
+        return marshal.dumps(obj)
+
+    def decode(self, data):
+        return marshal.loads(data)
+
+
+class BytesCodec(Codec):
+    """
+    Codec for data that already is bytes, stored as it is
+    """
+    name = "bytes"
+
+    def encode(self, obj):
+        if not isinstance(obj, (bytes, bytearray, memoryview)):
+            raise TypeError("BytesCodec only encodes bytes-like objects")
+        return bytes(obj)
+
+    def decode(self, data):
+        return bytes(data)
+
+
+CODECS = {
+    "pickle": PickleCodec,
+    "json": JsonCodec,
+    "marshal": MarshalCodec,
+    "bytes": BytesCodec,
+}
+
+
+def get_codec(codec):
+    """
+    Return a codec instance.
+
+    :param codec: Codec instance, or its name: ``pickle``, ``json``,
+        ``marshal`` or ``bytes``
+    """
+    if isinstance(codec, Codec):
+        return codec
+    try:
+        return CODECS[codec]()
+    except KeyError:
+        raise ValueError("unknown codec: {0!r}, expect one of {1}"
+            .format(codec, ", ".join(CODECS)))
+
+
+class Lazy:
+    """
+    Encoded data decoded on first access. A pool map created with
+    ``lazy=True`` returns it, and ``Resource.data`` decodes it when it
+    is first read, so resources whose data is never looked at are never
+    decoded.
+    """
+    __slots__ = ("codec", "raw")
+
+    def __init__(self, codec, raw):
+        self.codec = codec
+        self.raw = raw
+
+    def decode(self):
+        """
+        Return a new object decoded from the raw data
+        """
+        return self.codec.decode(self.raw)
+
+    def __repr__(self):
+        return "<Lazy {0} {1} bytes>".format(self.codec.name, len(self.raw))
@@ -4,23 +4,66 @@ This module contains core functionalities of Resource Keeper.
 
 """
 
-import copy
-import csv
+import functools
+import itertools
 import json
+import threading
+import time
+import weakref
+from array import array
+from collections import deque
+from collections.abc import Mapping
 from pprint import pprint
 
+from reskeeper import codecs
 from reskeeper import poolmaps
+from reskeeper import ratelimit
 from reskeeper import availsets
+from reskeeper import leases
+from reskeeper import loaders
+from reskeeper import snapshots
 from reskeeper import utils
+from reskeeper.metrics import KeeperMetrics, InstrumentedPoolMap
+
+HOOK_EVENTS = ("get", "miss", "release", "add", "remove")
+
+# seconds between checks for garbage collected resources while waiting
+AUTO_RELEASE_POLL = 0.1
+
+# res_ids read from the pool map per get_many call by snapshot
+SNAPSHOT_CHUNK = 10000
+
+
+def _index_values(value):
+    # the values a resource is indexed under for one attribute
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return frozenset(value)
+    if value is None:
+        return frozenset()
+    return frozenset((value,))
 
 
 class Resource:
     """
-    Wrapper for resource data
+    Wrapper for resource data. Data still encoded (``codecs.Lazy``) 
+    is decoded when it is first read.
     """
+    __slots__ = ("res_id", "_data", "__weakref__")
+
     def __init__(self, res_id, data):
         self.res_id = res_id
-        self.data = data
+        self._data = data
+
+    @property
+    def data(self):
+        data = self._data
+        if type(data) is codecs.Lazy:
+            data = self._data = data.decode()
+        return data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
 
     def __str__(self):
         return "<res_id: {0}>".format(self.res_id)
@@ -45,60 +88,464 @@ class Resource:
         }
 
 
+class Lease(Resource):
+    """
+    Resource with a deadline, returned by ``ResourceKeeper.get(ttl=...)``.
+    If it is neither released nor renewed before the deadline, the 
+    keeper takes the resource back, and releasing this lease afterwards
+    does nothing.
+    """
+    __slots__ = ("keeper", "token", "deadline")
+
+    def __init__(self, res_id, data, keeper, token, deadline):
+        super().__init__(res_id, data)
+        self.keeper = keeper
+        self.token = token
+        self.deadline = deadline
+
+    def renew(self, ttl=None):
+        """
+        Push back the deadline of the lease.
+        Raise KeyError if the lease has already expired.
+
+        :param ttl: float, seconds from now, by default the ttl used 
+            when the lease started
+        :return: float, the new deadline on the ``time.monotonic`` clock
+        """
+        return self.keeper.renew(self, ttl)
+
+    def remaining(self):
+        """
+        Return the seconds left before the lease expires
+        """
+        return self.deadline - time.monotonic()
+
+    def destroy(self):
+        """
+        Destroy the resource
+        """
+        super().destroy()
+        self.keeper = None
+
+
+class Checkout:
+    """
+    Context manager and decorator returned by ``ResourceKeeper.acquire``
+    """
+
+    def __init__(self, keeper, get_args, error):
+        self.keeper = keeper
+        self.get_args = get_args
+        self.error = error
+        self.resource = None
+
+    def _get(self):
+        resource = self.keeper.get(*self.get_args)
+        if resource is None:
+            raise self.error("no resource available")
+        return resource
+
+    def __enter__(self):
+        self.resource = self._get()
+        return self.resource
+
+    def _release(self, resource):
+        # the body may have released it already; the keeper ignores
+        # one removed from the pool meanwhile
+        if resource.res_id is not None:
+            self.keeper.release(resource)
+
+    def __exit__(self, exc_type, exc, tb):
+        resource, self.resource = self.resource, None
+        self._release(resource)
+        return False
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # a resource per call, so the decorated function can run in
+            # several threads at once
+            resource = self._get()
+            try:
+                return func(resource, *args, **kwargs)
+            finally:
+                self._release(resource)
+        return wrapper
+
+
 class ResourceKeeper:
     """
     Resource manager that provide book keeping functionality
     """
 
-    def __init__(self, resources=None, pool_map=None, avail_set=None):
+    def __init__(self, resources=None, pool_map=None, avail_set=None,
+                 copy_policy="deep", index_on=(), cooldown=None,
+                 rate_limit=None, metrics=None, auto_release=False):
         """
         Instanciate a resource manager
 
         :param resources: iterable of any resources
         :param pool_map: PoolMap instance, by default a python dict wrapper
-        :param avail_set: AvailSet instance, by default a python list wrapper
+        :param avail_set: AvailSet instance, by default a hash-indexed queue
+        :param copy_policy: str, how ``get`` copies the pooled data:
+            ``deep`` (default) deep copy, ``shallow`` shallow copy,
+            ``none`` hand out the pooled object itself, ``readonly`` 
+            read-only view of the pooled object, ``cow`` copy on the 
+            first write
+        :param index_on: iterable of str, keys of dict resources to keep 
+            secondary indexes on, so ``get(where=...)`` can pick a 
+            matching resource without scanning the pool. A tuple of keys
+            keeps a composite index, for queries on all of them at once
+        :param cooldown: float, seconds a released resource rests before
+            it is handed out again
+        :param rate_limit: (rate, burst) pair, hand out each resource at 
+            most ``rate`` times per second on average and ``burst`` 
+            times at once; a released resource over the limit rests
+        :param metrics: KeeperMetrics instance, or True for a new one, to
+            record counters and timings, see ``reskeeper.metrics``; the 
+            pool map is wrapped to time its calls
+        :param auto_release: bool, take back a resource that is garbage
+            collected without being released; it becomes available on 
+            the next call to the keeper
         """
-        if pool_map:
+        if pool_map is not None:
             self.pool = pool_map
         else:
             self.pool = poolmaps.DictMap()
 
-        if avail_set:
+        if avail_set is not None:
             self.available = avail_set
         else:
-            self.available = availsets.ArrayQueue()
+            self.available = availsets.HashQueue()
 
+        self.copy_policy = copy_policy
+        self._copy = utils.get_copier(copy_policy)
+        if (getattr(self.pool, "fresh_values", False) and 
+                copy_policy in utils.FRESH_SKIPS_COPY):
+            # the pool map decodes a new object on every get
+            self._copy = utils.get_copier("none")
         self.size = 0
         self.avail_num = 0
         self._max_id = 0
+        # res_ids handed out and not yet taken back
+        self._checked_out = set()
+        self._reaper = None
+        # attribute -> value -> available res_ids (a dict as ordered set)
+        self._indexes = {attr: dict() for attr in index_on}
+        # res_id -> attribute -> frozenset of values
+        self._attrs = dict()
+        self._cooldown = None
+        if cooldown or rate_limit:
+            rate, burst = rate_limit if rate_limit else (None, 1)
+            self._cooldown = ratelimit.Cooldown(cooldown, rate, burst)
+        self.metrics = None
+        # event -> list of callbacks
+        self._hooks = dict()
+        # True when there are metrics or hooks to tell about events
+        self._observed = False
+        if metrics is not None and metrics is not False:
+            if metrics is True:
+                metrics = KeeperMetrics()
+            self.metrics = metrics
+            self.pool = InstrumentedPoolMap(self.pool, metrics)
+            self._observed = True
+        self._auto_release = auto_release
+        # res_id -> (token, weakref.finalize) of the resource handed out
+        self._finalizers = dict()
+        # (res_id, token) of resources collected without release, 
+        # appended by the finalizers from whatever thread runs the gc
+        self._dropped = deque()
+        self._tokens = itertools.count()
         if resources:
             self.load(resources)
 
-    def get(self):
+    def acquire(self, ttl=None, where=None):
+        """
+        Return a context manager that gets a resource on enter and 
+        releases it on exit. Raise IndexError on enter if no resource 
+        is available.
+
+        ::
+
+            with keeper.acquire() as res:
+                ...
+
+        It also works as a decorator, passing the resource as the first
+        argument of each call::
+
+            @keeper.acquire()
+            def crawl(res, url):
+                ...
+
+        :param ttl: float, see ``get``
+        :param where: dict, see ``get``
+        """
+        return Checkout(self, (ttl, where), IndexError)
+
+    def get(self, ttl=None, where=None):
         """"
         Get a resource from resource pool.
 
-        :return: a random resource
+        :param ttl: float, if given, return a ``Lease`` that is taken 
+            back automatically unless released or renewed within ttl 
+            seconds
+        :param where: dict, only return a resource whose data has these
+            values, e.g. ``{"region": "EU"}``. Each key must be listed in
+            ``index_on``, alone or in a composite index whose keys are 
+            all queried. A list, tuple or set value in the data matches
+            each of its elements, e.g. ``{"tags": "socks5"}``.
+        :return: a random resource, None if no resource available
         """
+        resource = self._take(ttl, where)
+        if resource is None:
+            return self._miss()
+        return resource
+
+    def _take(self, ttl, where):
+        self._tick()
         if self.avail_num == 0:
             return None
-        res_id = self.available.pop()
-        data = copy.deepcopy(self.pool.get(res_id))
+        if not where:
+            res_id = self.available.pop()
+            if self._indexes:
+                self._unindex(res_id)
+        else:
+            res_id = self._find_where(where)
+            if res_id is None:
+                return None
+            self.available.delete(res_id)
+            self._unindex(res_id)
+        if self._cooldown is not None:
+            self._cooldown.take(res_id, time.monotonic())
+        data = self._copy(self.pool.get(res_id))
         self.avail_num -= 1
-        return Resource(res_id, data)
+        self._checked_out.add(res_id)
+        if self._observed:
+            self._emit("get", res_id)
+        if ttl is not None:
+            resource = self._lease(res_id, data, ttl)
+        else:
+            resource = Resource(res_id, data)
+        if self._auto_release:
+            self._watch(resource)
+        return resource
+
+    def get_many(self, n, all_or_nothing=False, ttl=None):
+        """
+        Get a batch of resources from resource pool, fetching their data
+        with one pool map call.
+
+        :param n: int, number of resources wanted
+        :param all_or_nothing: bool, if True return an empty list unless
+            all n resources are available
+        :param ttl: float, if given, return leases, see ``get``
+        :return: list of at most n resources
+        """
+        self._tick()
+        if all_or_nothing and self.avail_num < n:
+            return []
+        count = min(n, self.avail_num)
+        pop = self.available.pop
+        res_ids = [pop() for _ in range(count)]
+        if self._indexes:
+            for res_id in res_ids:
+                self._unindex(res_id)
+        if self._cooldown is not None:
+            now = time.monotonic()
+            for res_id in res_ids:
+                self._cooldown.take(res_id, now)
+        datas = self.pool.get_many(res_ids)
+        self.avail_num -= count
+        self._checked_out.update(res_ids)
+        if self._observed:
+            for res_id in res_ids:
+                self._emit("get", res_id)
+        copy_data = self._copy
+        if ttl is not None:
+            resources = [self._lease(res_id, copy_data(data), ttl)
+                         for res_id, data in zip(res_ids, datas)]
+        else:
+            resources = [Resource(res_id, copy_data(data))
+                         for res_id, data in zip(res_ids, datas)]
+        if self._auto_release:
+            for resource in resources:
+                self._watch(resource)
+        return resources
+
+    def _watch(self, resource):
+        token = next(self._tokens)
+        finalizer = weakref.finalize(resource, self._dropped.append, 
+                                     (resource.res_id, token))
+        finalizer.atexit = False
+        self._finalizers[resource.res_id] = (token, finalizer)
+
+    def _unwatch(self, res_id, resource=None):
+        # stop watching the resource handed out for res_id, only if it is
+        # the given one when given
+        entry = self._finalizers.get(res_id)
+        if entry is None:
+            return
+        if resource is not None:
+            alive = entry[1].peek()
+            if alive is None or alive[0] is not resource:
+                return
+        del self._finalizers[res_id]
+        entry[1].detach()
+
+    def _collect_dropped(self):
+        # take back the resources garbage collected without release
+        while self._dropped:
+            res_id, token = self._dropped.popleft()
+            entry = self._finalizers.get(res_id)
+            if entry is None or entry[0] != token:
+                continue
+            del self._finalizers[res_id]
+            if self._reaper is not None:
+                self._reaper.forget(res_id)
+            self._checked_out.discard(res_id)
+            if self._observed:
+                self._emit("release", res_id)
+            self._put_back(res_id)
+
+    def _lease(self, res_id, data, ttl):
+        if self._reaper is None:
+            self._reaper = leases.LeaseReaper()
+        token, deadline = self._reaper.track(res_id, ttl, time.monotonic())
+        return Lease(res_id, data, self, token, deadline)
+
+    def renew(self, lease, ttl=None):
+        """
+        Push back the deadline of a lease.
+        Raise KeyError if the lease has already expired.
+
+        :param lease: Lease, returned by ``get`` with a ttl
+        :param ttl: float, seconds from now, by default the ttl used 
+            when the lease started
+        :return: float, the new deadline on the ``time.monotonic`` clock
+        """
+        self._tick()
+        if self._reaper is None or not isinstance(lease, Lease):
+            raise KeyError("res_id {0} is not leased".format(lease.res_id))
+        lease.deadline = self._reaper.renew(
+            lease.res_id, lease.token, ttl, time.monotonic())
+        return lease.deadline
+
+    def reap(self, now=None):
+        """
+        Make the resources whose lease has expired available again.
+        ``get`` calls it, so there is rarely a need to call it directly.
+
+        :param now: float, current ``time.monotonic`` time
+        :return: list of res_ids made available
+        """
+        if self._reaper is None:
+            return []
+        if now is None:
+            now = time.monotonic()
+        res_ids = self._reaper.expired(now)
+        for res_id in res_ids:
+            if self._finalizers:
+                self._unwatch(res_id)
+            self._checked_out.discard(res_id)
+            if self._observed:
+                self._emit("release", res_id)
+            self._put_back(res_id, now)
+        return res_ids
+
+    def _tick(self):
+        # run the time based book keeping that is due
+        if self._dropped:
+            self._collect_dropped()
+        if self._reaper is not None:
+            self.reap()
+        if self._cooldown is not None and self._cooldown.heap:
+            self._promote()
+
+    def _next_event(self):
+        # seconds until _tick has something to do, None if never
+        times = []
+        if self._reaper is not None:
+            times.append(self._reaper.next_deadline())
+        if self._cooldown is not None:
+            times.append(self._cooldown.next_ready())
+        if self._finalizers:
+            # garbage collected resources cannot wake up waiters
+            times.append(time.monotonic() + AUTO_RELEASE_POLL)
+        times = [t for t in times if t is not None]
+        if not times:
+            return None
+        return max(min(times) - time.monotonic(), 0)
+
+    @property
+    def cooling_num(self):
+        """
+        Number of released resources resting before the next use
+        """
+        return len(self._cooldown) if self._cooldown is not None else 0
+
+    def _promote(self, now=None):
+        # make the resources done cooling down available
+        if now is None:
+            now = time.monotonic()
+        res_ids = self._cooldown.ready(now)
+        for res_id in res_ids:
+            if not self.available.contain(res_id):
+                self._make_available(res_id)
+        return res_ids
+
+    def _put_back(self, res_id, now=None):
+        # make a released resource available, or let it cool down first
+        if self.available.contain(res_id):
+            return
+        if self._cooldown is not None:
+            if res_id in self._cooldown:
+                return
+            if now is None:
+                now = time.monotonic()
+            if self._cooldown.schedule(res_id, now):
+                return
+        self._make_available(res_id)
 
     def release(self, resourse):
         """
-        Release a resource.
+        Release a resource. Releasing one already released, or removed
+        from the pool, does nothing.
         Note: after releasing, user lose the resource.
 
         :param resource: Resource, the resource to be released 
         """
-        if not self.available.contain(resourse.res_id):
-            self.available.add(resourse.res_id)
-            self.avail_num += 1
+        res_id = resourse.res_id
+        if res_id not in self._checked_out and (res_id is None or
+                self.available.contain(res_id) or 
+                self.pool.get(res_id) is None):
+            # already released, or removed; the pool is only read for a
+            # res_id this keeper did not hand out, e.g. before a restart
+            resourse.destroy()
+            return
+        if self._reaper is not None:
+            if (isinstance(resourse, Lease) and not 
+                    self._reaper.is_active(resourse.res_id, resourse.token)):
+                # expired and taken back, maybe handed out again already
+                resourse.destroy()
+                return
+            self._reaper.forget(resourse.res_id)
+        self._checked_out.discard(res_id)
+        if self._finalizers:
+            self._unwatch(resourse.res_id, resourse)
+        if self._observed:
+            self._emit("release", resourse.res_id)
+        self._put_back(resourse.res_id)
         resourse.destroy()
 
+    def release_many(self, resources):
+        """
+        Release a batch of resources.
+
+        :param resources: iterable of Resource
+        """
+        for resource in resources:
+            self.release(resource)
+
     def add(self, data):
         """
         Add data to the resources pool
@@ -107,9 +554,12 @@ class ResourceKeeper:
         """
         self._max_id += 1
         self.pool.put(self._max_id, data)
-        self.available.add(self._max_id)
+        if self._indexes:
+            self._register(self._max_id, data)
         self.size += 1
-        self.avail_num += 1
+        self._make_available(self._max_id)
+        if self._observed:
+            self._emit("add", self._max_id)
 
     def remove(self, resource):
         """
@@ -122,32 +572,503 @@ class ResourceKeeper:
             self.size -= 1
         except KeyError:
             raise KeyError("No resource with res_id: " + str(resource.res_id))
+        if self.available.contain(resource.res_id):
+            self.available.delete(resource.res_id)
+            self.avail_num -= 1
+        # avail sets remembering priorities keep them across pops
+        forget = getattr(self.available, "forget", None)
+        if forget is not None:
+            forget(resource.res_id)
+        self._forget_removed(resource.res_id)
+
+    def _forget_removed(self, res_id):
+        # drop the book keeping of a resource deleted from the pool
+        self._checked_out.discard(res_id)
+        if self._reaper is not None:
+            self._reaper.forget(res_id)
+        if self._finalizers:
+            self._unwatch(res_id)
+        if self._indexes:
+            self._unindex(res_id)
+            self._attrs.pop(res_id, None)
+        if self._cooldown is not None:
+            self._cooldown.forget(res_id)
+        if self._observed:
+            self._emit("remove", res_id)
 
-    def load(self, resources_data):
+    def load(self, resources_data, batch_size=1000):
         """
-        Load a batch of data into the resources pool
+        Load a batch of data into the resources pool. Data is written
+        to the pool map with one ``put_many`` call per batch.
 
         :param resources_data: should be iterable
+        :param batch_size: int, number of items per ``put_many`` call
+        """
+        iterator = iter(resources_data)
+        while True:
+            batch = list(itertools.islice(iterator, batch_size))
+            if not batch:
+                break
+            self._add_batch(batch)
+
+    def _add_batch(self, batch):
+        first_id = self._max_id + 1
+        res_ids = range(first_id, first_id + len(batch))
+        self.pool.put_many(zip(res_ids, batch))
+        self.available.add_many(res_ids)
+        if self._indexes:
+            for res_id, data in zip(res_ids, batch):
+                self._register(res_id, data)
+                self._index(res_id)
+        self._max_id += len(batch)
+        self.size += len(batch)
+        self.avail_num += len(batch)
+        if self._observed:
+            for res_id in res_ids:
+                self._emit("add", res_id)
+
+    def add_hook(self, event, callback):
+        """
+        Call ``callback(keeper, event, res_id)`` on every event. Events 
+        are ``get``, ``miss`` (get returned None, res_id is None), 
+        ``release``, ``add`` and ``remove``. Callbacks run inside the 
+        keeper's book keeping, so they should be quick and must not call
+        the keeper.
+
+        :param event: str, one of the events above
+        :param callback: callable
+        """
+        if event not in HOOK_EVENTS:
+            raise ValueError("unknown event {0!r}, expected one of {1}"
+                             .format(event, ", ".join(HOOK_EVENTS)))
+        self._hooks.setdefault(event, []).append(callback)
+        self._observed = True
+
+    def remove_hook(self, event, callback):
         """
-        for data in resources_data:
-            self.add(data)
+        Stop calling a callback added by ``add_hook``.
+        Raise ValueError if it was not added.
+        """
+        callbacks = self._hooks.get(event, [])
+        callbacks.remove(callback)
+        if not callbacks:
+            self._hooks.pop(event, None)
+        self._observed = self.metrics is not None or bool(self._hooks)
+
+    def _miss(self):
+        if self._observed:
+            self._emit("miss", None)
+        return None
+
+    def _emit(self, event, res_id):
+        if self.metrics is not None:
+            self.metrics.on_event(event, res_id)
+        for callback in self._hooks.get(event, ()):
+            callback(self, event, res_id)
+
+    def _make_available(self, res_id):
+        self.available.add(res_id)
+        self.avail_num += 1
+        if self._indexes:
+            self._index(res_id)
+
+    def _register(self, res_id, data):
+        # remember the indexed attribute values of a resource, a tuple
+        # of values for each combination of a composite index
+        attrs = dict()
+        if isinstance(data, Mapping):
+            for attr in self._indexes:
+                if isinstance(attr, tuple):
+                    parts = [_index_values(data.get(key)) for key in attr]
+                    if all(parts):
+                        attrs[attr] = frozenset(itertools.product(*parts))
+                else:
+                    values = _index_values(data.get(attr))
+                    if values:
+                        attrs[attr] = values
+        self._attrs[res_id] = attrs
+
+    def _index(self, res_id):
+        for attr, values in self._attrs.get(res_id, {}).items():
+            index = self._indexes[attr]
+            for value in values:
+                ids = index.get(value)
+                if ids is None:
+                    ids = index[value] = dict()
+                ids[res_id] = None
+
+    def _unindex(self, res_id):
+        for attr, values in self._attrs.get(res_id, {}).items():
+            index = self._indexes[attr]
+            for value in values:
+                ids = index.get(value)
+                if ids is not None:
+                    ids.pop(res_id, None)
+                    if not ids:
+                        del index[value]
+
+    def _find_where(self, where):
+        # every index covered by the query gives the set of available
+        # res_ids matching its part; a composite index covering the
+        # whole query answers it at once, otherwise the smallest set is
+        # scanned for a res_id in all the others
+        lookups = []
+        covered = set()
+        for attr, index in self._indexes.items():
+            keys = attr if isinstance(attr, tuple) else (attr,)
+            if not all(key in where for key in keys):
+                continue
+            value = tuple(where[key] for key in keys) \
+                if isinstance(attr, tuple) else where[attr]
+            lookups.append(index.get(value) or {})
+            covered.update(keys)
+            if len(keys) == len(where):
+                break
+        for attr in where:
+            if attr not in covered:
+                raise KeyError("attribute {0!r} is not indexed".format(attr))
+        lookups.sort(key=len)
+        candidates, others = lookups[0], lookups[1:]
+        for res_id in candidates:
+            if all(res_id in ids for ids in others):
+                return res_id
+        return None
+
+    def snapshot(self, path):
+        """
+        Write the whole keeper, its data, available resources and 
+        leases, to a file that ``restore`` reads back quickly. 
+        Resources cooling down are saved as available. The data must be
+        picklable.
 
-    def load_csv_file(self, file_dir):
+        :param path: str, path of the snapshot file, replaced atomically
         """
-        Load a batch of data from given csv file. 
+        self._tick()
+        data = dict()
+        avail_ids = array("q")
+        contain = self.available.contain
+        cooling = self._cooldown if self._cooldown is not None else ()
+        res_ids = range(1, self._max_id + 1)
+        for start in range(0, len(res_ids), SNAPSHOT_CHUNK):
+            chunk = res_ids[start:start + SNAPSHOT_CHUNK]
+            for res_id, value in zip(chunk, self.pool.get_many(chunk)):
+                if value is None:
+                    continue
+                if type(value) is codecs.Lazy:
+                    value = value.decode()
+                elif isinstance(value, memoryview):
+                    value = value.tobytes()
+                data[res_id] = value
+                if contain(res_id) or res_id in cooling:
+                    avail_ids.append(res_id)
+        lease_ids = array("q")
+        lease_remaining = array("d")
+        if self._reaper is not None:
+            now = time.monotonic()
+            for res_id, (_, _, deadline) in self._reaper.active.items():
+                lease_ids.append(res_id)
+                lease_remaining.append(max(deadline - now, 0.0))
+        snapshots.write(path, snapshots.Snapshot(
+            self._max_id, avail_ids, lease_ids, lease_remaining, data))
+
+    @classmethod
+    def restore(cls, path, reclaim=False, **kwargs):
+        """
+        Create a keeper from a file written by ``snapshot``. The file is
+        read through a memory map and the data is written to the pool
+        map with one ``put_many`` call.
+
+        :param path: str, path of the snapshot file
+        :param reclaim: bool, make the leased resources available at
+            once. By default they come back when their lease runs out.
+            Resources checked out without a lease are always made 
+            available, nobody holding them can release them to the new
+            keeper.
+        :param kwargs: arguments of the keeper, e.g. ``pool_map``
+        :return: a new keeper of this class
+        """
+        snap = snapshots.read(path)
+        keeper = cls(**kwargs)
+        if keeper.size:
+            raise ValueError("restore needs an empty keeper")
+        keeper._restore_snapshot(snap, reclaim)
+        return keeper
+
+    def _restore_snapshot(self, snap, reclaim):
+        data = snap.data
+        self.pool.put_many(data.items())
+        avail_ids = snap.avail_ids.tolist()
+        out = set(avail_ids)
+        if not reclaim and snap.lease_ids:
+            self._reaper = leases.LeaseReaper()
+            now = time.monotonic()
+            for res_id, remaining in zip(snap.lease_ids, 
+                                         snap.lease_remaining):
+                self._reaper.track(res_id, remaining, now)
+            out.update(snap.lease_ids)
+            self._checked_out.update(snap.lease_ids)
+        avail_ids.extend(res_id for res_id in data if res_id not in out)
+        self.available.add_many(avail_ids)
+        self._max_id = max(self._max_id, snap.max_id)
+        self.size = len(data)
+        self.avail_num = len(avail_ids)
+        if self._indexes:
+            for res_id, value in data.items():
+                self._register(res_id, value)
+            for res_id in avail_ids:
+                self._index(res_id)
+
+    def load_csv_file(self, file_dir, header=False, batch_size=1000,
+                      use_mmap=False, **fmtparams):
+        """
+        Load a batch of data from given csv file. The file is read as a
+        stream, rows are added in batches of ``batch_size``.
 
         :param file_dir: str, directory where the csv file located
+        :param header: bool, if True the first row names the columns and
+            each following row is loaded as a dict
+        :param batch_size: int, number of rows per ``put_many`` call
+        :param use_mmap: bool, read the file through a memory map
+        :param fmtparams: formatting parameters of ``csv.reader``
         """
-        with open(file_dir, "r") as f:
-            csv_iterator = csv.reader(f)
-            self.load(csv_iterator)
+        with loaders.open_lines(file_dir, use_mmap) as lines:
+            self.load(loaders.iter_csv(lines, header, **fmtparams), 
+                batch_size)
 
-    def load_json_file(self, file_dir):
+    def load_json_file(self, file_dir, batch_size=1000, use_mmap=False):
         """
-        Load a batch of data from given json file. 
+        Load a batch of data from given json file. A json array is 
+        parsed as a stream and its elements are added in batches of 
+        ``batch_size``; any other json value is loaded as a whole.
 
         :param file_dir: str, directory where the json file located
+        :param batch_size: int, number of items per ``put_many`` call
+        :param use_mmap: bool, read the file through a memory map
+        """
+        with loaders.open_chunks(file_dir, use_mmap=use_mmap) as chunks:
+            chunks = iter(chunks)
+            head = ""
+            for chunk in chunks:
+                head += chunk
+                if head.strip():
+                    break
+            if head.lstrip().startswith("["):
+                self.load(loaders.iter_json_array(
+                    itertools.chain([head], chunks)), batch_size)
+            else:
+                self.load(json.loads(head + "".join(chunks)), batch_size)
+
+    def load_ndjson_file(self, file_dir, batch_size=1000, use_mmap=False):
+        """
+        Load a batch of data from given newline delimited json file,
+        one json value per line. 
+
+        :param file_dir: str, directory where the file located
+        :param batch_size: int, number of items per ``put_many`` call
+        :param use_mmap: bool, read the file through a memory map
+        """
+        with loaders.open_lines(file_dir, use_mmap) as lines:
+            self.load(loaders.iter_ndjson(lines), batch_size)
+
+
+class ThreadSafeResourceKeeper(ResourceKeeper):
+    """
+    Resource manager that can be shared among threads.
+
+    All book keeping is guarded by one condition variable, and ``get``
+    can block until another thread releases a resource instead of
+    returning None straight away.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """
+        Instanciate a thread-safe resource manager, accepts the same
+        arguments as ``ResourceKeeper``
+        """
+        self._cond = threading.Condition(threading.RLock())
+        self._picky_waiters = 0
+        super().__init__(*args, **kwargs)
+
+    def acquire(self, block=True, timeout=None, ttl=None, where=None):
+        """
+        Return a context manager (or decorator) that gets a resource on 
+        enter and releases it on exit, see ``ResourceKeeper.acquire``. 
+        Raise TimeoutError on enter if no resource became available in 
+        time.
+
+        :param block: bool, see ``get``
+        :param timeout: float, see ``get``
+        :param ttl: float, see ``get``
+        :param where: dict, see ``get``
+        """
+        return Checkout(self, (block, timeout, ttl, where), TimeoutError)
+
+    def get(self, block=True, timeout=None, ttl=None, where=None):
+        """
+        Get a resource from resource pool.
+
+        :param block: bool, wait for a resource if none is available
+        :param timeout: float, seconds to wait at most, None to wait forever
+        :param ttl: float, if given, return a ``Lease``, see 
+            ``ResourceKeeper.get``
+        :param where: dict, only return a matching resource, see 
+            ``ResourceKeeper.get``
+        :return: a resource, or None if none became available in time
+        """
+        with self._cond:
+            if not block:
+                return super().get(ttl, where)
+            if not where:
+                if not self._wait(lambda: self.avail_num > 0, timeout):
+                    return self._miss()
+                return super().get(ttl)
+            self._picky_waiters += 1
+            try:
+                if not self._wait(lambda: self.avail_num > 0 and
+                        self._find_where(where) is not None, timeout):
+                    return self._miss()
+            finally:
+                self._picky_waiters -= 1
+            return super().get(ttl, where)
+
+    def get_many(self, n, all_or_nothing=False, block=True, timeout=None,
+                 ttl=None):
+        """
+        Get a batch of resources from resource pool.
+
+        :param n: int, number of resources wanted
+        :param all_or_nothing: bool, if True return an empty list unless
+            all n resources are available
+        :param block: bool, wait until a resource (all n resources if 
+            all_or_nothing) is available
+        :param timeout: float, seconds to wait at most, None to wait forever
+        :param ttl: float, if given, return leases, see 
+            ``ResourceKeeper.get``
+        :return: list of at most n resources
         """
-        with open(file_dir, "r") as f:
-            json_data = json.load(f)
-            self.load(json_data)
\ No newline at end of file
+        wanted = n if all_or_nothing else 1
+        with self._cond:
+            if block and self.avail_num < wanted:
+                self._picky_waiters += 1
+                try:
+                    if not self._wait(
+                            lambda: self.avail_num >= wanted, timeout):
+                        return []
+                finally:
+                    self._picky_waiters -= 1
+            return super().get_many(n, all_or_nothing, ttl)
+
+    def _wait(self, predicate, timeout):
+        # like Condition.wait_for, but also wakes up when a time based
+        # event such as a lease expiry is due
+        self._tick()
+        if predicate():
+            return True
+        start = time.monotonic()
+        end = None if timeout is None else start + timeout
+        try:
+            while True:
+                wait = None if end is None else end - time.monotonic()
+                if wait is not None and wait <= 0:
+                    return False
+                event = self._next_event()
+                if event is not None and (wait is None or event < wait):
+                    wait = event
+                self._cond.wait(wait)
+                self._tick()
+                if predicate():
+                    return True
+        finally:
+            if self.metrics is not None:
+                self.metrics.observe_wait(time.monotonic() - start)
+
+    def renew(self, lease, ttl=None):
+        """
+        Push back the deadline of a lease, see ``ResourceKeeper.renew``
+        """
+        with self._cond:
+            return super().renew(lease, ttl)
+
+    def reap(self, now=None):
+        """
+        Make the resources whose lease has expired available again and 
+        wake up waiting threads, see ``ResourceKeeper.reap``
+        """
+        with self._cond:
+            res_ids = super().reap(now)
+            if res_ids:
+                self._notify(len(res_ids))
+            return res_ids
+
+    def _promote(self, now=None):
+        res_ids = super()._promote(now)
+        if res_ids:
+            self._notify(len(res_ids))
+        return res_ids
+
+    def release(self, resourse):
+        """
+        Release a resource and wake up one thread waiting in ``get``.
+
+        :param resource: Resource, the resource to be released
+        """
+        with self._cond:
+            before = self.avail_num, self.cooling_num
+            super().release(resourse)
+            # a resource cooling down changes how long waiters sleep
+            if (self.avail_num, self.cooling_num) != before:
+                self._notify()
+
+    def snapshot(self, path):
+        """
+        Write the whole keeper to a file, see ``ResourceKeeper.snapshot``
+        """
+        with self._cond:
+            super().snapshot(path)
+
+    def release_many(self, resources):
+        """
+        Release a batch of resources and wake up waiting threads.
+
+        :param resources: iterable of Resource
+        """
+        with self._cond:
+            super().release_many(resources)
+
+    def add(self, data):
+        """
+        Add data to the resources pool and wake up one waiting thread
+
+        :param resource: obj, the resource to be added
+        """
+        with self._cond:
+            super().add(data)
+            self._notify()
+
+    def remove(self, resource):
+        """
+        Remove the resource from the resources pool
+
+        :param resource: Resource, the resource to be removed
+        """
+        with self._cond:
+            super().remove(resource)
+
+    def load(self, resources_data, batch_size=1000):
+        """
+        Load a batch of data into the resources pool
+
+        :param resources_data: should be iterable
+        :param batch_size: int, number of items per ``put_many`` call
+        """
+        with self._cond:
+            super().load(resources_data, batch_size)
+            self._cond.notify_all()
+
+    def _notify(self, n=1):
+        # a thread waiting for a whole batch or a matching resource may
+        # not be able to use a single wakeup, so hand it to every waiter
+        if self._picky_waiters:
+            self._cond.notify_all()
+        else:
+            self._cond.notify(n)
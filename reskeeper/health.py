@@ -0,0 +1,234 @@
+# coding: utf-8
+"""
+This module contains the health checking of Resource Keeper: idle
+resources are probed concurrently, and the ones failing the probe are
+quarantined or evicted from the pool.
+
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from reskeeper.core import ThreadSafeResourceKeeper
+
+POLICIES = ("quarantine", "evict")
+
+
+class HealthChecker:
+    """
+    Probe the idle resources of a keeper and take the failing ones out.
+
+    Resources being probed are checked out of the keeper, so nobody gets
+    them meanwhile, and healthy ones are released again. A failing
+    resource is either kept aside in ``quarantined`` (``recheck`` gives
+    it back once it recovers) or removed from the pool.
+    """
+
+    def __init__(self, keeper, probe, max_workers=32, policy="quarantine",
+                 batch_size=None, evict_after=None):
+        """
+        :param keeper: the resource keeper to check, shared with other
+            threads only if it is thread-safe
+        :param probe: callable taking the data of a resource, returning
+            a truthy value if it is healthy; raising counts as a failure.
+            A coroutine function for ``check_async``.
+        :param max_workers: int, number of probes running at once
+        :param policy: str, ``quarantine`` or ``evict`` failing resources
+        :param batch_size: int, number of resources checked out at once,
+            by default 4 times max_workers
+        :param evict_after: int, evict a quarantined resource after this
+            many failed checks in a row, None to keep it forever
+        """
+        if policy not in POLICIES:
+            raise ValueError("unknown policy {0!r}, expected one of {1}"
+                             .format(policy, ", ".join(POLICIES)))
+        self.keeper = keeper
+        self.probe = probe
+        self.max_workers = max_workers
+        self.policy = policy
+        self.batch_size = batch_size or max_workers * 4
+        self.evict_after = evict_after
+        # res_id -> Resource held out of the keeper
+        self.quarantined = dict()
+        # res_id -> failed checks in a row
+        self.failures = dict()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def _take(self, n):
+        if isinstance(self.keeper, ThreadSafeResourceKeeper):
+            return self.keeper.get_many(n, block=False)
+        return self.keeper.get_many(n)
+
+    def _probe(self, data):
+        try:
+            return bool(self.probe(data))
+        except Exception:
+            return False
+
+    async def _probe_async(self, data, semaphore, timeout):
+        async with semaphore:
+            try:
+                return bool(await asyncio.wait_for(self.probe(data), timeout))
+            except Exception:
+                return False
+
+    def check(self, limit=None):
+        """
+        Probe the idle resources on a thread pool.
+
+        :param limit: int, check at most this many resources, by default
+            the number available when the check starts
+        :return: list of res_ids that failed
+        """
+        failed = []
+        with ThreadPoolExecutor(self.max_workers) as executor:
+            for batch in self._batches(limit):
+                results = executor.map(self._probe,
+                    [res.data for res in batch])
+                failed.extend(self._settle(batch, results))
+        return failed
+
+    async def check_async(self, limit=None, timeout=None):
+        """
+        Probe the idle resources with a coroutine probe, at most
+        ``max_workers`` at once.
+
+        :param limit: int, see ``check``
+        :param timeout: float, seconds a probe may take before it fails
+        :return: list of res_ids that failed
+        """
+        semaphore = asyncio.Semaphore(self.max_workers)
+        failed = []
+        for batch in self._batches(limit):
+            results = await asyncio.gather(*(
+                self._probe_async(res.data, semaphore, timeout)
+                for res in batch))
+            failed.extend(self._settle(batch, results))
+        return failed
+
+    def _batches(self, limit):
+        # released resources go back behind the unchecked ones in a
+        # queue, so checking avail_num resources visits each once
+        remaining = self.keeper.avail_num if limit is None else limit
+        while remaining > 0:
+            batch = self._take(min(self.batch_size, remaining))
+            if not batch:
+                return
+            remaining -= len(batch)
+            yield batch
+
+    def _settle(self, batch, results):
+        failed = []
+        for res, healthy in zip(batch, results):
+            if healthy:
+                self.failures.pop(res.res_id, None)
+                self.keeper.release(res)
+            else:
+                failed.append(res.res_id)
+                self._fail(res)
+        return failed
+
+    def _fail(self, res):
+        count = self.failures.get(res.res_id, 0) + 1
+        if self.policy == "evict" or (self.evict_after is not None and
+                                      count >= self.evict_after):
+            self.evict(res)
+        else:
+            self.failures[res.res_id] = count
+            self.quarantined[res.res_id] = res
+
+    def evict(self, res):
+        """
+        Remove a resource from the keeper for good
+
+        :param res: Resource, checked out or quarantined
+        """
+        self.quarantined.pop(res.res_id, None)
+        self.failures.pop(res.res_id, None)
+        self.keeper.remove(res)
+        res.destroy()
+
+    def recheck(self):
+        """
+        Probe the quarantined resources again on a thread pool and give
+        the recovered ones back to the keeper.
+
+        :return: list of recovered res_ids
+        """
+        resources = list(self.quarantined.values())
+        with ThreadPoolExecutor(self.max_workers) as executor:
+            results = list(executor.map(self._probe,
+                [res.data for res in resources]))
+        return self._recover(resources, results)
+
+    async def recheck_async(self, timeout=None):
+        """
+        Like ``recheck``, with a coroutine probe.
+
+        :param timeout: float, seconds a probe may take before it fails
+        :return: list of recovered res_ids
+        """
+        semaphore = asyncio.Semaphore(self.max_workers)
+        resources = list(self.quarantined.values())
+        results = await asyncio.gather(*(
+            self._probe_async(res.data, semaphore, timeout)
+            for res in resources))
+        return self._recover(resources, results)
+
+    def _recover(self, resources, results):
+        recovered = []
+        for res, healthy in zip(resources, results):
+            res_id = res.res_id
+            if healthy:
+                del self.quarantined[res_id]
+                self.failures.pop(res_id, None)
+                self.keeper.release(res)
+                recovered.append(res_id)
+            else:
+                self._fail(res)
+        return recovered
+
+    def release_quarantined(self):
+        """
+        Give every quarantined resource back to the keeper unchecked
+
+        :return: list of res_ids given back
+        """
+        res_ids = list(self.quarantined)
+        for res in self.quarantined.values():
+            self.keeper.release(res)
+        self.quarantined.clear()
+        self.failures.clear()
+        return res_ids
+
+    def start(self, interval):
+        """
+        Run ``check`` and ``recheck`` every ``interval`` seconds on a
+        daemon thread. The keeper must be thread-safe.
+
+        :param interval: float, seconds between two rounds
+        """
+        if self._thread is not None:
+            raise RuntimeError("health checker already started")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,),
+                                        daemon=True)
+        self._thread.start()
+
+    def _run(self, interval):
+        while not self._stop.wait(interval):
+            self.check()
+            if self.quarantined:
+                self.recheck()
+
+    def stop(self):
+        """
+        Stop the thread started by ``start`` and wait for its round
+        """
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
@@ -0,0 +1,116 @@
+# coding: utf-8
+"""
+This module contains the book keeping of leases with a time to live,
+used by ``ResourceKeeper`` to take back resources that were never
+released.
+
+"""
+
+import heapq
+import itertools
+
+
+class LeaseReaper:
+    """
+    Tracks the deadline of each outstanding lease in a binary heap.
+
+    Renewing a lease pushes a new heap entry and leaves the old one
+    behind, stale entries are dropped when they reach the top. Finding
+    expired leases therefore costs O(k log n) for k expired or stale
+    entries, never a scan over all outstanding leases. The heap is
+    rebuilt from the active leases once stale entries outnumber them.
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.active = dict()
+        self._tokens = itertools.count(1)
+
+    def __len__(self):
+        return len(self.active)
+
+    def track(self, res_id, ttl, now):
+        """
+        Start a lease.
+
+        :param res_id: id of the leased resource
+        :param ttl: float, seconds the lease lasts
+        :param now: float, current monotonic time
+        :return: (token, deadline) identifying the lease
+        """
+        token = next(self._tokens)
+        deadline = now + ttl
+        self.active[res_id] = (token, ttl, deadline)
+        heapq.heappush(self.heap, (deadline, token, res_id))
+        self._maybe_compact()
+        return token, deadline
+
+    def renew(self, res_id, token, ttl, now):
+        """
+        Push back the deadline of a lease.
+        Raise KeyError if the lease has expired or ended.
+
+        :param ttl: float, new time to live, None to reuse the last one
+        :return: float, the new deadline
+        """
+        entry = self.active.get(res_id)
+        if entry is None or entry[0] != token:
+            raise KeyError("lease of res_id {0} has expired".format(res_id))
+        if ttl is None:
+            ttl = entry[1]
+        deadline = now + ttl
+        self.active[res_id] = (token, ttl, deadline)
+        heapq.heappush(self.heap, (deadline, token, res_id))
+        self._maybe_compact()
+        return deadline
+
+    def is_active(self, res_id, token):
+        """
+        Check whether the lease identified by token is still held
+        """
+        entry = self.active.get(res_id)
+        return entry is not None and entry[0] == token
+
+    def forget(self, res_id):
+        """
+        End the lease of res_id, if any
+        """
+        if self.active.pop(res_id, None) is not None:
+            self._maybe_compact()
+
+    def _maybe_compact(self):
+        # every active lease has one current entry, the rest are stale
+        if len(self.heap) > 2 * len(self.active) + 16:
+            self.heap = [(deadline, token, res_id) for res_id, 
+                         (token, _, deadline) in self.active.items()]
+            heapq.heapify(self.heap)
+
+    def _is_current(self, deadline, token, res_id):
+        entry = self.active.get(res_id)
+        return (entry is not None and entry[0] == token 
+                and entry[2] == deadline)
+
+    def next_deadline(self):
+        """
+        Return the earliest deadline of the outstanding leases, or None
+        """
+        heap = self.heap
+        while heap and not self._is_current(*heap[0]):
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def expired(self, now):
+        """
+        End and return the leases whose deadline has passed
+
+        :param now: float, current monotonic time
+        :return: list of res_ids
+        """
+        heap = self.heap
+        res_ids = []
+        while heap and heap[0][0] <= now:
+            deadline, token, res_id = heapq.heappop(heap)
+            if self._is_current(deadline, token, res_id):
+                del self.active[res_id]
+                res_ids.append(res_id)
+        return res_ids
@@ -0,0 +1,178 @@
+# coding: utf-8
+"""
+This module contains streaming readers for resource files. They yield
+one record at a time, so ``ResourceKeeper.load`` can push a file of any
+size into the pool in batches with flat memory use.
+
+"""
+
+import codecs
+import contextlib
+import csv
+import json
+import mmap
+
+_WHITESPACE = " \t\n\r"
+_SEPARATORS = _WHITESPACE + ",]"
+
+
+@contextlib.contextmanager
+def open_chunks(file_dir, chunk_size=1 << 16, use_mmap=False):
+    """
+    Open a utf-8 text file as an iterator of string chunks.
+
+    :param file_dir: str, path of the file
+    :param chunk_size: int, characters (bytes with mmap) per chunk
+    :param use_mmap: bool, read through a memory map of the file
+    """
+    if not use_mmap:
+        with open(file_dir, "r", encoding="utf8") as f:
+            yield iter(lambda: f.read(chunk_size), "")
+        return
+    with open(file_dir, "rb") as f, _map(f) as mm:
+        decoder = codecs.getincrementaldecoder("utf8")()
+
+        def chunks():
+            for start in range(0, len(mm), chunk_size):
+                chunk = decoder.decode(mm[start:start + chunk_size])
+                if chunk:
+                    yield chunk
+            tail = decoder.decode(b"", final=True)
+            if tail:
+                yield tail
+
+        yield chunks()
+
+
+@contextlib.contextmanager
+def open_lines(file_dir, use_mmap=False):
+    """
+    Open a utf-8 text file as an iterator of lines, for csv and ndjson.
+
+    :param file_dir: str, path of the file
+    :param use_mmap: bool, read through a memory map of the file
+    """
+    if not use_mmap:
+        with open(file_dir, "r", encoding="utf8", newline="") as f:
+            yield f
+        return
+    with open(file_dir, "rb") as f, _map(f) as mm:
+        yield (line.decode("utf8") for line in iter(mm.readline, b""))
+
+
+@contextlib.contextmanager
+def _map(f):
+    try:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:
+        # an empty file cannot be mapped
+        yield b""
+        return
+    try:
+        yield mm
+    finally:
+        mm.close()
+
+
+def iter_json_array(chunks):
+    """
+    Incrementally parse a JSON array and yield its elements.
+    Raise ValueError if the input is not a well formed JSON array.
+
+    :param chunks: iterable of str, the JSON text in pieces
+    """
+    decoder = json.JSONDecoder()
+    chunks = iter(chunks)
+    buf = ""
+    pos = 0
+    eof = False
+
+    def more():
+        nonlocal buf, pos, eof
+        chunk = next(chunks, None)
+        if chunk is None:
+            eof = True
+            return False
+        buf = buf[pos:] + chunk
+        pos = 0
+        return True
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buf) or not more():
+                return
+
+    def check_end():
+        # only whitespace may follow the closing bracket
+        nonlocal pos
+        pos += 1
+        skip_whitespace()
+        if pos < len(buf):
+            raise ValueError(
+                "extra data after JSON array: " + repr(buf[pos:pos + 20]))
+
+    skip_whitespace()
+    if pos >= len(buf) or buf[pos] != "[":
+        raise ValueError("JSON input is not an array")
+    pos += 1
+    skip_whitespace()
+    if pos < len(buf) and buf[pos] == "]":
+        check_end()
+        return
+    while True:
+        while True:
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                if more():
+                    continue
+                raise
+            # a number cut by the end of the buffer, e.g. "-7." of
+            # "-7.5e3", decodes fine, so make sure a separator follows
+            if ((end == len(buf) or buf[end] not in _SEPARATORS)
+                    and not eof and more()):
+                continue
+            break
+        pos = end
+        yield item
+        skip_whitespace()
+        if pos >= len(buf):
+            raise ValueError("unterminated JSON array")
+        if buf[pos] == "]":
+            check_end()
+            return
+        if buf[pos] != ",":
+            raise ValueError(
+                "expect ',' or ']' in JSON array, got " + repr(buf[pos]))
+        pos += 1
+        skip_whitespace()
+
+
+def iter_ndjson(lines):
+    """
+    Parse newline delimited JSON, one value per line. Blank lines are
+    skipped.
+
+    :param lines: iterable of str
+    """
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def iter_csv(lines, header=False, **fmtparams):
+    """
+    Parse csv rows.
+
+    :param lines: iterable of str
+    :param header: bool, if True the first row names the columns and 
+        every following row is yielded as a dict
+    :param fmtparams: formatting parameters of ``csv.reader``
+    """
+    if header:
+        return csv.DictReader(lines, **fmtparams)
+    return csv.reader(lines, **fmtparams)
@@ -0,0 +1,248 @@
+# coding: utf-8
+"""
+This module contains the instrumentation of Resource Keeper: counters, 
+histograms of waiting, holding and pool map call times, and an exporter
+to the Prometheus text format. It is only used when a keeper is created
+with ``metrics``, so a keeper without it pays nothing.
+
+"""
+
+import bisect
+import time
+from collections import Counter
+
+from reskeeper.poolmaps import PoolMapABC
+
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5,
+                   1.0, 5.0, 10.0, 60.0, 300.0)
+
+
+class Histogram:
+    """
+    Histogram with fixed upper bounds, like a Prometheus histogram
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """
+        Return (upper bound, observations not greater than it) pairs, 
+        the last bound being ``float("inf")``
+        """
+        pairs = []
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), 
+                                self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+    def quantile(self, q):
+        """
+        Return the upper bound of the bucket holding the q-quantile,
+        None without observations
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        for bound, total in self.cumulative():
+            if total >= rank:
+                return bound
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": [[bound, total] for bound, total in self.cumulative()],
+        }
+
+
+class KeeperMetrics:
+    """
+    Metrics collected by a Resource Keeper.
+
+    ``counts`` counts the events ``get``, ``miss`` (get returned None), 
+    ``release``, ``add`` and ``remove``. ``wait`` holds the seconds 
+    blocking gets waited, ``hold`` the seconds resources were checked
+    out, ``pool_calls`` one histogram per pool map method and ``usage``
+    how many times each res_id was handed out.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, clock=time.monotonic):
+        """
+        :param buckets: upper bounds of the histograms, in seconds
+        :param clock: function returning the current time in seconds
+        """
+        self.buckets = buckets
+        self.clock = clock
+        self.counts = Counter()
+        self.wait = Histogram(buckets)
+        self.hold = Histogram(buckets)
+        self.pool_calls = dict()
+        self.usage = Counter()
+        self._checked_out = dict()
+
+    def on_event(self, event, res_id):
+        """
+        Record an event of the keeper
+        """
+        self.counts[event] += 1
+        if event == "get":
+            self.usage[res_id] += 1
+            self._checked_out[res_id] = self.clock()
+        elif event == "release" or event == "remove":
+            since = self._checked_out.pop(res_id, None)
+            if since is not None and event == "release":
+                self.hold.observe(self.clock() - since)
+
+    def observe_wait(self, seconds):
+        """
+        Record the time a blocking get waited
+        """
+        self.wait.observe(seconds)
+
+    def observe_pool_call(self, method, seconds):
+        """
+        Record the time a pool map call took
+        """
+        histogram = self.pool_calls.get(method)
+        if histogram is None:
+            histogram = self.pool_calls[method] = Histogram(self.buckets)
+        histogram.observe(seconds)
+
+    def snapshot(self, keeper=None):
+        """
+        Return the metrics as a dict of plain python values
+
+        :param keeper: ResourceKeeper, to add its current size, 
+            avail_num and cooling_num
+        """
+        snap = {
+            "counts": dict(self.counts),
+            "checked_out": len(self._checked_out),
+            "wait": self.wait.to_dict(),
+            "hold": self.hold.to_dict(),
+            "pool_calls": {method: h.to_dict() 
+                           for method, h in self.pool_calls.items()},
+            "usage": dict(self.usage),
+        }
+        if keeper is not None:
+            snap["size"] = keeper.size
+            snap["avail_num"] = keeper.avail_num
+            snap["cooling_num"] = keeper.cooling_num
+            snap["utilization"] = (1 - keeper.avail_num / keeper.size 
+                                   if keeper.size else 0.0)
+        return snap
+
+    def to_prometheus(self, keeper=None, prefix="reskeeper", 
+                      per_resource=False):
+        """
+        Return the metrics in the Prometheus text exposition format
+
+        :param keeper: ResourceKeeper, to add gauges of its counters
+        :param prefix: str, prefix of the metric names
+        :param per_resource: bool, add a usage counter per res_id, which
+            may be many series for a big pool
+        """
+        lines = []
+
+        def add(name, kind, help_text, samples):
+            lines.append("# HELP {0}_{1} {2}".format(prefix, name, help_text))
+            lines.append("# TYPE {0}_{1} {2}".format(prefix, name, kind))
+            for suffix, labels, value in samples:
+                label_text = ""
+                if labels:
+                    label_text = "{" + ",".join('{0}="{1}"'.format(k, v)
+                        for k, v in labels) + "}"
+                lines.append("{0}_{1}{2}{3} {4}".format(
+                    prefix, name, suffix, label_text, _format(value)))
+
+        def histogram_samples(histogram, labels=()):
+            samples = [("_bucket", labels + (("le", _format(bound)),), total)
+                       for bound, total in histogram.cumulative()]
+            samples.append(("_sum", labels, histogram.sum))
+            samples.append(("_count", labels, histogram.count))
+            return samples
+
+        add("events_total", "counter", "Keeper events by type.",
+            [("", (("event", event),), count) 
+             for event, count in sorted(self.counts.items())])
+        add("wait_seconds", "histogram", "Time blocking gets waited.",
+            histogram_samples(self.wait))
+        add("hold_seconds", "histogram", 
+            "Time resources were checked out.", 
+            histogram_samples(self.hold))
+        samples = []
+        for method, histogram in sorted(self.pool_calls.items()):
+            samples.extend(histogram_samples(histogram, 
+                (("method", method),)))
+        add("pool_call_seconds", "histogram", "Time of pool map calls.",
+            samples)
+        if per_resource:
+            add("resource_gets_total", "counter", 
+                "Times each resource was handed out.",
+                [("", (("res_id", res_id),), count) 
+                 for res_id, count in sorted(self.usage.items())])
+        if keeper is not None:
+            for name, help_text, value in (
+                    ("size", "Resources in the pool.", keeper.size),
+                    ("available", "Available resources.", keeper.avail_num),
+                    ("cooling", "Resources cooling down.", 
+                     keeper.cooling_num)):
+                add(name, "gauge", help_text, [("", (), value)])
+        return "\n".join(lines) + "\n"
+
+
+def _format(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+class InstrumentedPoolMap(PoolMapABC):
+    """
+    Wrapper of a PoolMap that times every call into ``KeeperMetrics``.
+    Other attributes are looked up on the wrapped map.
+    """
+
+    def __init__(self, pool_map, metrics):
+        self.wrapped = pool_map
+        self.metrics = metrics
+        self.fresh_values = getattr(pool_map, "fresh_values", False)
+
+    def __getattr__(self, name):
+        return getattr(self.wrapped, name)
+
+    def _timed(self, method, *args):
+        clock = self.metrics.clock
+        start = clock()
+        try:
+            return getattr(self.wrapped, method)(*args)
+        finally:
+            self.metrics.observe_pool_call(method, clock() - start)
+
+    def get(self, key):
+        return self._timed("get", key)
+
+    def put(self, key, val):
+        return self._timed("put", key, val)
+
+    def delete(self, key):
+        return self._timed("delete", key)
+
+    def get_many(self, keys):
+        return self._timed("get_many", keys)
+
+    def put_many(self, items):
+        return self._timed("put_many", items)
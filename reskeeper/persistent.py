@@ -0,0 +1,152 @@
+# coding: utf-8
+"""
+This module contains a Resource Keeper whose whole state lives in one
+sqlite database, so it can be reopened after a restart without
+reloading the resources.
+
+"""
+
+import time
+
+from reskeeper import availsets
+from reskeeper import poolmaps
+from reskeeper.core import ResourceKeeper
+
+
+class PersistentResourceKeeper(ResourceKeeper):
+    """
+    Resource manager that stores data, availability and leases in a
+    sqlite database.
+
+    Opening an existing database restores ``size``, ``avail_num`` and
+    the resource ids from it. Resources that were checked out when the
+    previous process stopped are still leased, see ``leases`` and 
+    ``recover_leases``.
+    """
+
+    def __init__(self, db_path="./reskeeper.db", resources=None,
+                 copy_policy="deep", metrics=None, **map_options):
+        """
+        Open or create a persistent resource manager
+
+        :param db_path: str, path of the database file
+        :param resources: iterable of any resources to be added
+        :param copy_policy: str, see ``ResourceKeeper``
+        :param metrics: KeeperMetrics or True, see ``ResourceKeeper``
+        :param map_options: extra options of ``poolmaps.SqliteMap``
+        """
+        pool_map = poolmaps.SqliteMap(db_path, **map_options)
+        avail_set = availsets.SqliteAvailSet(pool_map)
+        with pool_map.conn as conn:
+            conn.execute("create table if not exists meta("
+                "key text primary key, value)")
+        super().__init__(None, pool_map, avail_set, copy_policy,
+                         metrics=metrics)
+        self._restore()
+        if resources:
+            self.load(resources)
+
+    def _restore(self):
+        conn = self.pool.conn
+        self.size = conn.execute("select count(*) from pool").fetchone()[0]
+        self.avail_num = len(self.available)
+        saved = conn.execute(
+            "select value from meta where key='max_id'").fetchone()
+        stored = conn.execute(
+            "select coalesce(max(res_id), 0) from pool").fetchone()[0]
+        self._max_id = max(saved[0] if saved else 0, stored)
+
+    def add(self, data):
+        """
+        Add data to the resources pool
+
+        :param resource: obj, the resource to be added
+        """
+        self._add_batch([data])
+
+    def _add_batch(self, batch):
+        # the pool rows, their availability and max_id are written in one
+        # transaction, so a crash cannot leave rows neither available 
+        # nor leased
+        first_id = self._max_id + 1
+        res_ids = range(first_id, first_id + len(batch))
+        encode = self.pool._encode
+        rows = [(res_id, encode(data)) for res_id, data in zip(res_ids, batch)]
+        with self.pool.conn as conn:
+            conn.execute("begin immediate")
+            conn.executemany(self.pool._UPSERT, rows)
+            conn.executemany("insert or ignore into avail(res_id) values(?)",
+                ((res_id,) for res_id in res_ids))
+            conn.execute("insert or replace into meta values('max_id', ?)",
+                (res_ids[-1],))
+        self._max_id += len(batch)
+        self.size += len(batch)
+        self.avail_num += len(batch)
+        if self._observed:
+            for res_id in res_ids:
+                self._emit("add", res_id)
+
+    def remove(self, resource):
+        """
+        Remove the resource from the resources pool, with its 
+        availability or lease, in one transaction
+
+        :param resource: Resource, the resource to be removed
+        """
+        res_id = resource.res_id
+        with self.pool.conn as conn:
+            conn.execute("begin immediate")
+            cur = conn.execute("delete from pool where res_id=?", (res_id,))
+            if cur.rowcount == 0:
+                raise KeyError("No resource with res_id: " + str(res_id))
+            cur = conn.execute("delete from avail where res_id=?", (res_id,))
+            conn.execute("delete from lease where res_id=?", (res_id,))
+        self.size -= 1
+        self.avail_num -= cur.rowcount
+        self._forget_removed(res_id)
+
+    def _restore_snapshot(self, snap, reclaim):
+        super()._restore_snapshot(snap, reclaim)
+        with self.pool.conn as conn:
+            conn.execute("insert or replace into meta values('max_id', ?)",
+                (self._max_id,))
+            if not reclaim:
+                # leased resources must stay known as checked out after
+                # a restart, for recover_leases
+                now = time.time()
+                conn.executemany("insert or replace into lease values(?, ?)",
+                    ((res_id, now) for res_id in snap.lease_ids))
+
+    def leases(self):
+        """
+        Return the resources currently checked out
+
+        :return: dict, mapping res_id to the unix time it was checked out
+        """
+        return self.available.leases()
+
+    def recover_leases(self):
+        """
+        Make every checked out resource available again, e.g. after a 
+        crash left them leased.
+
+        :return: list of recovered res_ids
+        """
+        recovered = []
+        for res_id in self.available.leases():
+            if self.pool.get(res_id) is None:
+                with self.pool.conn as conn:
+                    conn.execute("delete from lease where res_id=?", 
+                        (res_id,))
+                continue
+            self.available.add(res_id)
+            self.avail_num += 1
+            self._checked_out.discard(res_id)
+            recovered.append(res_id)
+        return recovered
+
+    def close(self):
+        """
+        Close the database connections
+        """
+        self.pool.close()
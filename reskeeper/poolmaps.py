@@ -6,8 +6,17 @@ Developers are suggested to extend the class ``PoolMapABC``
 and implements all its abstract methods.
 """
 
+import mmap
+import os
 import sqlite3
+import struct
+import sys
+import threading
+import weakref
 import abc
+from collections import OrderedDict
+
+from reskeeper import codecs
 
 
 class PoolMapABC:
@@ -17,6 +26,9 @@ class PoolMapABC:
     ``add`` and ``pop``
     """
     __metaclass__ =  abc.ABCMeta
+    # True if ``get`` returns a new object on every call, so the keeper
+    # can hand it out without copying
+    fresh_values = False
 
     @abc.abstractmethod
     def get(self, key):
@@ -43,6 +55,53 @@ class PoolMapABC:
         """
         pass
 
+    def get_many(self, keys):
+        """
+        Return the items of the given keys, in the same order. 
+        Missing keys give None. Subclasses are suggested to override 
+        it when the storage can fetch a batch in one round trip.
+
+        :param keys: list of keys
+        :return: list of items
+        """
+        return [self.get(key) for key in keys]
+
+    def put_many(self, items):
+        """
+        Store a batch of key and item pairs. Subclasses are suggested
+        to override it when the storage can write a batch at once.
+
+        :param items: iterable of (key, item) pairs
+        """
+        for key, val in items:
+            self.put(key, val)
+
+
+class _CodecMixin:
+    """
+    Encoding of the values of maps storing strings or bytes, see
+    ``reskeeper.codecs``
+    """
+
+    def _init_codec(self, codec, lazy):
+        self.codec = codecs.get_codec(codec) if codec is not None else None
+        self.lazy = lazy
+        self.fresh_values = self.codec is not None
+
+    def _encode(self, val):
+        if self.codec is None:
+            if not isinstance(val, str):
+                raise TypeError('Argument "val" shoule be str type')
+            return val
+        return self.codec.encode(val)
+
+    def _decode(self, raw):
+        if raw is None or self.codec is None:
+            return raw
+        if self.lazy:
+            return codecs.Lazy(self.codec, raw)
+        return self.codec.decode(raw)
+
 
 class DictMap(PoolMapABC):
     """
@@ -60,48 +119,708 @@ class DictMap(PoolMapABC):
     def delete(self, key):
         del self.map[key]
 
+    def get_many(self, keys):
+        get = self.map.get
+        return [get(key) for key in keys]
+
+    def put_many(self, items):
+        self.map.update(items)
 
-class SimpleSqliteMap(PoolMapABC):
+
+class SimpleSqliteMap(_CodecMixin, PoolMapABC):
     """
     Sqlite storage for resources. Note that data to be stored can
-    only be strings.
+    only be strings, unless a codec turns them into bytes.
     """
-    
-    def __init__(self, db_path="./reskeeper.db"):
+    # keep batched queries under sqlite's default host parameter limit
+    MAX_VARIABLES = 999
+
+    def __init__(self, db_path="./reskeeper.db", codec=None, lazy=False):
+        """
+        :param db_path: str, path of the database file
+        :param codec: Codec or its name, see ``reskeeper.codecs``, to 
+            store any data as a BLOB
+        :param lazy: bool, return ``codecs.Lazy`` values, decoded when
+            the data of a resource is first read
+        """
+        self._init_codec(codec, lazy)
         self.conn = sqlite3.connect(db_path) 
-        self.conn.execute(
-            "create table pool(res_id int primary key, data text);")
+        self.conn.execute("create table if not exists pool("
+            "res_id int primary key, data text);")
         self.conn.commit()
 
     def get(self, key):
         cur = self.conn.cursor()
-        cur.execute(
-            "select data from pool where res_id={0}".format(key))
+        cur.execute("select data from pool where res_id=?", (key,))
         data = cur.fetchone()
         if data:
-            data = data[0]
+            data = self._decode(data[0])
         cur.close()
         return data
 
     def put(self, key, val):
-        if not isinstance(val, str):
-            raise TypeError('Argument "val" shoule be str type')
+        val = self._encode(val)
         try:
-            self.conn.execute(
-                'insert into pool values({0}, "{1}")'.format(key, val))
+            self.conn.execute("insert into pool values(?, ?)", (key, val))
         except sqlite3.IntegrityError:
             self.conn.execute(
-                'update pool set data="{0}" where res_id={1}'.format(val,key))
+                "update pool set data=? where res_id=?", (val, key))
         finally:
             self.conn.commit()
 
+    def get_many(self, keys):
+        keys = list(keys)
+        found = dict()
+        for i in range(0, len(keys), self.MAX_VARIABLES):
+            chunk = keys[i:i + self.MAX_VARIABLES]
+            found.update(self.conn.execute(
+                "select res_id, data from pool where res_id in ({0})"
+                .format(",".join("?" * len(chunk))), chunk))
+        return [self._decode(found.get(key)) for key in keys]
+
+    def put_many(self, items):
+        items = [(key, self._encode(val)) for key, val in items]
+        with self.conn:
+            self.conn.executemany(
+                "insert or replace into pool values(?, ?)", items)
+
     def delete(self, key):
-        if len(self.conn.execute('select res_id from pool where res_id={0}'
-            .format(key)).fetchall()) == 0:
+        if len(self.conn.execute("select res_id from pool where res_id=?",
+            (key,)).fetchall()) == 0:
             raise KeyError("sqlite has no record with res_id: " + str(key))
-        self.conn.execute(
-            "delete from pool where res_id={0}".format(key))
+        self.conn.execute("delete from pool where res_id=?", (key,))
         self.conn.commit()
 
     def close(self):
-        self.conn.close()
\ No newline at end of file
+        self.conn.close()
+
+
+class SqliteMap(_CodecMixin, PoolMapABC):
+    """
+    Sqlite storage for resources, tuned for large pools and threads.
+    Like ``SimpleSqliteMap``, data to be stored can only be strings, 
+    unless a codec turns them into bytes.
+
+    All statements are parameterized, so sqlite3 reuses the prepared
+    statements from its cache. Batches are written by ``put_many`` 
+    in one transaction. Every thread gets its own connection, closed
+    when the thread ends, and with the default WAL journal readers do
+    not block each other.
+    """
+    MAX_VARIABLES = 999
+    SYNCHRONOUS_LEVELS = ("OFF", "NORMAL", "FULL", "EXTRA")
+    _UPSERT = ("insert into pool(res_id, data) values(?, ?) "
+        "on conflict(res_id) do update set data=excluded.data")
+
+    def __init__(self, db_path="./reskeeper.db", journal_mode="WAL",
+                 synchronous="NORMAL", timeout=5.0, codec=None, lazy=False):
+        """
+        :param db_path: str, path of the database file, ":memory:" for
+            an in-memory database shared by all threads
+        :param journal_mode: str, sqlite journal mode, e.g. WAL, DELETE
+        :param synchronous: str, sqlite synchronous level, one of 
+            OFF, NORMAL, FULL and EXTRA
+        :param timeout: float, seconds to wait for a locked database
+        :param codec: Codec or its name, see ``reskeeper.codecs``, to 
+            store any data as a BLOB
+        :param lazy: bool, return ``codecs.Lazy`` values, decoded when
+            the data of a resource is first read
+        """
+        self._init_codec(codec, lazy)
+        synchronous = synchronous.upper()
+        if synchronous not in self.SYNCHRONOUS_LEVELS:
+            raise ValueError("unknown synchronous level: " + synchronous)
+        if not journal_mode.isalpha():
+            raise ValueError("unknown journal mode: " + journal_mode)
+        self.uri = db_path == ":memory:"
+        if self.uri:
+            db_path = "file:reskeeper-{0}?mode=memory&cache=shared".format(
+                id(self))
+        self.db_path = db_path
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.timeout = timeout
+        self._local = threading.local()
+        self._conns = []
+        self._conns_lock = threading.Lock()
+        if self.uri:
+            # the in-memory database lives as long as a connection to
+            # it, keep one that no thread owns
+            self._conns.append(self._connect())
+        with self.conn as conn:
+            conn.execute("create table if not exists pool("
+                "res_id integer primary key, data text)")
+
+    @property
+    def conn(self):
+        """
+        The connection of the calling thread, created on first use
+        """
+        holder = getattr(self._local, "holder", None)
+        if holder is None:
+            conn = self._connect()
+            holder = self._local.holder = _ThreadConnection(conn)
+            with self._conns_lock:
+                self._conns.append(conn)
+            # the thread-local is cleared when the thread ends
+            weakref.finalize(holder, _close_connection, conn,
+                             self._conns, self._conns_lock)
+        return holder.conn
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout,
+            uri=self.uri, check_same_thread=False)
+        conn.execute("pragma journal_mode=" + self.journal_mode)
+        conn.execute("pragma synchronous=" + self.synchronous)
+        return conn
+
+    def get(self, key):
+        row = self.conn.execute(
+            "select data from pool where res_id=?", (key,)).fetchone()
+        return self._decode(row[0]) if row else None
+
+    def put(self, key, val):
+        val = self._encode(val)
+        with self.conn as conn:
+            conn.execute(self._UPSERT, (key, val))
+
+    def delete(self, key):
+        with self.conn as conn:
+            cur = conn.execute("delete from pool where res_id=?", (key,))
+        if cur.rowcount == 0:
+            raise KeyError("sqlite has no record with res_id: " + str(key))
+
+    def get_many(self, keys):
+        keys = list(keys)
+        found = dict()
+        conn = self.conn
+        for i in range(0, len(keys), self.MAX_VARIABLES):
+            chunk = keys[i:i + self.MAX_VARIABLES]
+            found.update(conn.execute(
+                "select res_id, data from pool where res_id in ({0})"
+                .format(",".join("?" * len(chunk))), chunk))
+        return [self._decode(found.get(key)) for key in keys]
+
+    def put_many(self, items):
+        items = [(key, self._encode(val)) for key, val in items]
+        with self.conn as conn:
+            conn.executemany(self._UPSERT, items)
+
+    def close(self):
+        """
+        Close the connections of all threads
+        """
+        with self._conns_lock:
+            for conn in self._conns:
+                conn.close()
+            del self._conns[:]
+        self._local = threading.local()
+
+
+class _ThreadConnection:
+    """
+    Holder of the connection of one thread, kept in a thread-local
+    """
+    __slots__ = ("conn", "__weakref__")
+
+    def __init__(self, conn):
+        self.conn = conn
+
+
+def _close_connection(conn, conns, lock):
+    # finalizer of _ThreadConnection, must not refer to the map
+    with lock:
+        try:
+            conns.remove(conn)
+        except ValueError:
+            # closed already by SqliteMap.close
+            return
+    conn.close()
+
+
+class CachedPoolMap(PoolMapABC):
+    """
+    Read-through LRU cache in front of another PoolMap, bounded by the
+    number of items and optionally by their size in bytes. 
+
+    Writes go through to the wrapped map and update a cached item. In 
+    write-behind mode they are kept in memory instead and written in 
+    one batch by ``flush``, when ``max_dirty`` writes are pending, or 
+    on ``close``; errors of the wrapped map show up then. Other 
+    attributes are looked up on the wrapped map.
+    """
+    _DELETED = object()
+
+    def __init__(self, pool_map, max_items=1024, max_bytes=None,
+                 sizeof=sys.getsizeof, write_behind=False, max_dirty=1000):
+        """
+        :param pool_map: PoolMap instance to be cached
+        :param max_items: int, number of items cached at most
+        :param max_bytes: int, total size of the cached items at most,
+            None for no limit
+        :param sizeof: callable returning the size of an item in bytes,
+            by default the shallow ``sys.getsizeof``
+        :param write_behind: bool, delay writes until ``flush``
+        :param max_dirty: int, flush when this many writes are pending
+        """
+        self.wrapped = pool_map
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.write_behind = write_behind
+        self.max_dirty = max_dirty
+        # key -> (item, size), least recently used first
+        self.cache = OrderedDict()
+        self.cached_bytes = 0
+        # key -> item or _DELETED, writes not flushed yet
+        self.dirty = dict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __getattr__(self, name):
+        return getattr(self.wrapped, name)
+
+    def _lookup(self, key):
+        # return (found, item) from the cache or the pending writes
+        entry = self.cache.get(key)
+        if entry is not None:
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return True, entry[0]
+        if key in self.dirty:
+            self.hits += 1
+            val = self.dirty[key]
+            return True, None if val is self._DELETED else val
+        self.misses += 1
+        return False, None
+
+    def _store(self, key, val):
+        size = self.sizeof(val) if self.max_bytes is not None else 0
+        old = self.cache.pop(key, None)
+        if old is not None:
+            self.cached_bytes -= old[1]
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        self.cache[key] = (val, size)
+        self.cached_bytes += size
+        while len(self.cache) > self.max_items or (
+                self.max_bytes is not None and 
+                self.cached_bytes > self.max_bytes):
+            _, (_, evicted_size) = self.cache.popitem(last=False)
+            self.cached_bytes -= evicted_size
+            self.evictions += 1
+
+    def _invalidate(self, key):
+        old = self.cache.pop(key, None)
+        if old is not None:
+            self.cached_bytes -= old[1]
+
+    def get(self, key):
+        found, val = self._lookup(key)
+        if found:
+            return val
+        val = self.wrapped.get(key)
+        if val is not None:
+            self._store(key, val)
+        return val
+
+    def get_many(self, keys):
+        keys = list(keys)
+        items = [None] * len(keys)
+        missing = []
+        for i, key in enumerate(keys):
+            found, val = self._lookup(key)
+            if found:
+                items[i] = val
+            else:
+                missing.append(i)
+        if missing:
+            fetched = self.wrapped.get_many([keys[i] for i in missing])
+            for i, val in zip(missing, fetched):
+                items[i] = val
+                if val is not None:
+                    self._store(keys[i], val)
+        return items
+
+    def put(self, key, val):
+        if self.write_behind:
+            self.dirty[key] = val
+            self._store(key, val)
+            self._maybe_flush()
+            return
+        self.wrapped.put(key, val)
+        if key in self.cache:
+            self._store(key, val)
+
+    def put_many(self, items):
+        if self.write_behind:
+            for key, val in items:
+                self.dirty[key] = val
+                self._invalidate(key)
+            self._maybe_flush()
+            return
+        items = list(items)
+        self.wrapped.put_many(items)
+        for key, val in items:
+            if key in self.cache:
+                self._store(key, val)
+
+    def delete(self, key):
+        if self.write_behind:
+            if key in self.dirty:
+                val = self.dirty[key]
+            elif key in self.cache:
+                val = self.cache[key][0]
+            else:
+                val = self.wrapped.get(key)
+            if val is None or val is self._DELETED:
+                raise KeyError("No item with key: " + str(key))
+            self.dirty[key] = self._DELETED
+            self._invalidate(key)
+            self._maybe_flush()
+            return
+        self._invalidate(key)
+        self.wrapped.delete(key)
+
+    def _maybe_flush(self):
+        if len(self.dirty) >= self.max_dirty:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the pending writes to the wrapped map
+        """
+        dirty = self.dirty
+        deleted = [key for key, val in dirty.items() if val is self._DELETED]
+        self.wrapped.put_many([(key, val) for key, val in dirty.items()
+                               if val is not self._DELETED])
+        self.dirty = dict()
+        for key in deleted:
+            try:
+                self.wrapped.delete(key)
+            except KeyError:
+                # added and deleted before reaching the wrapped map
+                pass
+
+    def clear(self):
+        """
+        Empty the cache, pending writes are kept
+        """
+        self.cache.clear()
+        self.cached_bytes = 0
+
+    def close(self):
+        """
+        Flush the pending writes and close the wrapped map if it can be
+        """
+        self.flush()
+        close = getattr(self.wrapped, "close", None)
+        if close is not None:
+            close()
+
+
+class LogMap(_CodecMixin, PoolMapABC):
+    """
+    Append-only log storage for pools larger than memory. Data to be
+    stored can only be bytes-like objects, unless a codec turns them
+    into bytes.
+
+    Every ``put`` and ``delete`` appends a record to the log file, and
+    only a dict from key to the position of the value stays in memory.
+    ``get`` returns a read-only ``memoryview`` into a memory map of the
+    log, without copying; a view keeps its map alive, so release it 
+    (or copy it with ``bytes``) when done. The index is saved to a 
+    sidecar ``.idx`` file on ``close``, so reopening only replays the 
+    records appended since. ``compact`` rewrites the log without the 
+    overwritten and deleted records.
+    """
+    LOG_MAGIC = b"RKLOG\x00\x00\x01"
+    INDEX_MAGIC = b"RKIDX\x00\x00\x01"
+    # magic, generation
+    _LOG_HEADER = struct.Struct("<8sQ")
+    # kind, key, length of the value
+    _RECORD = struct.Struct("<BqI")
+    # magic, generation, log size, garbage bytes
+    _INDEX_HEADER = struct.Struct("<8sQQQ")
+    # key, offset of the value, length of the value
+    _INDEX_ENTRY = struct.Struct("<qQI")
+    _PUT = 1
+    _DELETE = 0
+
+    def __init__(self, path="./reskeeper.log", codec=None, lazy=False):
+        """
+        :param path: str, path of the log file, the index is kept in
+            ``path + ".idx"``
+        :param codec: Codec or its name, see ``reskeeper.codecs``; 
+            ``get`` then returns decoded data, whose out-of-band pickle
+            buffers are still views of the log
+        :param lazy: bool, return ``codecs.Lazy`` values, decoded when
+            the data of a resource is first read
+        """
+        self._init_codec(codec, lazy)
+        self.path = path
+        self.index_path = path + ".idx"
+        # key -> (offset of the value, length of the value)
+        self.index = dict()
+        # bytes taken by overwritten and deleted records
+        self.garbage = 0
+        self._lock = threading.RLock()
+        self._mm = None
+        self._mapped = 0
+        self._compact_lock = threading.Lock()
+        self._compactor = None
+        self._stop = threading.Event()
+        self._open()
+
+    def _open(self):
+        self._file = open(self.path, "a+b")
+        self._size = self._file.seek(0, os.SEEK_END)
+        if self._size == 0:
+            self.generation = struct.unpack("<Q", os.urandom(8))[0]
+            self._file.write(self._LOG_HEADER.pack(self.LOG_MAGIC, 
+                                                   self.generation))
+            self._file.flush()
+            self._size = self._LOG_HEADER.size
+            return
+        self._remap()
+        if self._size < self._LOG_HEADER.size:
+            raise ValueError("{0} is not a LogMap file".format(self.path))
+        magic, self.generation = self._LOG_HEADER.unpack_from(self._mm, 0)
+        if magic != self.LOG_MAGIC:
+            raise ValueError("{0} is not a LogMap file".format(self.path))
+        start = self._load_index()
+        end = self._replay(self._mm, start, self._size, self.index)
+        if end < self._size:
+            # a record cut short by a crash
+            self._mm = None
+            self._file.truncate(end)
+            self._size = end
+            self._remap()
+
+    def _load_index(self):
+        # load the saved index if it matches the log, return the offset
+        # of the first record it does not cover
+        try:
+            with open(self.index_path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return self._LOG_HEADER.size
+        header = self._INDEX_HEADER
+        if len(data) >= header.size:
+            magic, generation, log_size, garbage = header.unpack_from(data)
+            if (magic == self.INDEX_MAGIC and generation == self.generation
+                    and log_size <= self._size and 
+                    (len(data) - header.size) % self._INDEX_ENTRY.size == 0):
+                self.index = {key: (offset, length) for key, offset, length
+                    in self._INDEX_ENTRY.iter_unpack(data[header.size:])}
+                self.garbage = garbage
+                return log_size
+        return self._LOG_HEADER.size
+
+    def _replay(self, mm, pos, end, index):
+        # apply the records between pos and end to index, return where
+        # the last complete record ends
+        record = self._RECORD
+        while pos + record.size <= end:
+            kind, key, length = record.unpack_from(mm, pos)
+            value_pos = pos + record.size
+            if value_pos + length > end:
+                break
+            old = index.pop(key, None)
+            if old is not None:
+                self.garbage += record.size + old[1]
+            if kind == self._PUT:
+                index[key] = (value_pos, length)
+            else:
+                self.garbage += record.size
+            pos = value_pos + length
+        return pos
+
+    def _remap(self):
+        # map the whole log; views of the old map keep it alive
+        self._file.flush()
+        if self._size:
+            self._mm = mmap.mmap(self._file.fileno(), 0, 
+                                 access=mmap.ACCESS_READ)
+            self._mapped = len(self._mm)
+
+    def __len__(self):
+        return len(self.index)
+
+    def get(self, key):
+        with self._lock:
+            entry = self.index.get(key)
+            if entry is None:
+                return None
+            offset, length = entry
+            if offset + length > self._mapped:
+                self._remap()
+            return self._decode(memoryview(self._mm)[offset:offset + length])
+
+    def get_many(self, keys):
+        with self._lock:
+            return [self.get(key) for key in keys]
+
+    def _append(self, kind, key, val):
+        length = val.nbytes if val is not None else 0
+        self._file.write(self._RECORD.pack(kind, key, length))
+        if val is not None:
+            self._file.write(val)
+        old = self.index.pop(key, None)
+        if old is not None:
+            self.garbage += self._RECORD.size + old[1]
+        if kind == self._PUT:
+            self.index[key] = (self._size + self._RECORD.size, length)
+        else:
+            self.garbage += self._RECORD.size
+        self._size += self._RECORD.size + length
+
+    def _view(self, val):
+        if self.codec is not None:
+            val = self.codec.encode(val)
+        elif not isinstance(val, (bytes, bytearray, memoryview)):
+            raise TypeError('Argument "val" should be bytes-like')
+        return memoryview(val).cast("B")
+
+    def put(self, key, val):
+        val = self._view(val)
+        with self._lock:
+            self._append(self._PUT, key, val)
+
+    def put_many(self, items):
+        items = [(key, self._view(val)) for key, val in items]
+        with self._lock:
+            for key, val in items:
+                self._append(self._PUT, key, val)
+
+    def delete(self, key):
+        with self._lock:
+            if key not in self.index:
+                raise KeyError("log has no record with key: " + str(key))
+            self._append(self._DELETE, key, None)
+
+    def flush(self):
+        """
+        Write the appended records and the index to disk
+        """
+        with self._lock:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.save_index()
+
+    def save_index(self):
+        """
+        Save the index to the sidecar file, so the next open does not
+        need to read the whole log
+        """
+        with self._lock:
+            self._file.flush()
+            entry = self._INDEX_ENTRY
+            data = [self._INDEX_HEADER.pack(self.INDEX_MAGIC, 
+                self.generation, self._size, self.garbage)]
+            data.extend(entry.pack(key, offset, length) 
+                        for key, offset, length in 
+                        ((k, v[0], v[1]) for k, v in self.index.items()))
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(b"".join(data))
+            os.replace(tmp_path, self.index_path)
+
+    def compact(self):
+        """
+        Rewrite the log with only the live records. Records appended 
+        while the live ones are copied are carried over at the end, so
+        ``get`` and ``put`` are only blocked for that last part.
+
+        :return: int, number of bytes reclaimed
+        """
+        with self._compact_lock:
+            with self._lock:
+                if self._mapped < self._size:
+                    self._remap()
+                view = memoryview(self._mm)
+                start_size = self._size
+                snapshot = sorted(self.index.items(), 
+                                  key=lambda kv: kv[1][0])
+            generation = struct.unpack("<Q", os.urandom(8))[0]
+            tmp_path = self.path + ".compact"
+            new_index = dict()
+            record = self._RECORD
+            out = open(tmp_path, "wb")
+            try:
+                out.write(self._LOG_HEADER.pack(self.LOG_MAGIC, generation))
+                pos = self._LOG_HEADER.size
+                for key, (offset, length) in snapshot:
+                    out.write(record.pack(self._PUT, key, length))
+                    out.write(view[offset:offset + length])
+                    new_index[key] = (pos + record.size, length)
+                    pos += record.size + length
+                view.release()
+                with self._lock:
+                    # the records appended meanwhile, copied as they are
+                    if self._mapped < self._size:
+                        self._remap()
+                    with memoryview(self._mm) as view:
+                        out.write(view[start_size:self._size])
+                    out.flush()
+                    os.fsync(out.fileno())
+                    out.close()
+                    old_size = self._size
+                    os.replace(tmp_path, self.path)
+                    self._file.close()
+                    self._file = open(self.path, "a+b")
+                    self._size = self._file.seek(0, os.SEEK_END)
+                    self.generation = generation
+                    self.index = new_index
+                    self.garbage = 0
+                    self._remap()
+                    self._replay(self._mm, pos, self._size, self.index)
+                    self.save_index()
+                    return old_size - self._size
+            finally:
+                if not out.closed:
+                    out.close()
+                    os.remove(tmp_path)
+
+    def start_compaction(self, interval=60.0, min_garbage_ratio=0.5):
+        """
+        Compact the log on a daemon thread whenever the garbage grows
+        over a share of it.
+
+        :param interval: float, seconds between two checks
+        :param min_garbage_ratio: float, share of the log taken by 
+            garbage that triggers a compaction
+        """
+        if self._compactor is not None:
+            raise RuntimeError("compaction already started")
+        self._stop.clear()
+        self._compactor = threading.Thread(target=self._compact_loop,
+            args=(interval, min_garbage_ratio), daemon=True)
+        self._compactor.start()
+
+    def _compact_loop(self, interval, min_garbage_ratio):
+        while not self._stop.wait(interval):
+            if self.garbage >= self._size * min_garbage_ratio:
+                self.compact()
+
+    def stop_compaction(self):
+        """
+        Stop the thread started by ``start_compaction``
+        """
+        if self._compactor is None:
+            return
+        self._stop.set()
+        self._compactor.join()
+        self._compactor = None
+
+    def close(self):
+        """
+        Save the index and close the log
+        """
+        self.stop_compaction()
+        with self._lock:
+            self.save_index()
+            self._file.close()
+            self._mm = None
+            self._mapped = 0
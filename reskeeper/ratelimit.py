@@ -0,0 +1,113 @@
+# coding: utf-8
+"""
+This module contains the book keeping of resources cooling down after
+release, used by ``ResourceKeeper`` to rate limit the reuse of each
+resource.
+
+"""
+
+import heapq
+import itertools
+
+
+class Cooldown:
+    """
+    Decides when a released resource may be handed out again, and holds
+    the resources that may not be yet in a heap ordered by that time.
+
+    Two limits can be combined: a minimum interval between the release
+    of a resource and its next use, and a token bucket per resource 
+    allowing ``rate`` uses per second with bursts of ``burst`` uses.
+    """
+
+    def __init__(self, min_interval=None, rate=None, burst=1):
+        """
+        :param min_interval: float, seconds a released resource rests
+        :param rate: float, uses per second allowed for each resource
+        :param burst: int, uses allowed at once for each resource
+        """
+        if rate is not None and rate <= 0:
+            raise ValueError("rate should be positive")
+        if burst < 1:
+            raise ValueError("burst should be at least 1")
+        self.min_interval = min_interval
+        self.rate = rate
+        self.burst = burst
+        self.heap = list()
+        self.cooling = set()
+        self.buckets = dict()
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return len(self.cooling)
+
+    def __contains__(self, res_id):
+        return res_id in self.cooling
+
+    def take(self, res_id, now):
+        """
+        Record that a resource is handed out, consuming one token of
+        its bucket.
+        """
+        if self.rate is None:
+            return
+        bucket = self.buckets.get(res_id)
+        if bucket is None:
+            tokens = self.burst
+        else:
+            tokens = min(self.burst, 
+                bucket[0] + (now - bucket[1]) * self.rate)
+        self.buckets[res_id] = (tokens - 1, now)
+
+    def schedule(self, res_id, now):
+        """
+        Put a released resource to rest if it is not eligible yet.
+
+        :return: bool, True if the resource is cooling down, False if it
+            can be made available right now
+        """
+        ready_at = now
+        if self.min_interval:
+            ready_at = now + self.min_interval
+        bucket = self.buckets.get(res_id)
+        if bucket is not None:
+            tokens = bucket[0] + (now - bucket[1]) * self.rate
+            if tokens < 1:
+                ready_at = max(ready_at, now + (1 - tokens) / self.rate)
+        if ready_at <= now:
+            return False
+        self.cooling.add(res_id)
+        heapq.heappush(self.heap, (ready_at, next(self._seq), res_id))
+        return True
+
+    def ready(self, now):
+        """
+        Return and stop tracking the resources done cooling down
+
+        :param now: float, current monotonic time
+        :return: list of res_ids
+        """
+        heap = self.heap
+        res_ids = []
+        while heap and heap[0][0] <= now:
+            res_id = heapq.heappop(heap)[2]
+            if res_id in self.cooling:
+                self.cooling.discard(res_id)
+                res_ids.append(res_id)
+        return res_ids
+
+    def next_ready(self):
+        """
+        Return the earliest time a cooling resource is ready, or None
+        """
+        heap = self.heap
+        while heap and heap[0][2] not in self.cooling:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def forget(self, res_id):
+        """
+        Stop tracking a resource, e.g. when it is removed
+        """
+        self.cooling.discard(res_id)
+        self.buckets.pop(res_id, None)
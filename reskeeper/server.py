@@ -0,0 +1,299 @@
+# coding: utf-8
+"""
+This module contains a keeper server, which shares one Resource Keeper
+with processes on other hosts through a newline delimited JSON protocol
+over TCP. See ``reskeeper.client`` for the client.
+
+Each request is one JSON object on one line, ``{"id": 1, "op": "get",
+"args": {...}}``, and each response echoes the id, ``{"id": 1, "ok": 
+true, "result": ...}`` or ``{"id": 1, "ok": false, "error": "KeyError",
+"message": "..."}``. Requests of one connection run concurrently, so 
+responses may come back in a different order than the requests.
+
+A connection may open with ``{"id": 0, "op": "hello", "args": 
+{"session": "..."}}`` to join a session: the connections of one session
+share the resources they hold, so a client with a pool of connections
+can release through any of them.
+
+"""
+
+import argparse
+import asyncio
+import json
+
+from reskeeper.aio import AsyncResourceKeeper
+from reskeeper.core import Resource
+
+
+class KeeperServer:
+    """
+    Serve an ``AsyncResourceKeeper`` over TCP.
+
+    Resources checked out through a connection are released when the
+    connection closes, so a crashed client does not leak them. A
+    connection can only release the resources it, or its session,
+    checked out; those of a session are released when its last
+    connection closes.
+    """
+
+    def __init__(self, keeper=None, host="127.0.0.1", port=7890,
+                 release_on_disconnect=True, limit=16 * 1024 * 1024):
+        """
+        :param keeper: AsyncResourceKeeper, by default an empty one
+        :param host: str, address to listen on
+        :param port: int, port to listen on, 0 to pick a free one
+        :param release_on_disconnect: bool, release the resources held
+            by a connection when it closes
+        :param limit: int, longest request line in bytes; longer ones 
+            are skipped and answered with a ValueError
+        """
+        self.keeper = keeper if keeper is not None else AsyncResourceKeeper()
+        self.host = host
+        self.port = port
+        self.release_on_disconnect = release_on_disconnect
+        self.limit = limit
+        self.server = None
+        # res_id -> set of res_ids of the connection holding it
+        self._holders = dict()
+        # session -> [set of res_ids held, number of connections]
+        self._sessions = dict()
+
+    async def start(self):
+        """
+        Start listening. ``port`` is updated with the bound port.
+        """
+        self.server = await asyncio.start_server(
+            self._handle, self.host, self.port, limit=self.limit)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.server
+
+    async def serve_forever(self):
+        """
+        Start listening and serve until cancelled
+        """
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        """
+        Stop listening
+        """
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    async def _handle(self, reader, writer):
+        held = set()
+        session = None
+        tasks = set()
+        try:
+            line = await self._readline(reader)
+            hello = self._parse_hello(line) if line else None
+            if hello is not None:
+                req_id, session = hello
+                held = self._join(session)
+                self._write(writer, {"id": req_id, "ok": True, 
+                                     "result": None})
+                line = await self._readline(reader)
+            while line != b"":
+                if line is None:
+                    self._write(writer, {"id": None, "ok": False, 
+                        "error": "ValueError", "message": 
+                        "request longer than {0} bytes".format(self.limit)})
+                else:
+                    task = asyncio.ensure_future(
+                        self._respond(line, held, writer))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                line = await self._readline(reader)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for task in list(tasks):
+                task.cancel()
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            if session is not None and self._leave(session):
+                # other connections of the session still hold them
+                held = ()
+            if self.release_on_disconnect:
+                for res_id in list(held):
+                    self._release(res_id)
+            writer.close()
+
+    @staticmethod
+    async def _readline(reader):
+        # the next line, b"" at the end of the stream, or None for a line
+        # longer than the limit, which is read through and dropped
+        try:
+            return await reader.readuntil(b"\n")
+        except asyncio.IncompleteReadError as e:
+            return e.partial
+        except asyncio.LimitOverrunError as e:
+            consumed = e.consumed
+        while True:
+            await reader.readexactly(consumed)
+            try:
+                await reader.readuntil(b"\n")
+                return None
+            except asyncio.LimitOverrunError as e:
+                consumed = e.consumed
+
+    @staticmethod
+    def _write(writer, response):
+        writer.write(json.dumps(response).encode("utf8") + b"\n")
+
+    @staticmethod
+    def _parse_hello(line):
+        # (request id, session) if the line is a hello request
+        try:
+            request = json.loads(line)
+            if request.get("op") == "hello":
+                return request.get("id"), str(request["args"]["session"])
+        except (ValueError, AttributeError, KeyError, TypeError):
+            pass
+        return None
+
+    def _join(self, session):
+        entry = self._sessions.get(session)
+        if entry is None:
+            entry = self._sessions[session] = [set(), 0]
+        entry[1] += 1
+        return entry[0]
+
+    def _leave(self, session):
+        # return True if the session still has connections
+        entry = self._sessions[session]
+        entry[1] -= 1
+        if entry[1]:
+            return True
+        del self._sessions[session]
+        return False
+
+    async def _respond(self, line, held, writer):
+        req_id = None
+        try:
+            request = json.loads(line)
+            req_id = request.get("id")
+            handler = self.OPS[request["op"]]
+            result = await handler(self, held, **request.get("args", {}))
+            response = {"id": req_id, "ok": True, "result": result}
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            response = {"id": req_id, "ok": False,
+                "error": type(e).__name__, "message": str(e)}
+        self._write(writer, response)
+        await writer.drain()
+
+    def _checkout(self, resource, held):
+        held.add(resource.res_id)
+        self._holders[resource.res_id] = held
+        return resource.to_dict()
+
+    def _forget(self, res_id):
+        held = self._holders.pop(res_id, None)
+        if held is not None:
+            held.discard(res_id)
+
+    def _release(self, res_id):
+        self._forget(res_id)
+        self.keeper.release(Resource(res_id, None))
+
+    @staticmethod
+    def _check_held(held, res_ids):
+        for res_id in res_ids:
+            if res_id not in held:
+                raise KeyError("Resource {0} is not held by this connection"
+                               .format(res_id))
+
+    async def _op_get(self, held, timeout=None, block=True):
+        if block:
+            resource = await self.keeper.acquire(timeout)
+        else:
+            resource = self.keeper.get()
+        if resource is None:
+            return None
+        try:
+            return self._checkout(resource, held)
+        except BaseException:
+            self.keeper.release(resource)
+            raise
+
+    async def _op_get_many(self, held, n, all_or_nothing=False):
+        return [self._checkout(resource, held) 
+                for resource in self.keeper.get_many(n, all_or_nothing)]
+
+    async def _op_release(self, held, res_id):
+        self._check_held(held, (res_id,))
+        self._release(res_id)
+
+    async def _op_release_many(self, held, res_ids):
+        # check them all first, so a bad id releases nothing
+        self._check_held(held, res_ids)
+        for res_id in res_ids:
+            self._release(res_id)
+
+    async def _op_add(self, held, data):
+        self.keeper.add(data)
+        return self.keeper._max_id
+
+    async def _op_remove(self, held, res_id):
+        self.keeper.remove(Resource(res_id, None))
+        # its holder must not release it on disconnect
+        self._forget(res_id)
+
+    async def _op_stats(self, held):
+        return {"size": self.keeper.size, "avail_num": self.keeper.avail_num}
+
+    OPS = {
+        "get": _op_get,
+        "get_many": _op_get_many,
+        "release": _op_release,
+        "release_many": _op_release_many,
+        "add": _op_add,
+        "remove": _op_remove,
+        "stats": _op_stats,
+    }
+
+
+def main(argv=None):
+    """
+    Command line entry point: ``reskeeper`` or ``python -m reskeeper``
+    """
+    parser = argparse.ArgumentParser(
+        prog="reskeeper", description="Run a resource keeper server.")
+    parser.add_argument("--host", default="127.0.0.1",
+        help="address to listen on (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=7890,
+        help="port to listen on (default: %(default)s)")
+    parser.add_argument("--json", action="append", default=[],
+        help="load resources from a json file holding an array")
+    parser.add_argument("--csv", action="append", default=[],
+        help="load resources from a csv file")
+    args = parser.parse_args(argv)
+
+    keeper = AsyncResourceKeeper()
+    for file_dir in args.json:
+        keeper.load_json_file(file_dir)
+    for file_dir in args.csv:
+        keeper.load_csv_file(file_dir)
+    server = KeeperServer(keeper, args.host, args.port)
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(server.start())
+        print("reskeeper serving {0} resources on {1}:{2}".format(
+            keeper.size, server.host, server.port))
+        loop.run_until_complete(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        loop.run_until_complete(server.close())
+        loop.close()
+
+
+if __name__ == "__main__":
+    main()
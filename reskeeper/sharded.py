@@ -0,0 +1,312 @@
+# coding: utf-8
+"""
+This module contains a Resource Keeper split into shards, so threads
+working on different shards do not wait for each other's lock.
+
+"""
+
+import itertools
+import os
+import threading
+import time
+
+from reskeeper.core import Checkout, Lease, ResourceKeeper
+
+
+class ShardedResourceKeeper:
+    """
+    Resource manager that can be shared among many threads.
+
+    The resources are spread over ``num_shards`` inner ``ResourceKeeper``
+    each guarded by its own lock. A thread gets from its home shard
+    first and steals from the other shards when it is empty. The res_id
+    of a resource encodes its shard, ``res_id % num_shards``, so
+    ``release`` goes straight to the right shard.
+    """
+
+    def __init__(self, resources=None, num_shards=None, **kwargs):
+        """
+        Instanciate a sharded resource manager
+
+        :param resources: iterable of any resources
+        :param num_shards: int, number of shards, by default the number
+            of CPUs
+        :param kwargs: arguments of each shard's ``ResourceKeeper``,
+            except ``pool_map`` and ``avail_set`` which cannot be shared;
+            pass ``pool_map_factory`` / ``avail_set_factory`` callables
+            instead
+        """
+        if num_shards is None:
+            num_shards = os.cpu_count() or 4
+        if num_shards < 1:
+            raise ValueError("num_shards must be at least 1")
+        if "pool_map" in kwargs or "avail_set" in kwargs:
+            raise TypeError("pool_map and avail_set cannot be shared by "
+                            "shards, use pool_map_factory and "
+                            "avail_set_factory")
+        pool_map_factory = kwargs.pop("pool_map_factory", None)
+        avail_set_factory = kwargs.pop("avail_set_factory", None)
+        self.num_shards = num_shards
+        self.shards = [ResourceKeeper(
+            pool_map=pool_map_factory() if pool_map_factory else None,
+            avail_set=avail_set_factory() if avail_set_factory else None,
+            **kwargs) for _ in range(num_shards)]
+        self._locks = [threading.Lock() for _ in range(num_shards)]
+        # threads waiting because every shard was empty
+        self._idle = threading.Condition(threading.Lock())
+        self._waiting = 0
+        self._picky_waiters = 0
+        self._local = threading.local()
+        self._homes = itertools.count()
+        self._next_shard = 0
+        if resources:
+            self.load(resources)
+
+    @property
+    def size(self):
+        return sum(shard.size for shard in self.shards)
+
+    @property
+    def avail_num(self):
+        return sum(shard.avail_num for shard in self.shards)
+
+    @property
+    def cooling_num(self):
+        return sum(shard.cooling_num for shard in self.shards)
+
+    def _home(self):
+        home = getattr(self._local, "home", None)
+        if home is None:
+            home = self._local.home = next(self._homes) % self.num_shards
+        return home
+
+    def _to_global(self, index, resource):
+        resource.res_id = resource.res_id * self.num_shards + index
+        if isinstance(resource, Lease):
+            resource.keeper = self
+        return resource
+
+    def _try_get(self, ttl, where):
+        # visit the home shard, then steal from the others in turn
+        home = self._home()
+        for k in range(self.num_shards):
+            index = (home + k) % self.num_shards
+            shard = self.shards[index]
+            if (shard.avail_num == 0 and shard._reaper is None and
+                    shard._cooldown is None and not shard._dropped):
+                # nothing to hand out and nothing due to come back
+                continue
+            with self._locks[index]:
+                resource = shard._take(ttl, where)
+            if resource is not None:
+                return self._to_global(index, resource)
+        return None
+
+    def _next_event(self):
+        times = []
+        for lock, shard in zip(self._locks, self.shards):
+            # it looks at the shard's leases and cooldowns
+            with lock:
+                event = shard._next_event()
+            if event is not None:
+                times.append(event)
+        return min(times) if times else None
+
+    def acquire(self, block=True, timeout=None, ttl=None, where=None):
+        """
+        Return a context manager (or decorator) that gets a resource on
+        enter and releases it on exit, see ``ResourceKeeper.acquire``.
+        Raise TimeoutError on enter if no resource became available in
+        time.
+        """
+        return Checkout(self, (block, timeout, ttl, where), TimeoutError)
+
+    def get(self, block=True, timeout=None, ttl=None, where=None):
+        """
+        Get a resource from the home shard of the calling thread, or
+        from another shard if it is empty.
+
+        :param block: bool, wait for a resource if none is available
+        :param timeout: float, seconds to wait at most, None to wait forever
+        :param ttl: float, if given, return a ``Lease``, see
+            ``ResourceKeeper.get``
+        :param where: dict, only return a matching resource, see
+            ``ResourceKeeper.get``
+        :return: a resource, or None if none became available in time
+        """
+        resource = self._try_get(ttl, where)
+        if resource is not None or not block:
+            return resource
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._idle:
+            # counted before looking again, so a release in between
+            # is sure to notify
+            self._waiting += 1
+            if where:
+                self._picky_waiters += 1
+            try:
+                while True:
+                    resource = self._try_get(ttl, where)
+                    if resource is not None:
+                        return resource
+                    wait = None if end is None else end - time.monotonic()
+                    if wait is not None and wait <= 0:
+                        return None
+                    event = self._next_event()
+                    if event is not None and (wait is None or event < wait):
+                        wait = event
+                    self._idle.wait(wait)
+            finally:
+                self._waiting -= 1
+                if where:
+                    self._picky_waiters -= 1
+
+    def get_many(self, n, all_or_nothing=False, ttl=None):
+        """
+        Get a batch of resources without waiting, from the home shard
+        first.
+
+        :param n: int, number of resources wanted
+        :param all_or_nothing: bool, if True return an empty list unless
+            all n resources are available
+        :param ttl: float, if given, return leases, see
+            ``ResourceKeeper.get``
+        :return: list of at most n resources
+        """
+        home = self._home()
+        order = [(home + k) % self.num_shards
+                 for k in range(self.num_shards)]
+        if all_or_nothing:
+            # hold every lock, in a fixed order, so the count stays true
+            for lock in self._locks:
+                lock.acquire()
+            try:
+                for shard in self.shards:
+                    shard._tick()
+                if self.avail_num < n:
+                    return []
+                return self._get_many(order, n, ttl)
+            finally:
+                for lock in self._locks:
+                    lock.release()
+        return self._get_many(order, n, ttl, locked=False)
+
+    def _get_many(self, order, n, ttl, locked=True):
+        resources = []
+        for index in order:
+            wanted = n - len(resources)
+            if wanted <= 0:
+                break
+            shard = self.shards[index]
+            if locked:
+                got = shard.get_many(wanted, ttl=ttl)
+            else:
+                with self._locks[index]:
+                    got = shard.get_many(wanted, ttl=ttl)
+            resources.extend(self._to_global(index, res) for res in got)
+        return resources
+
+    def _locate(self, resource):
+        # shard index and local res_id of a resource handed out
+        return resource.res_id % self.num_shards, \
+            resource.res_id // self.num_shards
+
+    def release(self, resourse):
+        """
+        Release a resource to its shard and wake up one waiting thread.
+
+        :param resource: Resource, the resource to be released
+        """
+        if resourse.res_id is None:
+            # already released
+            return
+        index, resourse.res_id = self._locate(resourse)
+        with self._locks[index]:
+            self.shards[index].release(resourse)
+        self._notify()
+
+    def release_many(self, resources):
+        """
+        Release a batch of resources.
+
+        :param resources: iterable of Resource
+        """
+        for resource in resources:
+            self.release(resource)
+
+    def renew(self, lease, ttl=None):
+        """
+        Push back the deadline of a lease, see ``ResourceKeeper.renew``
+        """
+        global_id = lease.res_id
+        index, lease.res_id = self._locate(lease)
+        try:
+            with self._locks[index]:
+                return self.shards[index].renew(lease, ttl)
+        finally:
+            lease.res_id = global_id
+
+    def add(self, data):
+        """
+        Add data to the next shard in turn and wake up one waiting thread
+
+        :param resource: obj, the resource to be added
+        """
+        index = self._next_shard
+        self._next_shard = (index + 1) % self.num_shards
+        with self._locks[index]:
+            self.shards[index].add(data)
+        self._notify()
+
+    def remove(self, resource):
+        """
+        Remove the resource from the resources pool
+
+        :param resource: Resource, the resource to be removed
+        """
+        if resource.res_id is None:
+            raise KeyError("No resource with res_id: None")
+        global_id = resource.res_id
+        index, resource.res_id = self._locate(resource)
+        try:
+            with self._locks[index]:
+                self.shards[index].remove(resource)
+        except KeyError:
+            raise KeyError("No resource with res_id: " + str(global_id))
+        finally:
+            resource.res_id = global_id
+
+    def load(self, resources_data, batch_size=1000):
+        """
+        Load a batch of data, dealt to the shards in turn, and wake up
+        waiting threads
+
+        :param resources_data: should be iterable
+        :param batch_size: int, number of items per ``put_many`` call of
+            each shard
+        """
+        iterator = iter(resources_data)
+        while True:
+            batch = list(itertools.islice(iterator,
+                                          batch_size * self.num_shards))
+            if not batch:
+                break
+            start = self._next_shard
+            for k in range(self.num_shards):
+                part = batch[k::self.num_shards]
+                if not part:
+                    break
+                index = (start + k) % self.num_shards
+                with self._locks[index]:
+                    self.shards[index].load(part, batch_size)
+            self._next_shard = (start + len(batch)) % self.num_shards
+        self._notify(every=True)
+
+    def _notify(self, every=False):
+        if not self._waiting:
+            return
+        with self._idle:
+            if every or self._picky_waiters:
+                self._idle.notify_all()
+            else:
+                self._idle.notify()
@@ -0,0 +1,168 @@
+# coding: utf-8
+"""
+This module contains a Resource Keeper shared by several processes.
+The book keeping lives in a ``multiprocessing.shared_memory`` block, 
+so processes hand resources to each other without a broker process.
+Requires python 3.8 or later.
+
+"""
+
+import multiprocessing
+import time
+from multiprocessing import shared_memory
+
+from reskeeper import utils
+from reskeeper.core import Resource
+
+# layout of the int64 header at the start of the shared block
+_HEAD, _COUNT, _CAPACITY = 0, 1, 2
+_HEADER_SIZE = 3
+
+
+class SharedResourceKeeper:
+    """
+    Resource manager shared by processes of one ``multiprocessing`` 
+    program.
+
+    The available res_ids are a ring buffer of int64 in shared memory
+    and a flag byte per resource marks which are available, all guarded
+    by one cross-process condition variable. The data is a read-only
+    tuple every process gets a copy of when it starts, so resources 
+    cannot be added or removed once the keeper is created.
+
+    Pass the keeper to worker processes when they are created, e.g. as
+    an argument of ``multiprocessing.Process`` or in ``initargs`` of 
+    ``multiprocessing.Pool``. Call ``unlink`` in the creating process
+    when all processes are done.
+    """
+
+    def __init__(self, resources, copy_policy="deep", context=None):
+        """
+        :param resources: iterable of any resources
+        :param copy_policy: str, see ``ResourceKeeper``
+        :param context: multiprocessing context the workers are started
+            from, by default the global one
+        """
+        self.data = tuple(resources)
+        self.copy_policy = copy_policy
+        self._copy = utils.get_copier(copy_policy)
+        if context is None:
+            context = multiprocessing
+        self._cond = context.Condition(context.Lock())
+        capacity = len(self.data)
+        self._shm = shared_memory.SharedMemory(
+            create=True, size=8 * (_HEADER_SIZE + capacity) + capacity + 1)
+        self._owner = True
+        self._attach()
+        self._ints[_HEAD] = 0
+        self._ints[_COUNT] = capacity
+        self._ints[_CAPACITY] = capacity
+        for i in range(capacity):
+            self._ints[_HEADER_SIZE + i] = i + 1
+            self._flags[i + 1] = 1
+
+    def _attach(self):
+        capacity = len(self.data)
+        ints_size = 8 * (_HEADER_SIZE + capacity)
+        self._ints = self._shm.buf[:ints_size].cast("q")
+        self._flags = self._shm.buf[ints_size:ints_size + capacity + 1]
+
+    def __getstate__(self):
+        return {
+            "data": self.data,
+            "copy_policy": self.copy_policy,
+            "cond": self._cond,
+            "name": self._shm.name,
+        }
+
+    def __setstate__(self, state):
+        self.data = state["data"]
+        self.copy_policy = state["copy_policy"]
+        self._copy = utils.get_copier(self.copy_policy)
+        self._cond = state["cond"]
+        # workers share the resource tracker of the creating process, 
+        # which removes the block at exit if ``unlink`` was never called
+        self._shm = shared_memory.SharedMemory(name=state["name"])
+        self._owner = False
+        self._attach()
+
+    @property
+    def size(self):
+        """
+        Number of resources in the pool
+        """
+        return len(self.data)
+
+    @property
+    def avail_num(self):
+        """
+        Number of available resources
+        """
+        return self._ints[_COUNT]
+
+    def get(self, block=True, timeout=None):
+        """
+        Get a resource from resource pool.
+
+        :param block: bool, wait for a resource if none is available
+        :param timeout: float, seconds to wait at most, None to wait forever
+        :return: a resource, or None if none became available in time
+        """
+        ints = self._ints
+        with self._cond:
+            if ints[_COUNT] == 0:
+                if not block:
+                    return None
+                end = None if timeout is None else time.monotonic() + timeout
+                while ints[_COUNT] == 0:
+                    wait = None if end is None else end - time.monotonic()
+                    if wait is not None and wait <= 0:
+                        return None
+                    self._cond.wait(wait)
+            head = ints[_HEAD]
+            res_id = ints[_HEADER_SIZE + head]
+            ints[_HEAD] = (head + 1) % ints[_CAPACITY]
+            ints[_COUNT] -= 1
+            self._flags[res_id] = 0
+        return Resource(res_id, self._copy(self.data[res_id - 1]))
+
+    def release(self, resourse):
+        """
+        Release a resource and wake up one process waiting in ``get``.
+
+        :param resource: Resource, the resource to be released
+        """
+        res_id = resourse.res_id
+        if res_id is None or not 0 < res_id <= len(self.data):
+            raise KeyError("No resource with res_id: " + str(res_id))
+        ints = self._ints
+        with self._cond:
+            if not self._flags[res_id]:
+                self._flags[res_id] = 1
+                tail = (ints[_HEAD] + ints[_COUNT]) % ints[_CAPACITY]
+                ints[_HEADER_SIZE + tail] = res_id
+                ints[_COUNT] += 1
+                self._cond.notify()
+        resourse.destroy()
+
+    def close(self):
+        """
+        Detach this process from the shared memory block
+        """
+        if self._ints is None:
+            return
+        self._ints.release()
+        self._flags.release()
+        self._ints = self._flags = None
+        self._shm.close()
+
+    def unlink(self):
+        """
+        Detach from and destroy the shared memory block. Call it once,
+        in the process that created the keeper, after the workers are
+        done.
+        """
+        self.close()
+        if self._owner:
+            self._shm.unlink()
+            self._owner = False
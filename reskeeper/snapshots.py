@@ -0,0 +1,112 @@
+# coding: utf-8
+"""
+This module contains the snapshot file format of Resource Keeper, see
+``ResourceKeeper.snapshot`` and ``ResourceKeeper.restore``.
+
+A snapshot is a header followed by sections, each a flat array or a
+pickle, so reading one is a few bulk copies out of a memory map:
+
+- header: magic, version, flags, max_id and the section lengths
+- available res_ids, int64 each
+- leased res_ids, int64 each, and their remaining seconds, float64 each
+- pool data, one pickled dict from res_id to data
+
+"""
+
+import mmap
+import os
+import pickle
+import struct
+import sys
+from array import array
+
+MAGIC = b"RKSNAP\x00\x00"
+VERSION = 1
+# flags
+BIG_ENDIAN = 1
+
+# magic, version, flags, max_id, available, leases, data bytes
+HEADER = struct.Struct("<8sIIqqqq")
+
+
+class Snapshot:
+    """
+    Content of a snapshot file
+    """
+
+    def __init__(self, max_id, avail_ids, lease_ids, lease_remaining, data):
+        """
+        :param max_id: int, largest res_id ever given
+        :param avail_ids: array('q') of available res_ids
+        :param lease_ids: array('q') of leased res_ids
+        :param lease_remaining: array('d') of seconds left on each lease
+        :param data: dict from res_id to data of every resource
+        """
+        self.max_id = max_id
+        self.avail_ids = avail_ids
+        self.lease_ids = lease_ids
+        self.lease_remaining = lease_remaining
+        self.data = data
+
+
+def write(path, snapshot):
+    """
+    Write a snapshot file, atomically replacing an existing one
+
+    :param path: str, path of the snapshot file
+    :param snapshot: Snapshot
+    """
+    payload = pickle.dumps(snapshot.data, pickle.HIGHEST_PROTOCOL)
+    flags = BIG_ENDIAN if sys.byteorder == "big" else 0
+    header = HEADER.pack(MAGIC, VERSION, flags, snapshot.max_id,
+                         len(snapshot.avail_ids), len(snapshot.lease_ids),
+                         len(payload))
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(snapshot.avail_ids)
+        f.write(snapshot.lease_ids)
+        f.write(snapshot.lease_remaining)
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read(path):
+    """
+    Read a snapshot file through a memory map.
+    Raise ValueError if it is not a snapshot of a known version.
+
+    :param path: str, path of the snapshot file
+    :return: Snapshot
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < HEADER.size:
+            raise ValueError("{0} is not a snapshot".format(path))
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            (magic, version, flags, max_id, n_avail, n_leases,
+                data_length) = HEADER.unpack_from(mm)
+            if magic != MAGIC:
+                raise ValueError("{0} is not a snapshot".format(path))
+            if version != VERSION:
+                raise ValueError("snapshot version {0} is not supported"
+                                 .format(version))
+            if HEADER.size + 8 * (n_avail + 2 * n_leases) + data_length \
+                    != size:
+                raise ValueError("snapshot {0} is truncated".format(path))
+            pos = HEADER.size
+            sections = []
+            for typecode, count in (("q", n_avail), ("q", n_leases),
+                                    ("d", n_leases)):
+                section = array(typecode)
+                with memoryview(mm)[pos:pos + 8 * count] as view:
+                    section.frombytes(view)
+                if bool(flags & BIG_ENDIAN) != (sys.byteorder == "big"):
+                    section.byteswap()
+                sections.append(section)
+                pos += 8 * count
+            with memoryview(mm)[pos:pos + data_length] as view:
+                data = pickle.loads(view)
+    return Snapshot(max_id, sections[0], sections[1], sections[2], data)
@@ -1 +1,147 @@
 # coding: utf-8
+"""
+This module contains helpers shared by the other modules.
+
+"""
+
+import copy
+from collections.abc import MutableMapping
+from types import MappingProxyType
+
+from reskeeper.codecs import Lazy
+
+
+def readonly(data):
+    """
+    Return a read-only view of data without copying it when possible:
+    a ``MappingProxyType`` for dicts, a tuple for lists and a frozenset
+    for sets. Other objects are returned as they are. Only the top
+    level is protected, nested containers are not wrapped.
+
+    :param data: obj, data to be protected
+    :return: read-only view of data
+    """
+    if type(data) is Lazy:
+        data = data.decode()
+    if isinstance(data, dict):
+        return MappingProxyType(data)
+    if isinstance(data, list):
+        return tuple(data)
+    if isinstance(data, set):
+        return frozenset(data)
+    return data
+
+
+class CopyOnWriteDict(MutableMapping):
+    """
+    Dict proxy that shares the wrapped dict until it is mutated.
+
+    Reads go to the shared dict, nested containers are handed out
+    through ``readonly``. The first write deep-copies the wrapped dict,
+    so mutations never leak into the pool. Call ``copy`` to get a plain
+    dict.
+    """
+    __slots__ = ("_data", "_copied")
+
+    def __init__(self, data):
+        self._data = data
+        self._copied = False
+
+    def _writable(self):
+        if not self._copied:
+            self._data = copy.deepcopy(self._data)
+            self._copied = True
+        return self._data
+
+    def __getitem__(self, key):
+        value = self._data[key]
+        if self._copied:
+            return value
+        return readonly(value)
+
+    def __setitem__(self, key, value):
+        self._writable()[key] = value
+
+    def __delitem__(self, key):
+        del self._writable()[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __eq__(self, other):
+        if isinstance(other, CopyOnWriteDict):
+            other = other._data
+        return self._data == other
+
+    def __repr__(self):
+        return "CopyOnWriteDict({0!r})".format(self._data)
+
+    def copy(self):
+        """
+        Return a deep copy of the data as a plain dict
+        """
+        return copy.deepcopy(self._data)
+
+
+def copy_on_write(data):
+    """
+    Wrap dicts in ``CopyOnWriteDict``, deep copy other mutable data.
+
+    :param data: obj, data to be handed out
+    """
+    if isinstance(data, dict):
+        return CopyOnWriteDict(data)
+    return _deep_copy(data)
+
+
+def _no_copy(data):
+    return data
+
+
+def _deep_copy(data):
+    # a read-only memoryview, e.g. from ``LogMap``, cannot be changed 
+    # through and cannot be copied by the copy module, and lazy data
+    # is decoded into a new object anyway
+    if type(data) is Lazy or (isinstance(data, memoryview) and 
+                              data.readonly):
+        return data
+    return copy.deepcopy(data)
+
+
+def _shallow_copy(data):
+    if type(data) is Lazy or (isinstance(data, memoryview) and 
+                              data.readonly):
+        return data
+    return copy.copy(data)
+
+
+COPY_POLICIES = {
+    "deep": _deep_copy,
+    "shallow": _shallow_copy,
+    "none": _no_copy,
+    "readonly": readonly,
+    "cow": copy_on_write,
+}
+
+
+# policies that need no copy of data decoded anew by the pool map
+FRESH_SKIPS_COPY = ("deep", "shallow", "cow")
+
+
+def get_copier(policy):
+    """
+    Return the function used to copy resource data for a copy policy.
+
+    :param policy: str, one of ``deep``, ``shallow``, ``none``, 
+        ``readonly`` and ``cow``
+    :return: callable taking the pooled data and returning what is 
+        handed out
+    """
+    try:
+        return COPY_POLICIES[policy]
+    except KeyError:
+        raise ValueError("unknown copy policy: {0!r}, expect one of {1}"
+            .format(policy, ", ".join(COPY_POLICIES)))
@@ -15,6 +15,9 @@ setup(
     author_email="rickyzhu@foxmail.com",
     package="reskeeper",
     python_requires=">=3.6",
+    entry_points={
+        "console_scripts": ["reskeeper = reskeeper.server:main"],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "Programming Language :: Python :: 3.6",
@@ -0,0 +1,98 @@
+import asyncio
+import unittest
+
+from reskeeper.aio import AsyncResourceKeeper
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+class AcquireTestCase(unittest.TestCase):
+
+    def test_acquire_available(self):
+        async def main():
+            keeper = AsyncResourceKeeper(["res1"])
+            res = await keeper.acquire()
+            self.assertEqual(res.data, "res1")
+            self.assertEqual(keeper.avail_num, 0)
+        run(main())
+
+    def test_acquire_timeout(self):
+        async def main():
+            keeper = AsyncResourceKeeper(["res1"])
+            await keeper.acquire()
+            self.assertIsNone(await keeper.acquire(timeout=0.01))
+        run(main())
+
+    def test_release_wakes_waiter(self):
+        async def main():
+            keeper = AsyncResourceKeeper(["res1"])
+            res = await keeper.acquire()
+            task = asyncio.ensure_future(keeper.acquire())
+            await asyncio.sleep(0)
+            self.assertFalse(task.done())
+            keeper.release(res)
+            res2 = await task
+            self.assertEqual(res2.data, "res1")
+        run(main())
+
+    def test_many_waiters_share_pool(self):
+        async def main():
+            keeper = AsyncResourceKeeper(range(3))
+            used = []
+
+            async def worker():
+                async with keeper.lease() as res:
+                    used.append(res.data)
+                    await asyncio.sleep(0)
+
+            await asyncio.gather(*(worker() for _ in range(30)))
+            self.assertEqual(len(used), 30)
+            self.assertEqual(keeper.avail_num, 3)
+        run(main())
+
+
+class LeaseTestCase(unittest.TestCase):
+
+    def test_lease_releases_on_error(self):
+        async def main():
+            keeper = AsyncResourceKeeper(["res1"])
+            with self.assertRaises(ValueError):
+                async with keeper.lease() as res:
+                    self.assertEqual(res.data, "res1")
+                    raise ValueError()
+            self.assertEqual(keeper.avail_num, 1)
+        run(main())
+
+    def test_lease_released_in_body(self):
+        async def main():
+            keeper = AsyncResourceKeeper(["res1"])
+            async with keeper.lease() as res:
+                keeper.release(res)
+            self.assertEqual(keeper.avail_num, 1)
+            self.assertFalse(keeper.available.contain(None))
+        run(main())
+
+    def test_lease_timeout(self):
+        async def main():
+            keeper = AsyncResourceKeeper()
+            with self.assertRaises(asyncio.TimeoutError):
+                async with keeper.lease(timeout=0.01):
+                    pass
+        run(main())
+
+
+class AcquireLeaseTestCase(unittest.TestCase):
+
+    def test_waiter_woken_by_expiry(self):
+        async def main():
+            keeper = AsyncResourceKeeper(["res1"])
+            await keeper.acquire(ttl=0.02)
+            res = await keeper.acquire(timeout=5)
+            self.assertEqual(res.data, "res1")
+        run(main())
@@ -0,0 +1,62 @@
+import unittest
+
+from reskeeper import poolmaps
+from reskeeper.core import ResourceKeeper
+
+
+class GetManyTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.keeper = ResourceKeeper(["res1", "res2", "res3"])
+
+    def test_get_many(self):
+        res = self.keeper.get_many(2)
+        self.assertEqual([r.to_dict() for r in res], [
+            {"res_id": 1, "data": "res1"},
+            {"res_id": 2, "data": "res2"},
+        ])
+        self.assertEqual(self.keeper.avail_num, 1)
+
+    def test_get_many_partial(self):
+        res = self.keeper.get_many(5)
+        self.assertEqual(len(res), 3)
+        self.assertEqual(self.keeper.avail_num, 0)
+
+    def test_get_many_all_or_nothing(self):
+        self.assertEqual(self.keeper.get_many(5, all_or_nothing=True), [])
+        self.assertEqual(self.keeper.avail_num, 3)
+
+
+class ReleaseManyTestCase(unittest.TestCase):
+
+    def test_release_many(self):
+        keeper = ResourceKeeper(["res1", "res2", "res3"])
+        res = keeper.get_many(3)
+        keeper.release_many(res)
+        self.assertEqual(keeper.avail_num, 3)
+        self.assertTrue(all(r.res_id is None for r in res))
+
+
+class SqliteManyTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.map = poolmaps.SimpleSqliteMap(":memory:")
+
+    def tearDown(self):
+        self.map.close()
+
+    def test_put_many_get_many(self):
+        self.map.put_many((i, str(i)) for i in range(2000))
+        self.map.put_many([(1, "one")])
+        self.assertEqual(self.map.get_many([1, 1500, 5000]),
+            ["one", "1500", None])
+
+    def test_put_many_not_str_error(self):
+        with self.assertRaises(TypeError):
+            self.map.put_many([(1, "1"), (2, 2)])
+        self.assertIsNone(self.map.get(1))
+
+    def test_keeper_get_many(self):
+        keeper = ResourceKeeper(["ab", "cd"], pool_map=self.map)
+        res = keeper.get_many(2)
+        self.assertEqual([r.data for r in res], ["ab", "cd"])
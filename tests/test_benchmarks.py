@@ -0,0 +1,20 @@
+import unittest
+
+from benchmarks import suite
+
+
+class SuiteSmokeTestCase(unittest.TestCase):
+
+    def test_run_and_compare(self):
+        results = suite.run([10], 20, [2])
+        self.assertIn("get_release.throughput/DictMap/HashQueue/10", results)
+        self.assertIn("load_json.seconds/10", results)
+        self.assertIn("contention.throughput/2", results)
+        self.assertIn("contention.sharded_throughput/2", results)
+        self.assertIn("memory.bytes_per_resource/HashQueue/10", results)
+        worse = {name: dict(m, value=m["value"] * 
+                 (0.5 if m["better"] == "higher" else 2))
+                 for name, m in results.items()}
+        rows = suite.compare(worse, results, 0.1)
+        self.assertEqual(len(rows), len(results))
+        self.assertTrue(all(row[4] for row in rows))
@@ -0,0 +1,138 @@
+import unittest
+
+from reskeeper import ResourceKeeper, poolmaps
+
+
+class CountingMap(poolmaps.DictMap):
+
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+        self.writes = 0
+
+    def get(self, key):
+        self.reads += 1
+        return super().get(key)
+
+    def get_many(self, keys):
+        self.reads += 1
+        return super().get_many(keys)
+
+    def put(self, key, val):
+        self.writes += 1
+        super().put(key, val)
+
+    def put_many(self, items):
+        self.writes += 1
+        super().put_many(items)
+
+
+class ReadThroughTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.backend = CountingMap()
+        self.backend.put_many([(1, "a"), (2, "b"), (3, "c")])
+        self.map = poolmaps.CachedPoolMap(self.backend, max_items=2)
+
+    def test_hit_miss(self):
+        self.assertEqual(self.map.get(1), "a")
+        self.assertEqual(self.map.get(1), "a")
+        self.assertEqual(self.backend.reads, 1)
+        self.assertEqual((self.map.hits, self.map.misses), (1, 1))
+        self.assertIsNone(self.map.get(4))
+        self.assertIsNone(self.map.get(4))
+        self.assertEqual(self.map.misses, 3)
+
+    def test_lru_eviction(self):
+        self.map.get(1)
+        self.map.get(2)
+        self.map.get(1)
+        self.map.get(3)
+        self.assertEqual(list(self.map.cache), [1, 3])
+        self.assertEqual(self.map.evictions, 1)
+
+    def test_max_bytes(self):
+        cached = poolmaps.CachedPoolMap(self.backend, max_bytes=2,
+                                        sizeof=len)
+        self.backend.put(4, "long")
+        cached.get(1)
+        cached.get(2)
+        cached.get(3)
+        cached.get(4)
+        self.assertEqual(list(cached.cache), [2, 3])
+        self.assertEqual(cached.cached_bytes, 2)
+
+    def test_get_many(self):
+        self.map.get(2)
+        self.assertEqual(self.map.get_many([1, 2, 9]), ["a", "b", None])
+        self.assertEqual(self.map.hits, 1)
+        self.assertEqual(self.backend.reads, 2)
+
+    def test_invalidation(self):
+        self.map.get(1)
+        self.map.put(1, "A")
+        self.assertEqual(self.map.get(1), "A")
+        self.map.put_many([(1, "AA"), (2, "BB")])
+        self.assertEqual(self.map.get(1), "AA")
+        self.map.delete(1)
+        self.assertIsNone(self.map.get(1))
+        self.assertIsNone(self.backend.get(1))
+        with self.assertRaises(KeyError):
+            self.map.delete(1)
+
+    def test_delegation(self):
+        self.assertEqual(self.map.map[2], "b")
+
+
+class WriteBehindTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.backend = CountingMap()
+        self.map = poolmaps.CachedPoolMap(self.backend, write_behind=True,
+                                          max_dirty=3)
+
+    def test_flush(self):
+        self.map.put(1, "a")
+        self.map.put_many([(2, "b")])
+        self.assertEqual(self.backend.writes, 0)
+        self.assertEqual(self.map.get_many([1, 2]), ["a", "b"])
+        self.map.flush()
+        self.assertEqual(self.backend.writes, 1)
+        self.assertEqual(self.backend.map, {1: "a", 2: "b"})
+        self.assertEqual(self.map.dirty, {})
+
+    def test_delete(self):
+        self.map.put(1, "a")
+        self.map.delete(1)
+        self.assertIsNone(self.map.get(1))
+        with self.assertRaises(KeyError):
+            self.map.delete(1)
+        self.map.flush()
+        self.assertEqual(self.backend.map, {})
+        self.backend.put(2, "b")
+        self.map.delete(2)
+        self.map.flush()
+        self.assertEqual(self.backend.map, {})
+
+    def test_max_dirty(self):
+        self.map.put_many([(1, "a"), (2, "b"), (3, "c")])
+        self.assertEqual(len(self.backend.map), 3)
+
+    def test_close(self):
+        sqlite_map = poolmaps.SqliteMap(":memory:")
+        cached = poolmaps.CachedPoolMap(sqlite_map, write_behind=True)
+        cached.put(1, "a")
+        cached.flush()
+        self.assertEqual(sqlite_map.get(1), "a")
+        cached.close()
+
+    def test_keeper(self):
+        rk = ResourceKeeper(["a", "b"], pool_map=self.map)
+        res = rk.get()
+        rk.release(res)
+        self.assertEqual(rk.get().data, "b")
+        self.assertEqual(self.backend.reads, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
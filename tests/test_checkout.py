@@ -0,0 +1,125 @@
+import gc
+import threading
+import time
+import unittest
+
+from reskeeper import ResourceKeeper, ThreadSafeResourceKeeper
+
+
+class CheckoutTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.rk = ResourceKeeper(["a", "b"])
+
+    def test_with(self):
+        with self.rk.acquire() as res:
+            self.assertEqual(res.data, "a")
+            self.assertEqual(self.rk.avail_num, 1)
+        self.assertEqual(self.rk.avail_num, 2)
+        self.assertIsNone(res.res_id)
+
+    def test_release_on_error(self):
+        with self.assertRaises(RuntimeError):
+            with self.rk.acquire():
+                raise RuntimeError
+        self.assertEqual(self.rk.avail_num, 2)
+
+    def test_empty(self):
+        self.rk.get_many(2)
+        with self.assertRaises(IndexError):
+            with self.rk.acquire():
+                pass
+
+    def test_decorator(self):
+        @self.rk.acquire()
+        def work(res, x):
+            self.assertEqual(self.rk.avail_num, 1)
+            return res.data + x
+
+        self.assertEqual(work("!"), "a!")
+        self.assertEqual(work("?"), "b?")
+        self.assertEqual(self.rk.avail_num, 2)
+        self.assertEqual(work.__name__, "work")
+
+    def test_released_in_body(self):
+        with self.rk.acquire() as res:
+            self.rk.release(res)
+        self.assertEqual(self.rk.avail_num, 2)
+        self.assertFalse(self.rk.available.contain(None))
+
+    def test_removed_in_body(self):
+        with self.rk.acquire() as res:
+            self.rk.remove(res)
+        self.assertEqual((self.rk.size, self.rk.avail_num), (1, 1))
+        self.assertEqual(self.rk.get().data, "b")
+        self.assertIsNone(self.rk.get())
+
+    def test_threadsafe_timeout(self):
+        rk = ThreadSafeResourceKeeper(["a"])
+        with rk.acquire():
+            with self.assertRaises(TimeoutError):
+                with rk.acquire(timeout=0.01):
+                    pass
+        self.assertEqual(rk.avail_num, 1)
+
+
+class AutoReleaseTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.rk = ResourceKeeper(["a", "b"], auto_release=True)
+
+    def test_dropped(self):
+        self.rk.get()
+        gc.collect()
+        self.assertEqual(self.rk.avail_num, 1)
+        self.assertIsNotNone(self.rk.get())
+        self.assertEqual(self.rk.avail_num, 1)
+        self.assertEqual(len(self.rk._finalizers), 1)
+
+    def test_released(self):
+        res = self.rk.get()
+        self.rk.release(res)
+        self.assertEqual(self.rk._finalizers, {})
+        del res
+        gc.collect()
+        held = self.rk.get_many(2)
+        self.assertEqual(len(held), 2)
+        self.assertEqual(self.rk.avail_num, 0)
+
+    def test_get_many(self):
+        self.rk.get_many(2)
+        self.assertEqual(len(self.rk.get_many(2)), 2)
+
+    def test_expired_lease(self):
+        lease = self.rk.get(ttl=0.01)
+        res_id = lease.res_id
+        time.sleep(0.02)
+        self.rk.reap()
+        others = self.rk.get_many(2)
+        self.assertIn(res_id, [res.res_id for res in others])
+        # the expired lease is no longer tracked, dropping it does not 
+        # give back the resource someone else holds now
+        del lease
+        gc.collect()
+        self.assertIsNone(self.rk.get())
+
+    def test_remove(self):
+        res = self.rk.get()
+        self.rk.remove(res)
+        del res
+        gc.collect()
+        held = self.rk.get()
+        self.assertIsNone(self.rk.get())
+        self.assertEqual(self.rk.size, 1)
+
+    def test_threadsafe_waiter(self):
+        rk = ThreadSafeResourceKeeper(["a"], auto_release=True)
+        holder = [rk.get()]
+        timer = threading.Timer(0.05, holder.clear)
+        timer.start()
+        self.assertIsNotNone(rk.get(timeout=5))
+        timer.join()
+
+
+if __name__ == "__main__":
+    unittest.main()
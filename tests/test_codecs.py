@@ -0,0 +1,150 @@
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from reskeeper import ResourceKeeper, PersistentResourceKeeper
+from reskeeper import codecs, poolmaps, utils
+
+
+DATA = {"username": "user1", "password": 123, "tags": ["a", "b"]}
+
+
+class CodecTestCase(unittest.TestCase):
+
+    def test_round_trip(self):
+        for name in ("pickle", "json", "marshal"):
+            codec = codecs.get_codec(name)
+            encoded = codec.encode(DATA)
+            self.assertIsInstance(encoded, bytes)
+            decoded = codec.decode(encoded)
+            self.assertEqual(decoded, DATA)
+            self.assertIsNot(codec.decode(encoded), decoded)
+
+    def test_bytes(self):
+        codec = codecs.BytesCodec()
+        self.assertEqual(codec.decode(codec.encode(bytearray(b"ab"))), b"ab")
+        with self.assertRaises(TypeError):
+            codec.encode("ab")
+
+    def test_get_codec(self):
+        codec = codecs.JsonCodec()
+        self.assertIs(codecs.get_codec(codec), codec)
+        with self.assertRaises(ValueError):
+            codecs.get_codec("yaml")
+
+    def test_out_of_band(self):
+        codec = codecs.PickleCodec()
+        payload = bytearray(b"x" * 1000)
+        encoded = codec.encode({"blob": pickle.PickleBuffer(payload)})
+        self.assertIn(bytes(payload), encoded)
+        stored = bytes(encoded)
+        blob = codec.decode(stored)["blob"]
+        self.assertIsInstance(blob, memoryview)
+        self.assertEqual(bytes(blob), bytes(payload))
+        # a view of the stored bytes, not a copy
+        self.assertIs(blob.obj, stored)
+
+    def test_old_protocol(self):
+        codec = codecs.PickleCodec(protocol=4)
+        self.assertEqual(codec.decode(codec.encode(DATA)), DATA)
+
+    def test_lazy(self):
+        codec = codecs.JsonCodec()
+        lazy = codecs.Lazy(codec, codec.encode(DATA))
+        self.assertEqual(lazy.decode(), DATA)
+        self.assertIn("json", repr(lazy))
+
+
+class CodecMapTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def maps(self, **options):
+        return [
+            poolmaps.SimpleSqliteMap(
+                os.path.join(self.tmpdir, "simple.db"), **options),
+            poolmaps.SqliteMap(":memory:", **options),
+            poolmaps.LogMap(os.path.join(self.tmpdir, "pool.log"), **options),
+        ]
+
+    def test_maps(self):
+        for pool_map in self.maps(codec="pickle"):
+            pool_map.put(1, DATA)
+            pool_map.put_many([(2, [1, 2]), (3, None)])
+            self.assertEqual(pool_map.get(1), DATA)
+            self.assertEqual(pool_map.get_many([2, 3, 4]), 
+                             [[1, 2], None, None])
+            self.assertTrue(pool_map.fresh_values)
+            pool_map.close()
+
+    def test_without_codec(self):
+        for pool_map in self.maps():
+            self.assertFalse(pool_map.fresh_values)
+            with self.assertRaises(TypeError):
+                pool_map.put(1, DATA)
+            pool_map.close()
+
+    def test_lazy_map(self):
+        for pool_map in self.maps(codec="json", lazy=True):
+            pool_map.put(1, DATA)
+            value = pool_map.get(1)
+            self.assertIsInstance(value, codecs.Lazy)
+            self.assertEqual(value.decode(), DATA)
+            pool_map.close()
+
+
+class CountingCodec(codecs.JsonCodec):
+
+    def __init__(self):
+        self.decoded = 0
+
+    def decode(self, data):
+        self.decoded += 1
+        return super().decode(data)
+
+
+class KeeperCodecTestCase(unittest.TestCase):
+
+    def test_no_copy(self):
+        rk = ResourceKeeper([DATA], 
+            pool_map=poolmaps.SqliteMap(":memory:", codec="marshal"))
+        self.assertIs(rk._copy, utils.get_copier("none"))
+        res = rk.get()
+        res.data["password"] = 0
+        rk.release(res)
+        self.assertEqual(rk.get().data, DATA)
+
+    def test_lazy_resource(self):
+        codec = CountingCodec()
+        rk = ResourceKeeper([DATA, DATA], pool_map=poolmaps.SqliteMap(
+            ":memory:", codec=codec, lazy=True))
+        res = rk.get()
+        rk.release(rk.get())
+        self.assertEqual(codec.decoded, 0)
+        self.assertEqual(res.data, DATA)
+        self.assertIs(res.data, res.data)
+        self.assertEqual(codec.decoded, 1)
+        self.assertEqual(res.to_dict()["data"], DATA)
+        res.data = "replaced"
+        self.assertEqual(res.data, "replaced")
+
+    def test_readonly_lazy(self):
+        rk = ResourceKeeper([DATA], copy_policy="readonly", 
+            pool_map=poolmaps.SqliteMap(":memory:", codec="json", lazy=True))
+        with self.assertRaises(TypeError):
+            rk.get().data["password"] = 0
+
+    def test_persistent(self):
+        rk = PersistentResourceKeeper(":memory:", [DATA], codec="pickle")
+        self.assertEqual(rk.get().data, DATA)
+        rk.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
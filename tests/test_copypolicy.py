@@ -0,0 +1,68 @@
+import unittest
+from types import MappingProxyType
+
+from reskeeper import utils
+from reskeeper.core import ResourceKeeper
+
+
+class CopyPolicyTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.data = {"cookies": {"sid": "1"}, "headers": ["ua"]}
+
+    def get_data(self, policy):
+        keeper = ResourceKeeper([self.data], copy_policy=policy)
+        return keeper.get().data
+
+    def test_deep(self):
+        data = self.get_data("deep")
+        self.assertEqual(data, self.data)
+        self.assertIsNot(data["cookies"], self.data["cookies"])
+
+    def test_shallow(self):
+        data = self.get_data("shallow")
+        self.assertIsNot(data, self.data)
+        self.assertIs(data["cookies"], self.data["cookies"])
+
+    def test_none(self):
+        self.assertIs(self.get_data("none"), self.data)
+
+    def test_readonly(self):
+        data = self.get_data("readonly")
+        self.assertIsInstance(data, MappingProxyType)
+        with self.assertRaises(TypeError):
+            data["cookies"] = {}
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            ResourceKeeper(copy_policy="nope")
+
+
+class CopyOnWriteTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.data = {"cookies": {"sid": "1"}, "headers": ["ua"]}
+
+    def test_read_shares_data(self):
+        data = utils.copy_on_write(self.data)
+        self.assertEqual(data["cookies"]["sid"], "1")
+        self.assertEqual(data["headers"], ("ua",))
+        with self.assertRaises(TypeError):
+            data["cookies"]["sid"] = "2"
+        self.assertFalse(data._copied)
+
+    def test_write_copies_data(self):
+        keeper = ResourceKeeper([self.data], copy_policy="cow")
+        data = keeper.get().data
+        data["token"] = "abc"
+        data["cookies"]["sid"] = "2"
+        self.assertEqual(self.data, 
+            {"cookies": {"sid": "1"}, "headers": ["ua"]})
+        self.assertEqual(data.copy(),
+            {"cookies": {"sid": "2"}, "headers": ["ua"], "token": "abc"})
+
+    def test_non_dict_is_deep_copied(self):
+        data = ["a", ["b"]]
+        copied = utils.copy_on_write(data)
+        self.assertEqual(copied, data)
+        self.assertIsNot(copied[1], data[1])
@@ -0,0 +1,90 @@
+import unittest
+
+from reskeeper import availsets
+
+class QueueAddTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.hq = availsets.HashQueue()
+
+    def test_add(self):
+        self.hq.add(1)
+        self.hq.add(2)
+        self.hq.add(2)
+        self.assertEqual(len(self.hq), 2)
+        self.assertTrue(self.hq.contain(1))
+        self.assertTrue(self.hq.contain(2))
+        self.assertFalse(self.hq.contain(3))
+
+
+class QueuePopTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.hq = availsets.HashQueue()
+
+    def test_pop_head(self):
+        self.hq.add(1)
+        self.hq.add(2)
+        self.hq.add(3)
+        self.assertEqual(self.hq.pop(), 1)
+        self.assertEqual(self.hq.pop(), 2)
+        self.assertEqual(self.hq.pop(), 3)
+        self.assertEqual(len(self.hq), 0)
+
+    def test_pop_error_when_empty(self):
+        with self.assertRaises(IndexError):
+            self.hq.pop()
+
+
+class QueueDeleteTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.hq = availsets.HashQueue()
+
+    def test_delete(self):
+        self.hq.add(1)
+        self.hq.add(2)
+        self.hq.add(3)
+        self.hq.delete(2)
+        self.assertFalse(self.hq.contain(2))
+        self.assertEqual(self.hq.pop(), 1)
+        self.assertEqual(self.hq.pop(), 3)
+        with self.assertRaises(IndexError):
+            self.hq.pop()
+
+    def test_delete_then_add_again(self):
+        self.hq.add(1)
+        self.hq.add(2)
+        self.hq.delete(1)
+        self.hq.add(1)
+        self.assertEqual(len(self.hq), 2)
+        self.assertEqual(self.hq.pop(), 2)
+        self.assertEqual(self.hq.pop(), 1)
+        with self.assertRaises(IndexError):
+            self.hq.pop()
+
+    def test_delete_many_compacts(self):
+        for i in range(100):
+            self.hq.add(i)
+        for i in range(90):
+            self.hq.delete(i)
+        self.assertEqual(len(self.hq), 10)
+        self.assertLess(len(self.hq.queue), 100)
+        self.assertEqual([self.hq.pop() for _ in range(10)],
+            list(range(90, 100)))
+
+    def test_delete_readd_stays_bounded(self):
+        self.hq.add(0)
+        for _ in range(1000):
+            self.hq.add(1)
+            self.hq.delete(1)
+        self.hq.add(1)
+        self.assertLess(len(self.hq.queue), 40)
+        self.assertLess(len(self.hq._stale), 2)
+        self.assertEqual([self.hq.pop(), self.hq.pop()], [0, 1])
+        with self.assertRaises(IndexError):
+            self.hq.pop()
+
+    def test_delete_not_exist(self):
+        with self.assertRaises(KeyError):
+            self.hq.delete(1)
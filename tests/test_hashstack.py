@@ -0,0 +1,64 @@
+import unittest
+
+from reskeeper import availsets
+
+class StackAddTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.hs = availsets.HashStack()
+
+    def test_add(self):
+        self.hs.add(1)
+        self.hs.add(2)
+        self.hs.add(2)
+        self.assertEqual(len(self.hs), 2)
+        self.assertTrue(self.hs.contain(2))
+        self.assertFalse(self.hs.contain(3))
+
+
+class StackPopTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.hs = availsets.HashStack()
+
+    def test_pop_tail(self):
+        self.hs.add(1)
+        self.hs.add(2)
+        self.hs.add(3)
+        self.assertEqual(self.hs.pop(), 3)
+        self.assertEqual(self.hs.pop(), 2)
+        self.assertEqual(self.hs.pop(), 1)
+        self.assertEqual(len(self.hs), 0)
+
+    def test_pop_error_when_empty(self):
+        with self.assertRaises(IndexError):
+            self.hs.pop()
+
+
+class StackDeleteTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.hs = availsets.HashStack()
+
+    def test_delete(self):
+        self.hs.add(1)
+        self.hs.add(2)
+        self.hs.add(3)
+        self.hs.delete(2)
+        self.assertFalse(self.hs.contain(2))
+        self.assertEqual(self.hs.pop(), 3)
+        self.assertEqual(self.hs.pop(), 1)
+
+    def test_delete_many_compacts(self):
+        for i in range(100):
+            self.hs.add(i)
+        for i in range(90):
+            self.hs.delete(i)
+        self.assertEqual(len(self.hs), 10)
+        self.assertLess(len(self.hs.stack), 100)
+        self.assertEqual([self.hs.pop() for _ in range(10)],
+            list(range(99, 89, -1)))
+
+    def test_delete_not_exist(self):
+        with self.assertRaises(KeyError):
+            self.hs.delete(1)
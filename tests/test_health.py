@@ -0,0 +1,131 @@
+import asyncio
+import time
+import unittest
+
+from reskeeper import ResourceKeeper, ThreadSafeResourceKeeper
+from reskeeper import ShardedResourceKeeper
+from reskeeper.health import HealthChecker
+
+
+def is_even(data):
+    return data % 2 == 0
+
+
+class CheckTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.rk = ResourceKeeper(list(range(10)))
+
+    def test_quarantine(self):
+        checker = HealthChecker(self.rk, is_even, max_workers=4)
+        failed = checker.check()
+        self.assertEqual(sorted(failed), [2, 4, 6, 8, 10])
+        self.assertEqual(self.rk.size, 10)
+        self.assertEqual(self.rk.avail_num, 5)
+        self.assertEqual(sorted(checker.quarantined), failed)
+        self.assertEqual(sorted(res.data for res in self.rk.get_many(10)),
+                         [0, 2, 4, 6, 8])
+
+    def test_evict(self):
+        checker = HealthChecker(self.rk, is_even, policy="evict")
+        checker.check()
+        self.assertEqual(self.rk.size, 5)
+        self.assertEqual(self.rk.avail_num, 5)
+        self.assertEqual(checker.quarantined, {})
+        self.assertIsNone(self.rk.pool.get(2))
+
+    def test_probe_error(self):
+        def probe(data):
+            if data == 3:
+                raise ConnectionError
+            return True
+        self.assertEqual(HealthChecker(self.rk, probe).check(), [4])
+
+    def test_skip_checked_out(self):
+        held = self.rk.get()
+        checker = HealthChecker(self.rk, lambda data: False, batch_size=3)
+        self.assertEqual(len(checker.check()), 9)
+        self.assertNotIn(held.res_id, checker.quarantined)
+
+    def test_limit(self):
+        checker = HealthChecker(self.rk, lambda data: False)
+        self.assertEqual(checker.check(limit=4), [1, 2, 3, 4])
+
+    def test_recheck(self):
+        healthy = {"ok": False}
+        checker = HealthChecker(self.rk, 
+            lambda data: data != 0 or healthy["ok"])
+        self.assertEqual(checker.check(), [1])
+        self.assertEqual(checker.recheck(), [])
+        healthy["ok"] = True
+        self.assertEqual(checker.recheck(), [1])
+        self.assertEqual(self.rk.avail_num, 10)
+        self.assertEqual(checker.failures, {})
+
+    def test_evict_after(self):
+        checker = HealthChecker(self.rk, lambda data: data != 0, 
+                                evict_after=2)
+        checker.check()
+        self.assertIn(1, checker.quarantined)
+        checker.recheck()
+        self.assertEqual(checker.quarantined, {})
+        self.assertEqual(self.rk.size, 9)
+
+    def test_release_quarantined(self):
+        checker = HealthChecker(self.rk, lambda data: False)
+        checker.check()
+        self.assertEqual(len(checker.release_quarantined()), 10)
+        self.assertEqual(self.rk.avail_num, 10)
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            HealthChecker(self.rk, is_even, policy="ignore")
+
+
+class ConcurrencyTestCase(unittest.TestCase):
+
+    def test_thread_pool(self):
+        rk = ThreadSafeResourceKeeper(list(range(64)))
+
+        def slow_probe(data):
+            time.sleep(0.02)
+            return True
+
+        checker = HealthChecker(rk, slow_probe, max_workers=32)
+        start = time.monotonic()
+        self.assertEqual(checker.check(), [])
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(rk.avail_num, 64)
+
+    def test_async(self):
+        rk = ResourceKeeper(list(range(64)))
+
+        async def probe(data):
+            await asyncio.sleep(0.5 if data == 5 else 0.01)
+            return data != 7
+
+        checker = HealthChecker(rk, probe, max_workers=16)
+        failed = asyncio.run(checker.check_async(timeout=0.1))
+        self.assertEqual(sorted(failed), [6, 8])
+        self.assertEqual(asyncio.run(checker.recheck_async(timeout=0.1)), [])
+
+    def test_sharded(self):
+        rk = ShardedResourceKeeper(list(range(10)), num_shards=3)
+        checker = HealthChecker(rk, is_even, policy="evict")
+        checker.check()
+        self.assertEqual(rk.size, 5)
+        self.assertEqual(rk.avail_num, 5)
+
+    def test_background(self):
+        rk = ThreadSafeResourceKeeper(list(range(10)))
+        checker = HealthChecker(rk, is_even, policy="evict")
+        checker.start(0.01)
+        deadline = time.monotonic() + 5
+        while rk.size > 5 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        checker.stop()
+        self.assertEqual(rk.size, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from reskeeper.aio import AsyncResourceKeeper
+from reskeeper.core import Resource, ResourceKeeper, ThreadSafeResourceKeeper
+
+PROXIES = [
+    {"host": "a", "region": "EU", "protocol": "http", "tags": ["fast"]},
+    {"host": "b", "region": "US", "protocol": "socks5", "tags": []},
+    {"host": "c", "region": "EU", "protocol": "socks5", 
+     "tags": ["fast", "new"]},
+]
+
+
+class WhereGetTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.keeper = ResourceKeeper(PROXIES, 
+            index_on=("region", "protocol", "tags"))
+
+    def test_get_where(self):
+        res = self.keeper.get(where={"region": "EU", "protocol": "socks5"})
+        self.assertEqual(res.data["host"], "c")
+        self.assertEqual(self.keeper.avail_num, 2)
+        self.assertFalse(self.keeper.available.contain(res.res_id))
+        self.assertIsNone(
+            self.keeper.get(where={"region": "EU", "protocol": "socks5"}))
+
+    def test_get_where_list_value(self):
+        self.assertEqual(
+            self.keeper.get(where={"tags": "new"}).data["host"], "c")
+        self.assertEqual(
+            self.keeper.get(where={"tags": "fast"}).data["host"], "a")
+        self.assertIsNone(self.keeper.get(where={"tags": "fast"}))
+
+    def test_release_reindexes(self):
+        res = self.keeper.get(where={"region": "US"})
+        self.assertIsNone(self.keeper.get(where={"region": "US"}))
+        self.keeper.release(res)
+        self.assertEqual(
+            self.keeper.get(where={"region": "US"}).data["host"], "b")
+
+    def test_get_where_keeps_avail_set_bounded(self):
+        for _ in range(1000):
+            res = self.keeper.get(where={"region": "US"})
+            self.keeper.release(res)
+        self.assertEqual(self.keeper.avail_num, 3)
+        self.assertLess(len(self.keeper.available.queue), 40)
+        self.assertLess(len(self.keeper.available._stale), 3)
+
+    def test_plain_get_unindexes(self):
+        self.keeper.get()
+        self.assertEqual(
+            self.keeper.get(where={"region": "EU"}).data["host"], "c")
+
+    def test_remove_unindexes(self):
+        res = self.keeper.get(where={"region": "US"})
+        self.keeper.release(res)
+        self.keeper.remove(Resource(2, None))
+        self.assertNotIn("US", self.keeper._indexes["region"])
+
+    def test_add_indexes(self):
+        self.keeper.add({"host": "d", "region": "CN"})
+        self.assertEqual(
+            self.keeper.get(where={"region": "CN"}).data["host"], "d")
+
+    def test_not_indexed_error(self):
+        with self.assertRaises(KeyError):
+            self.keeper.get(where={"host": "a"})
+
+
+class CompositeIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.keeper = ResourceKeeper(PROXIES, 
+            index_on=("tags", ("region", "protocol"), ("region", "tags")))
+
+    def test_composite(self):
+        self.assertIn(("EU", "socks5"), 
+                      self.keeper._indexes[("region", "protocol")])
+        res = self.keeper.get(where={"region": "EU", "protocol": "socks5"})
+        self.assertEqual(res.data["host"], "c")
+        self.assertIsNone(
+            self.keeper.get(where={"protocol": "socks5", "region": "EU"}))
+        self.keeper.release(res)
+        self.assertEqual(self.keeper.get(
+            where={"region": "EU", "protocol": "socks5"}).data["host"], "c")
+
+    def test_composite_list_value(self):
+        self.assertEqual(self.keeper.get(
+            where={"region": "EU", "tags": "new"}).data["host"], "c")
+        self.assertEqual(self.keeper.get(
+            where={"region": "EU", "tags": "fast"}).data["host"], "a")
+        self.assertIsNone(
+            self.keeper.get(where={"region": "EU", "tags": "fast"}))
+
+    def test_partly_covered(self):
+        res = self.keeper.get(where={"region": "EU", "protocol": "http", 
+                                     "tags": "fast"})
+        self.assertEqual(res.data["host"], "a")
+        self.assertIsNone(self.keeper.get(
+            where={"region": "US", "protocol": "socks5", "tags": "fast"}))
+
+    def test_not_covered_error(self):
+        with self.assertRaises(KeyError):
+            self.keeper.get(where={"host": "a"})
+        # region is only indexed together with another key
+        with self.assertRaises(KeyError):
+            self.keeper.get(where={"region": "EU"})
+        self.assertIsNone(self.keeper.get(where={"region": "CN", 
+                                                 "protocol": "http"}))
+
+
+class WhereWaitTestCase(unittest.TestCase):
+
+    def test_thread_waits_for_match(self):
+        keeper = ThreadSafeResourceKeeper(PROXIES, index_on=("region",))
+        held = keeper.get_many(3)
+        got = []
+        waiter = threading.Thread(target=lambda: got.append(
+            keeper.get(timeout=5, where={"region": "US"})))
+        waiter.start()
+        time.sleep(0.02)
+        keeper.release(held[0])
+        time.sleep(0.02)
+        self.assertEqual(got, [])
+        keeper.release(held[1])
+        waiter.join()
+        self.assertEqual(got[0].data["host"], "b")
+
+    def test_coroutine_waits_for_match(self):
+        async def main():
+            keeper = AsyncResourceKeeper(PROXIES, index_on=("region",))
+            held = keeper.get_many(3)
+            task = asyncio.ensure_future(
+                keeper.acquire(where={"region": "US"}))
+            await asyncio.sleep(0)
+            keeper.release(held[0])
+            await asyncio.sleep(0)
+            self.assertFalse(task.done())
+            # a plain acquire is not blocked by the picky waiter
+            self.assertEqual((await keeper.acquire(timeout=1)).data["host"],
+                "a")
+            keeper.release(held[1])
+            self.assertEqual((await task).data["host"], "b")
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(main())
+        finally:
+            loop.close()
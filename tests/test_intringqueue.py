@@ -0,0 +1,70 @@
+import unittest
+
+from reskeeper import availsets
+
+class RingAddTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.rq = availsets.IntRingQueue(capacity=2)
+
+    def test_add(self):
+        self.rq.add(1)
+        self.rq.add(20)
+        self.rq.add(20)
+        self.assertEqual(len(self.rq), 2)
+        self.assertTrue(self.rq.contain(20))
+        self.assertFalse(self.rq.contain(2))
+        self.assertFalse(self.rq.contain(10 ** 6))
+
+    def test_add_negative_error(self):
+        with self.assertRaises(ValueError):
+            self.rq.add(-1)
+
+
+class RingPopTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.rq = availsets.IntRingQueue(capacity=2)
+
+    def test_pop_head_across_growth(self):
+        self.rq.add(1)
+        self.rq.add(2)
+        self.assertEqual(self.rq.pop(), 1)
+        for i in range(3, 10):
+            self.rq.add(i)
+        self.assertEqual([self.rq.pop() for _ in range(8)], 
+            list(range(2, 10)))
+        self.assertEqual(len(self.rq), 0)
+
+    def test_pop_error_when_empty(self):
+        with self.assertRaises(IndexError):
+            self.rq.pop()
+
+
+class RingDeleteTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.rq = availsets.IntRingQueue()
+
+    def test_delete(self):
+        for i in range(1, 4):
+            self.rq.add(i)
+        self.rq.delete(2)
+        self.assertFalse(self.rq.contain(2))
+        self.assertEqual(self.rq.pop(), 1)
+        self.assertEqual(self.rq.pop(), 3)
+        with self.assertRaises(IndexError):
+            self.rq.pop()
+
+    def test_delete_then_add_again(self):
+        self.rq.add(1)
+        self.rq.add(2)
+        self.rq.delete(1)
+        self.rq.add(1)
+        self.assertEqual(len(self.rq), 2)
+        self.assertEqual(self.rq.pop(), 1)
+        self.assertEqual(self.rq.pop(), 2)
+
+    def test_delete_not_exist(self):
+        with self.assertRaises(KeyError):
+            self.rq.delete(1)
@@ -0,0 +1,106 @@
+import threading
+import time
+import unittest
+
+from reskeeper import leases
+from reskeeper.core import Lease, ResourceKeeper, ThreadSafeResourceKeeper
+
+
+class LeaseReaperTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.reaper = leases.LeaseReaper()
+
+    def test_expired_in_deadline_order(self):
+        self.reaper.track(1, 5, now=0)
+        self.reaper.track(2, 1, now=0)
+        self.reaper.track(3, 3, now=0)
+        self.assertEqual(self.reaper.expired(now=3), [2, 3])
+        self.assertEqual(self.reaper.next_deadline(), 5)
+        self.assertEqual(len(self.reaper), 1)
+
+    def test_renew_postpones(self):
+        token, _ = self.reaper.track(1, 1, now=0)
+        self.assertEqual(self.reaper.renew(1, token, None, now=0.5), 1.5)
+        self.assertEqual(self.reaper.expired(now=1.2), [])
+        self.assertEqual(self.reaper.expired(now=1.5), [1])
+
+    def test_renew_after_expiry_error(self):
+        token, _ = self.reaper.track(1, 1, now=0)
+        self.reaper.expired(now=2)
+        with self.assertRaises(KeyError):
+            self.reaper.renew(1, token, 1, now=2)
+
+    def test_forget(self):
+        self.reaper.track(1, 1, now=0)
+        self.reaper.forget(1)
+        self.assertEqual(self.reaper.expired(now=2), [])
+        self.assertIsNone(self.reaper.next_deadline())
+
+    def test_stale_entries_compacted(self):
+        token, _ = self.reaper.track(0, 600, now=0)
+        for i in range(1000):
+            self.reaper.track(1, 600, now=i)
+            self.reaper.forget(1)
+            self.reaper.renew(0, token, 600, now=i)
+        self.assertLess(len(self.reaper.heap), 40)
+        self.assertEqual(self.reaper.next_deadline(), 1599)
+        self.assertEqual(self.reaper.expired(now=1599), [0])
+
+
+class KeeperLeaseTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.keeper = ResourceKeeper(["res1"])
+
+    def test_get_with_ttl(self):
+        lease = self.keeper.get(ttl=10)
+        self.assertIsInstance(lease, Lease)
+        self.assertGreater(lease.remaining(), 9)
+
+    def test_expired_lease_reclaimed(self):
+        lease = self.keeper.get(ttl=0.01)
+        self.assertIsNone(self.keeper.get())
+        time.sleep(0.02)
+        res = self.keeper.get()
+        self.assertEqual(res.res_id, lease.res_id)
+        # the stale lease must not make the resource available again
+        self.keeper.release(lease)
+        self.assertEqual(self.keeper.avail_num, 0)
+
+    def test_renew(self):
+        lease = self.keeper.get(ttl=0.05)
+        time.sleep(0.03)
+        lease.renew()
+        time.sleep(0.03)
+        self.assertEqual(self.keeper.reap(), [])
+        self.assertIsNone(self.keeper.get())
+
+    def test_renew_expired_error(self):
+        lease = self.keeper.get(ttl=0.01)
+        time.sleep(0.02)
+        with self.assertRaises(KeyError):
+            lease.renew()
+        self.assertEqual(self.keeper.avail_num, 1)
+
+    def test_release_ends_lease(self):
+        lease = self.keeper.get(ttl=0.01)
+        self.keeper.release(lease)
+        time.sleep(0.02)
+        self.assertEqual(self.keeper.reap(), [])
+        self.assertEqual(self.keeper.avail_num, 1)
+
+
+class ThreadSafeLeaseTestCase(unittest.TestCase):
+
+    def test_waiter_woken_by_expiry(self):
+        keeper = ThreadSafeResourceKeeper(["res1"])
+        keeper.get(ttl=0.05)
+        got = []
+        waiter = threading.Thread(
+            target=lambda: got.append(keeper.get(timeout=5)))
+        start = time.monotonic()
+        waiter.start()
+        waiter.join()
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(got[0].data, "res1")
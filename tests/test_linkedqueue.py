@@ -33,3 +33,50 @@ class QueuePopTestCase(unittest.TestCase):
     def test_pop_error_when_empty(self):
         with self.assertRaises(IndexError):
             self.lq.pop()
+
+
+class QueueDeleteTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.lq = availsets.LinkedQueue()
+        for item in (1, 2, 3, 4):
+            self.lq.add(item)
+
+    def test_contain(self):
+        self.assertTrue(self.lq.contain(2))
+        self.assertFalse(self.lq.contain(5))
+        self.lq.pop()
+        self.assertFalse(self.lq.contain(1))
+
+    def test_add_twice(self):
+        self.lq.add(2)
+        self.assertEqual(len(self.lq), 4)
+
+    def test_delete_middle(self):
+        self.lq.delete(2)
+        self.lq.delete(3)
+        self.assertFalse(self.lq.contain(2))
+        self.assertEqual(len(self.lq), 2)
+        self.assertEqual(self.lq.head.next.item, 1)
+        self.assertEqual(self.lq.tail.prev.item, 4)
+        self.assertEqual(self.lq.pop(), 1)
+        self.assertEqual(self.lq.pop(), 4)
+
+    def test_delete_ends(self):
+        self.lq.delete(1)
+        self.lq.delete(4)
+        self.assertEqual(self.lq.head.item, 3)
+        self.assertEqual(self.lq.tail.item, 2)
+        self.assertIsNone(self.lq.head.prev)
+        self.assertIsNone(self.lq.tail.next)
+        self.lq.delete(2)
+        self.lq.delete(3)
+        self.assertIsNone(self.lq.head)
+        self.assertIsNone(self.lq.tail)
+        self.lq.add(5)
+        self.assertEqual(self.lq.pop(), 5)
+
+    def test_delete_missing(self):
+        with self.assertRaises(KeyError):
+            self.lq.delete(5)
+        self.assertEqual(len(self.lq), 4)
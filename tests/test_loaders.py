@@ -0,0 +1,101 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from reskeeper import loaders
+from reskeeper.core import ResourceKeeper
+
+
+def pieces(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class JsonArrayTestCase(unittest.TestCase):
+
+    def test_small_chunks(self):
+        data = [1, 23456, -7.5e3, "a,]b", {"k": [1, {"x": None}]}, [], 
+                True, "中文"]
+        text = " \n" + json.dumps(data) + " "
+        for size in (1, 2, 3, 7, 1000):
+            self.assertEqual(
+                list(loaders.iter_json_array(pieces(text, size))), data)
+
+    def test_empty_array(self):
+        self.assertEqual(list(loaders.iter_json_array([" [ ", " ] "])), [])
+
+    def test_not_array_error(self):
+        with self.assertRaises(ValueError):
+            list(loaders.iter_json_array(['{"a": 1}']))
+
+    def test_malformed_error(self):
+        with self.assertRaises(ValueError):
+            list(loaders.iter_json_array(["[1, 2"]))
+        with self.assertRaises(ValueError):
+            list(loaders.iter_json_array(["[1 2]"]))
+
+    def test_extra_data_error(self):
+        for chunks in (["[1, 2] 3"], ["[1, 2]", " \n", "x"], ["[]", ","]):
+            with self.assertRaises(ValueError):
+                list(loaders.iter_json_array(chunks))
+        self.assertEqual(
+            list(loaders.iter_json_array(["[1, 2]", " \n", ""])), [1, 2])
+
+
+class LoadStreamTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.asset_dir = os.path.dirname(__file__)
+        self.keeper = ResourceKeeper()
+
+    def asset(self, name):
+        return os.path.join(self.asset_dir, name)
+
+    def test_load_json_file_batches(self):
+        for use_mmap in (False, True):
+            keeper = ResourceKeeper()
+            keeper.load_json_file(self.asset("asset.json"), batch_size=2,
+                use_mmap=use_mmap)
+            self.assertEqual(keeper.size, 3)
+            self.assertEqual(keeper.get().data,
+                {"host": "127.0.0.1", "port": "8000"})
+
+    def test_load_json_object_keys(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            file_dir = os.path.join(tmpdir, "obj.json")
+            with open(file_dir, "w") as f:
+                json.dump({"accounts": [1, 2]}, f)
+            self.keeper.load_json_file(file_dir)
+            self.assertEqual(self.keeper.get().data, "accounts")
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_load_ndjson_file(self):
+        for use_mmap in (False, True):
+            keeper = ResourceKeeper()
+            keeper.load_ndjson_file(self.asset("asset.ndjson"),
+                use_mmap=use_mmap)
+            self.assertEqual(keeper.size, 3)
+            self.assertEqual(keeper.get().data["host"], "127.0.0.1")
+
+    def test_load_csv_file_header(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            file_dir = os.path.join(tmpdir, "proxies.csv")
+            with open(file_dir, "w") as f:
+                f.write("host,port\n127.0.0.1,8000\n127.0.0.3,8000\n")
+            for use_mmap in (False, True):
+                keeper = ResourceKeeper()
+                keeper.load_csv_file(file_dir, header=True, 
+                    use_mmap=use_mmap)
+                self.assertEqual(keeper.size, 2)
+                self.assertEqual(keeper.get().data,
+                    {"host": "127.0.0.1", "port": "8000"})
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_load_tsv_file(self):
+        self.keeper.load_csv_file(self.asset("asset.tsv"), delimiter="\t")
+        self.assertEqual(self.keeper.get().data, ["127.0.0.1", "8000"])
@@ -0,0 +1,165 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from reskeeper import ResourceKeeper, poolmaps, utils
+
+
+class LogMapTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "pool.log")
+        self.map = poolmaps.LogMap(self.path)
+
+    def tearDown(self):
+        self.map.close()
+        shutil.rmtree(self.tmpdir)
+
+    def reopen(self, save=True):
+        if save:
+            self.map.close()
+        else:
+            self.map._file.close()
+        self.map = poolmaps.LogMap(self.path)
+
+    def test_put_get(self):
+        self.map.put(1, b"alpha")
+        self.map.put_many([(2, bytearray(b"beta")), (3, memoryview(b""))])
+        view = self.map.get(1)
+        self.assertIsInstance(view, memoryview)
+        self.assertTrue(view.readonly)
+        self.assertEqual(bytes(view), b"alpha")
+        self.assertEqual([bytes(v) for v in self.map.get_many([2, 3])], 
+                         [b"beta", b""])
+        self.assertIsNone(self.map.get(4))
+        self.assertEqual(len(self.map), 3)
+
+    def test_types(self):
+        with self.assertRaises(TypeError):
+            self.map.put(1, "text")
+
+    def test_overwrite_delete(self):
+        self.map.put(1, b"a")
+        self.map.put(1, b"bb")
+        self.assertEqual(bytes(self.map.get(1)), b"bb")
+        self.map.delete(1)
+        self.assertIsNone(self.map.get(1))
+        with self.assertRaises(KeyError):
+            self.map.delete(1)
+        self.assertGreater(self.map.garbage, 0)
+
+    def test_reopen_with_index(self):
+        self.map.put_many((i, str(i).encode()) for i in range(100))
+        self.map.delete(5)
+        self.reopen()
+        self.assertEqual(len(self.map), 99)
+        self.assertEqual(bytes(self.map.get(42)), b"42")
+        self.assertIsNone(self.map.get(5))
+
+    def test_reopen_replays_tail(self):
+        self.map.put(1, b"a")
+        self.map.save_index()
+        self.map.put(2, b"b")
+        self.map.delete(1)
+        self.reopen(save=False)
+        self.assertIsNone(self.map.get(1))
+        self.assertEqual(bytes(self.map.get(2)), b"b")
+
+    def test_reopen_without_index(self):
+        self.map.put(1, b"a")
+        self.map.close()
+        os.remove(self.path + ".idx")
+        self.map = poolmaps.LogMap(self.path)
+        self.assertEqual(bytes(self.map.get(1)), b"a")
+
+    def test_truncated_record(self):
+        self.map.put(1, b"a")
+        self.map.put(2, b"bbbb")
+        self.map._file.flush()
+        size = os.path.getsize(self.path)
+        self.reopen(save=False)
+        self.map._file.truncate(size - 2)
+        self.reopen(save=False)
+        self.assertEqual(bytes(self.map.get(1)), b"a")
+        self.assertIsNone(self.map.get(2))
+        self.map.put(3, b"c")
+        self.reopen()
+        self.assertEqual(bytes(self.map.get(3)), b"c")
+
+    def test_not_a_log(self):
+        path = os.path.join(self.tmpdir, "other")
+        with open(path, "wb") as f:
+            f.write(b"x" * 32)
+        with self.assertRaises(ValueError):
+            poolmaps.LogMap(path)
+
+    def test_compact(self):
+        for i in range(50):
+            self.map.put(i, b"x" * 100)
+        for i in range(40):
+            self.map.delete(i)
+        old_view = self.map.get(45)
+        reclaimed = self.map.compact()
+        self.assertGreater(reclaimed, 40 * 100)
+        self.assertEqual(self.map.garbage, 0)
+        self.assertEqual(len(self.map), 10)
+        self.assertEqual(bytes(self.map.get(45)), b"x" * 100)
+        # views from before the compaction stay valid
+        self.assertEqual(bytes(old_view), b"x" * 100)
+        self.reopen()
+        self.assertEqual(len(self.map), 10)
+        self.assertEqual(os.listdir(self.tmpdir).count("pool.log.compact"), 0)
+
+    def test_compact_with_writers(self):
+        for i in range(1000):
+            self.map.put(i, b"v1")
+        stop = threading.Event()
+
+        def writer():
+            i = 0
+            while not stop.is_set():
+                self.map.put(i % 1000, b"v2")
+                if i % 7 == 0:
+                    self.map.delete((i + 500) % 1000)
+                i += 1
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        for _ in range(3):
+            self.map.compact()
+        stop.set()
+        thread.join()
+        live = dict(self.map.index)
+        self.reopen()
+        self.assertEqual(self.map.index, live)
+        for key in live:
+            self.assertIn(bytes(self.map.get(key)), (b"v1", b"v2"))
+
+    def test_background_compaction(self):
+        for i in range(20):
+            self.map.put(i, b"x")
+            self.map.delete(i)
+        self.map.start_compaction(interval=0.01, min_garbage_ratio=0.3)
+        for _ in range(500):
+            if self.map.garbage == 0:
+                break
+            time.sleep(0.01)
+        self.map.stop_compaction()
+        self.assertEqual(self.map.garbage, 0)
+
+    def test_keeper(self):
+        rk = ResourceKeeper([b"session1", b"session2"], pool_map=self.map)
+        res = rk.get()
+        self.assertEqual(bytes(res.data), b"session1")
+        rk.release(res)
+        for policy in ("shallow", "cow", "readonly", "none"):
+            copier = utils.get_copier(policy)
+            self.assertIsInstance(copier(self.map.get(2)), memoryview)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,173 @@
+import asyncio
+import threading
+import unittest
+
+from reskeeper import ResourceKeeper, ThreadSafeResourceKeeper
+from reskeeper import AsyncResourceKeeper, PersistentResourceKeeper
+from reskeeper.metrics import Histogram, KeeperMetrics, InstrumentedPoolMap
+
+
+class HistogramTestCase(unittest.TestCase):
+
+    def test_observe(self):
+        h = Histogram((1, 5))
+        for value in (0.5, 1, 3, 10):
+            h.observe(value)
+        self.assertEqual(h.count, 4)
+        self.assertEqual(h.sum, 14.5)
+        self.assertEqual(h.cumulative(), 
+            [(1, 2), (5, 3), (float("inf"), 4)])
+        self.assertEqual(h.quantile(0.5), 1)
+        self.assertEqual(h.quantile(1), float("inf"))
+        self.assertIsNone(Histogram().quantile(0.5))
+
+
+class KeeperMetricsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.rk = ResourceKeeper(["a", "b"], metrics=True)
+        self.metrics = self.rk.metrics
+
+    def test_disabled(self):
+        rk = ResourceKeeper(["a"])
+        self.assertIsNone(rk.metrics)
+        self.assertFalse(rk._observed)
+        rk.release(rk.get())
+
+    def test_counts(self):
+        res1 = self.rk.get()
+        res2 = self.rk.get()
+        self.assertIsNone(self.rk.get())
+        self.rk.release(res1)
+        self.rk.add("c")
+        self.rk.remove(res2)
+        self.assertEqual(self.metrics.counts, {"add": 3, "get": 2, 
+            "miss": 1, "release": 1, "remove": 1})
+        self.assertEqual(self.metrics.usage, {1: 1, 2: 1})
+        self.assertEqual(self.metrics.hold.count, 1)
+        self.assertEqual(self.metrics.snapshot()["checked_out"], 0)
+
+    def test_get_many(self):
+        self.rk.release_many(self.rk.get_many(2))
+        self.assertEqual(self.metrics.counts["get"], 2)
+        self.assertEqual(self.metrics.counts["release"], 2)
+        self.assertEqual(self.metrics.pool_calls["get_many"].count, 1)
+
+    def test_pool_calls(self):
+        self.assertIsInstance(self.rk.pool, InstrumentedPoolMap)
+        self.assertEqual(self.rk.pool.map, {1: "a", 2: "b"})
+        self.rk.get()
+        self.assertEqual(self.metrics.pool_calls["put_many"].count, 1)
+        self.assertEqual(self.metrics.pool_calls["get"].count, 1)
+
+    def test_snapshot(self):
+        self.rk.get()
+        snap = self.metrics.snapshot(self.rk)
+        self.assertEqual(snap["size"], 2)
+        self.assertEqual(snap["avail_num"], 1)
+        self.assertEqual(snap["utilization"], 0.5)
+        self.assertEqual(snap["checked_out"], 1)
+        self.assertEqual(snap["usage"], {1: 1})
+
+    def test_prometheus(self):
+        self.rk.release(self.rk.get())
+        text = self.metrics.to_prometheus(self.rk, per_resource=True)
+        self.assertIn('reskeeper_events_total{event="get"} 1\n', text)
+        self.assertIn("# TYPE reskeeper_hold_seconds histogram\n", text)
+        self.assertIn('reskeeper_hold_seconds_bucket{le="+Inf"} 1\n', text)
+        self.assertIn('reskeeper_pool_call_seconds_count{method="get"} 1\n',
+                      text)
+        self.assertIn('reskeeper_resource_gets_total{res_id="1"} 1\n', text)
+        self.assertIn("reskeeper_size 2\n", text)
+        self.assertIn("reskeeper_available 2\n", text)
+
+    def test_clock(self):
+        now = [0.0]
+        metrics = KeeperMetrics(clock=lambda: now[0])
+        rk = ResourceKeeper(["a"], metrics=metrics)
+        res = rk.get()
+        now[0] = 3.0
+        rk.release(res)
+        self.assertEqual(metrics.hold.sum, 3.0)
+
+    def test_persistent(self):
+        rk = PersistentResourceKeeper(":memory:", ["a"], metrics=True)
+        rk.release(rk.get())
+        self.assertEqual(rk.leases(), {})
+        self.assertEqual(rk.metrics.counts["release"], 1)
+        rk.close()
+
+
+class HookTestCase(unittest.TestCase):
+
+    def test_hooks(self):
+        rk = ResourceKeeper(["a"])
+        events = []
+        callback = lambda keeper, event, res_id: events.append(
+            (event, res_id))
+        for event in ("get", "miss", "release", "add", "remove"):
+            rk.add_hook(event, callback)
+        res = rk.get()
+        rk.get()
+        rk.release(res)
+        rk.add("b")
+        rk.remove(rk.get())
+        self.assertEqual(events, [("get", 1), ("miss", None), 
+            ("release", 1), ("add", 2), ("get", 1), ("remove", 1)])
+        self.assertIsNone(rk.metrics)
+
+    def test_expired_lease(self):
+        rk = ResourceKeeper(["a"], metrics=True)
+        events = []
+        rk.add_hook("release", lambda keeper, event, res_id: events.append(
+            (event, res_id)))
+        lease = rk.get(ttl=1.0)
+        self.assertEqual(rk.reap(lease.deadline + 1), [1])
+        self.assertEqual(events, [("release", 1)])
+        self.assertEqual(rk.metrics.counts["release"], 1)
+        self.assertEqual(rk.metrics.snapshot()["checked_out"], 0)
+
+    def test_remove_hook(self):
+        rk = ResourceKeeper(["a"])
+        callback = lambda keeper, event, res_id: None
+        rk.add_hook("get", callback)
+        self.assertTrue(rk._observed)
+        rk.remove_hook("get", callback)
+        self.assertFalse(rk._observed)
+        with self.assertRaises(ValueError):
+            rk.remove_hook("get", callback)
+        with self.assertRaises(ValueError):
+            rk.add_hook("borrow", callback)
+
+
+class WaitTimeTestCase(unittest.TestCase):
+
+    def test_threadsafe(self):
+        rk = ThreadSafeResourceKeeper(["a"], metrics=True)
+        res = rk.get()
+        self.assertIsNone(rk.get(timeout=0.01))
+        timer = threading.Timer(0.05, rk.release, (res,))
+        timer.start()
+        self.assertIsNotNone(rk.get(timeout=5))
+        timer.join()
+        self.assertEqual(rk.metrics.wait.count, 2)
+        self.assertGreaterEqual(rk.metrics.wait.sum, 0.05)
+        self.assertEqual(rk.metrics.counts["miss"], 1)
+
+    def test_async(self):
+        rk = AsyncResourceKeeper(["a"], metrics=True)
+
+        async def main():
+            res = await rk.acquire()
+            self.assertIsNone(await rk.acquire(timeout=0.01))
+            asyncio.get_event_loop().call_later(0.05, rk.release, res)
+            self.assertIsNotNone(await rk.acquire(timeout=5))
+
+        asyncio.run(main())
+        self.assertEqual(rk.metrics.wait.count, 2)
+        self.assertEqual(rk.metrics.counts["miss"], 1)
+        self.assertEqual(rk.metrics.counts["get"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,31 @@
+import unittest
+
+from reskeeper import availsets
+
+class OrderedSetTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.os = availsets.OrderedSet()
+
+    def test_add_and_pop(self):
+        self.os.add(1)
+        self.os.add(2)
+        self.os.add(1)
+        self.os.add(3)
+        self.assertEqual(len(self.os), 3)
+        self.assertEqual(self.os.pop(), 1)
+        self.assertEqual(self.os.pop(), 2)
+        self.assertEqual(self.os.pop(), 3)
+
+    def test_pop_error_when_empty(self):
+        with self.assertRaises(IndexError):
+            self.os.pop()
+
+    def test_delete(self):
+        self.os.add(1)
+        self.os.add(2)
+        self.os.delete(1)
+        self.assertFalse(self.os.contain(1))
+        self.assertEqual(self.os.pop(), 2)
+        with self.assertRaises(KeyError):
+            self.os.delete(1)
@@ -0,0 +1,112 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from reskeeper import poolmaps
+from reskeeper.core import Resource
+from reskeeper.persistent import PersistentResourceKeeper
+
+
+class PersistentKeeperTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmpdir, "keeper.db")
+        self.keeper = PersistentResourceKeeper(self.db_path, ["r1", "r2", "r3"])
+
+    def tearDown(self):
+        self.keeper.close()
+        shutil.rmtree(self.tmpdir)
+
+    def reopen(self):
+        self.keeper.close()
+        self.keeper = PersistentResourceKeeper(self.db_path)
+
+    def test_reopen_restores_state(self):
+        res = self.keeper.get()
+        self.assertEqual(res.to_dict(), {"res_id": 1, "data": "r1"})
+        self.reopen()
+        self.assertEqual(self.keeper.size, 3)
+        self.assertEqual(self.keeper.avail_num, 2)
+        self.assertEqual(list(self.keeper.leases()), [1])
+        self.assertEqual(self.keeper.get().data, "r2")
+
+    def test_release_clears_lease(self):
+        res = self.keeper.get()
+        self.keeper.release(res)
+        self.reopen()
+        self.assertEqual(self.keeper.leases(), {})
+        self.assertEqual(self.keeper.avail_num, 3)
+        self.assertEqual([self.keeper.get().data for _ in range(3)],
+            ["r2", "r3", "r1"])
+
+    def test_remove_clears_lease(self):
+        res = self.keeper.get()
+        self.keeper.remove(res)
+        self.keeper.remove(self.keeper.get_many(2)[1])
+        self.assertEqual(list(self.keeper.leases()), [2])
+        self.reopen()
+        self.assertEqual(self.keeper.size, 1)
+        self.assertEqual(list(self.keeper.leases()), [2])
+        with self.assertRaises(KeyError):
+            self.keeper.remove(res)
+
+    def test_remove_available(self):
+        self.keeper.remove(Resource(2, None))
+        self.assertEqual((self.keeper.size, self.keeper.avail_num), (2, 2))
+        self.reopen()
+        self.assertEqual([self.keeper.get().data for _ in range(2)],
+            ["r1", "r3"])
+
+    def test_add_is_atomic(self):
+        with self.keeper.pool.conn as conn:
+            conn.execute("drop table meta")
+        with self.assertRaises(sqlite3.OperationalError):
+            self.keeper.load(["r4", "r5"])
+        conn = self.keeper.pool.conn
+        self.assertEqual(
+            conn.execute("select count(*) from pool").fetchone()[0], 3)
+        self.assertEqual(
+            conn.execute("select count(*) from avail").fetchone()[0], 3)
+        self.assertEqual((self.keeper.size, self.keeper.avail_num), (3, 3))
+
+    def test_load_batches_reopen(self):
+        self.keeper.load(str(i) for i in range(2500))
+        self.keeper.add("last")
+        self.reopen()
+        self.assertEqual(self.keeper.size, 2504)
+        self.assertEqual(self.keeper.avail_num, 2504)
+        self.assertEqual(self.keeper._max_id, 2504)
+
+    def test_recover_leases(self):
+        self.keeper.get()
+        self.keeper.get()
+        self.reopen()
+        self.assertEqual(self.keeper.recover_leases(), [1, 2])
+        self.assertEqual(self.keeper.avail_num, 3)
+        self.assertEqual(self.keeper.leases(), {})
+
+    def test_ids_not_reused(self):
+        self.keeper.add("r4")
+        self.reopen()
+        self.keeper.add("r5")
+        self.assertEqual(self.keeper.pool.get(5), "r5")
+        self.assertEqual(self.keeper.size, 5)
+
+
+class SimpleSqliteReopenTestCase(unittest.TestCase):
+
+    def test_reopen_existing_db(self):
+        tmpdir = tempfile.mkdtemp()
+        db_path = os.path.join(tmpdir, "pool.db")
+        try:
+            pool = poolmaps.SimpleSqliteMap(db_path)
+            pool.put(1, "123")
+            pool.close()
+            pool = poolmaps.SimpleSqliteMap(db_path)
+            self.assertEqual(pool.get(1), "123")
+            pool.close()
+        finally:
+            shutil.rmtree(tmpdir)
@@ -0,0 +1,137 @@
+import random
+import unittest
+
+from reskeeper import availsets
+from reskeeper.core import Resource, ResourceKeeper
+
+
+class HeapPopTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.ph = availsets.PriorityHeap()
+
+    def test_pop_lowest_first(self):
+        for item, priority in [(1, 5), (2, 1), (3, 3), (4, 1)]:
+            self.ph.add(item, priority)
+        self.assertEqual([self.ph.pop() for _ in range(4)], [2, 4, 3, 1])
+
+    def test_reverse(self):
+        ph = availsets.PriorityHeap(reverse=True)
+        for item, priority in [(1, 0.5), (2, 0.9), (3, 0.1)]:
+            ph.add(item, priority)
+        self.assertEqual([ph.pop() for _ in range(3)], [2, 1, 3])
+
+    def test_pop_error_when_empty(self):
+        with self.assertRaises(IndexError):
+            self.ph.pop()
+
+    def test_random_against_sorted(self):
+        rng = random.Random(7)
+        expected = []
+        for item in range(300):
+            priority = rng.randint(0, 20)
+            self.ph.add(item, priority)
+            expected.append((priority, item))
+        for item in range(0, 300, 3):
+            self.ph.delete(item)
+        for item in range(1, 300, 3):
+            self.ph.update_priority(item, 50 - item % 7)
+        priorities = self.ph.priorities
+        remaining = sorted(
+            (priorities[item], item) for _, item in expected if item % 3)
+        popped = [self.ph.pop() for _ in range(len(self.ph))]
+        self.assertEqual([priorities[i] for i in popped],
+            [p for p, _ in remaining])
+        self.assertEqual(sorted(popped), sorted(i for _, i in remaining))
+
+
+class HeapPriorityTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.ph = availsets.PriorityHeap()
+
+    def test_update_priority(self):
+        self.ph.add(1, 1)
+        self.ph.add(2, 2)
+        self.ph.update_priority(2, 0)
+        self.assertEqual(self.ph.peek(), 2)
+
+    def test_add_back_keeps_priority(self):
+        self.ph.add(1, 9)
+        self.ph.add(2, 5)
+        self.assertEqual(self.ph.pop(), 2)
+        self.ph.add(3)
+        self.ph.add(2)
+        self.assertEqual([self.ph.pop() for _ in range(3)], [3, 2, 1])
+
+    def test_delete(self):
+        self.ph.add(1, 1)
+        self.ph.add(2, 2)
+        self.ph.delete(1)
+        self.assertFalse(self.ph.contain(1))
+        self.assertEqual(self.ph.pop(), 2)
+        with self.assertRaises(KeyError):
+            self.ph.delete(1)
+
+    def test_keeper_hands_out_best(self):
+        ph = availsets.PriorityHeap()
+        keeper = ResourceKeeper(["slow", "fast"], avail_set=ph)
+        ph.update_priority(1, 300)
+        ph.update_priority(2, 20)
+        res = keeper.get()
+        self.assertEqual(res.data, "fast")
+        keeper.release(res)
+        self.assertEqual(keeper.get().data, "fast")
+
+    def test_keeper_remove_forgets_priority(self):
+        ph = availsets.PriorityHeap()
+        keeper = ResourceKeeper(["a", "b"], avail_set=ph)
+        ph.update_priority(1, 5)
+        ph.update_priority(2, 7)
+        keeper.remove(keeper.get())
+        keeper.remove(Resource(2, "b"))
+        self.assertEqual(ph.priorities, {})
+
+
+class WeightedRandomTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.ws = availsets.WeightedRandomSet(rng=random.Random(1))
+
+    def test_pop_all(self):
+        for item in range(50):
+            self.ws.add(item, item + 1)
+        self.ws.delete(10)
+        popped = [self.ws.pop() for _ in range(49)]
+        self.assertEqual(sorted(popped), [i for i in range(50) if i != 10])
+        with self.assertRaises(IndexError):
+            self.ws.pop()
+
+    def test_weights_bias_selection(self):
+        counts = {1: 0, 2: 0}
+        for _ in range(2000):
+            self.ws.add(1, 9)
+            self.ws.add(2, 1)
+            counts[self.ws.pop()] += 1
+            self.ws.delete(1 if self.ws.contain(1) else 2)
+        self.assertGreater(counts[1], 1600)
+        self.assertGreater(counts[2], 100)
+
+    def test_total_cancelled_to_zero(self):
+        self.ws.add(1, 1e12)
+        self.ws.add(2, 1e-6)
+        self.ws.delete(1)
+        self.assertEqual(self.ws.pop(), 2)
+        self.ws.add(3, 1e12)
+        self.ws.add(4, 1e-6)
+        self.assertEqual(sorted([self.ws.pop(), self.ws.pop()]), [3, 4])
+
+    def test_update_weight(self):
+        self.ws.add(1, 1)
+        self.ws.add(2, 1)
+        self.ws.update_priority(1, 1e-9)
+        self.assertEqual(self.ws.pop(), 2)
+
+    def test_bad_weight(self):
+        with self.assertRaises(ValueError):
+            self.ws.add(1, 0)
@@ -0,0 +1,94 @@
+import threading
+import time
+import unittest
+
+from reskeeper import ratelimit
+from reskeeper.core import Resource, ResourceKeeper, ThreadSafeResourceKeeper
+
+
+class CooldownTestCase(unittest.TestCase):
+
+    def test_min_interval(self):
+        cooldown = ratelimit.Cooldown(min_interval=5)
+        self.assertTrue(cooldown.schedule(1, now=0))
+        self.assertTrue(cooldown.schedule(2, now=1))
+        self.assertIn(1, cooldown)
+        self.assertEqual(cooldown.next_ready(), 5)
+        self.assertEqual(cooldown.ready(now=5.5), [1])
+        self.assertEqual(cooldown.ready(now=6), [2])
+        self.assertEqual(len(cooldown), 0)
+
+    def test_token_bucket(self):
+        cooldown = ratelimit.Cooldown(rate=1, burst=2)
+        cooldown.take(1, now=0)
+        self.assertFalse(cooldown.schedule(1, now=0))
+        cooldown.take(1, now=0)
+        self.assertTrue(cooldown.schedule(1, now=0))
+        self.assertEqual(cooldown.next_ready(), 1)
+        self.assertEqual(cooldown.ready(now=1), [1])
+
+    def test_forget(self):
+        cooldown = ratelimit.Cooldown(min_interval=5)
+        cooldown.schedule(1, now=0)
+        cooldown.forget(1)
+        self.assertEqual(cooldown.ready(now=10), [])
+        self.assertIsNone(cooldown.next_ready())
+
+
+class KeeperCooldownTestCase(unittest.TestCase):
+
+    def test_released_resource_rests(self):
+        keeper = ResourceKeeper(["r1", "r2"], cooldown=0.05)
+        res = keeper.get()
+        keeper.release(res)
+        self.assertEqual(keeper.avail_num, 1)
+        self.assertEqual(keeper.cooling_num, 1)
+        self.assertEqual(keeper.get().data, "r2")
+        self.assertIsNone(keeper.get())
+        time.sleep(0.06)
+        self.assertEqual(keeper.get().data, "r1")
+        self.assertEqual(keeper.cooling_num, 0)
+
+    def test_release_repeatedly(self):
+        keeper = ResourceKeeper(["r1"], cooldown=10)
+        res_id = keeper.get().res_id
+        keeper.release(Resource(res_id, None))
+        keeper.release(Resource(res_id, None))
+        self.assertEqual(keeper.cooling_num, 1)
+        self.assertEqual(len(keeper._cooldown.heap), 1)
+
+    def test_rate_limit(self):
+        keeper = ResourceKeeper(["r1"], rate_limit=(20, 2))
+        for _ in range(2):
+            keeper.release(keeper.get())
+        self.assertIsNone(keeper.get())
+        time.sleep(0.06)
+        self.assertEqual(keeper.get().data, "r1")
+
+    def test_remove_cooling(self):
+        keeper = ResourceKeeper(["r1"], cooldown=0.01)
+        res = keeper.get()
+        res_id = res.res_id
+        keeper.release(res)
+        keeper.remove(Resource(res_id, None))
+        time.sleep(0.02)
+        self.assertIsNone(keeper.get())
+        self.assertEqual(keeper.avail_num, 0)
+
+
+class ThreadSafeCooldownTestCase(unittest.TestCase):
+
+    def test_waiter_woken_after_cooldown(self):
+        keeper = ThreadSafeResourceKeeper(["r1"], cooldown=0.05)
+        res = keeper.get()
+        got = []
+        waiter = threading.Thread(
+            target=lambda: got.append(keeper.get(timeout=5)))
+        waiter.start()
+        time.sleep(0.02)
+        start = time.monotonic()
+        keeper.release(res)
+        waiter.join()
+        self.assertEqual(got[0].data, "r1")
+        self.assertGreaterEqual(time.monotonic() - start, 0.04)
+        self.assertLess(time.monotonic() - start, 1)
@@ -4,6 +4,15 @@ import os
 from reskeeper.core import Resource, ResourceKeeper
 
 
+class ResourceTestCase(unittest.TestCase):
+
+    def test_no_instance_dict(self):
+        res = Resource(1, "res1")
+        self.assertFalse(hasattr(res, "__dict__"))
+        with self.assertRaises(AttributeError):
+            res.other = 1
+
+
 class GetTestCase(unittest.TestCase):
 
     def setUp(self):
@@ -90,6 +99,35 @@ class ReleaseTestCase(unittest.TestCase):
         self.assertIsNone(res.res_id)
         self.assertIsNone(res.data)
 
+    def test_release_destroyed(self):
+        self.keeper.pool.put(1, "res1")
+        res = Resource(1, "res1")
+        self.keeper.release(res)
+        self.keeper.release(res)
+        self.assertEqual(self.keeper.avail_num, 1)
+        self.assertFalse(self.keeper.available.contain(None))
+
+    def test_release_none_data(self):
+        self.keeper.load([None, "a"])
+        self.keeper.release(self.keeper.get())
+        self.assertEqual((self.keeper.size, self.keeper.avail_num), (2, 2))
+
+    def test_release_does_not_read_pool(self):
+        self.keeper.load(["res1"])
+        res = self.keeper.get()
+        self.keeper.pool.get = None
+        self.keeper.release(res)
+        self.assertEqual(self.keeper.avail_num, 1)
+
+    def test_release_removed(self):
+        self.keeper.load(["res1"])
+        res = self.keeper.get()
+        self.keeper.remove(Resource(res.res_id, None))
+        self.keeper.release(res)
+        self.assertEqual(self.keeper.avail_num, 0)
+        self.assertFalse(self.keeper.available.contain(1))
+        self.assertIsNone(res.res_id)
+
 
 
 class AddTestCase(unittest.TestCase):
@@ -118,6 +156,15 @@ class RemoveTestCase(unittest.TestCase):
         self.assertEqual(self.keeper.avail_num, 0)
         self.assertIsNone(self.keeper.pool.get(100))
 
+    def test_remove_available(self):
+        self.keeper.load(["a", "b"])
+        self.keeper.remove(Resource(1, "a"))
+        self.assertEqual(self.keeper.size, 1)
+        self.assertEqual(self.keeper.avail_num, 1)
+        self.assertFalse(self.keeper.available.contain(1))
+        self.assertEqual(self.keeper.get().data, "b")
+        self.assertIsNone(self.keeper.get())
+
     def test_remove_not_exist_res(self):
         with self.assertRaises(KeyError):
             self.keeper.remove(Resource(45454, "fsaf"))
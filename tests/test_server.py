@@ -0,0 +1,151 @@
+import asyncio
+import json
+import threading
+import time
+import unittest
+
+from reskeeper.aio import AsyncResourceKeeper
+from reskeeper.client import KeeperClient, KeeperError
+from reskeeper.server import KeeperServer
+
+
+class ServerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.keeper = AsyncResourceKeeper(["r1", "r2"])
+        self.server = KeeperServer(self.keeper, port=0)
+        self.loop.run_until_complete(self.server.start())
+        self.thread = threading.Thread(target=self.loop.run_forever)
+        self.thread.start()
+        self.client = KeeperClient(port=self.server.port)
+
+    def tearDown(self):
+        self.client.close()
+        asyncio.run_coroutine_threadsafe(
+            self.server.close(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+        self.loop.close()
+
+    def test_get_release(self):
+        res = self.client.get()
+        self.assertEqual(res.to_dict(), {"res_id": 1, "data": "r1"})
+        self.assertEqual(self.client.stats(), {"size": 2, "avail_num": 1})
+        self.client.release(res)
+        self.assertIsNone(res.res_id)
+        self.assertEqual(self.client.stats(), {"size": 2, "avail_num": 2})
+
+    def test_get_nowait_and_timeout(self):
+        self.client.get_many(2)
+        self.assertIsNone(self.client.get(block=False))
+        self.assertIsNone(self.client.get(timeout=0.01))
+
+    def test_blocking_get_woken_by_release(self):
+        held = self.client.get_many(2)
+        got = []
+        waiter = threading.Thread(
+            target=lambda: got.append(self.client.get(timeout=5)))
+        waiter.start()
+        time.sleep(0.05)
+        self.client.release(held[0])
+        waiter.join()
+        self.assertEqual(got[0].data, "r1")
+
+    def test_add_remove(self):
+        res_id = self.client.add({"host": "127.0.0.1"})
+        self.assertEqual(res_id, 3)
+        res = self.client.get_many(3)[2]
+        self.assertEqual(res.data, {"host": "127.0.0.1"})
+        self.client.remove(res)
+        self.assertEqual(self.client.stats()["size"], 2)
+        with self.assertRaises(KeyError):
+            self.client.remove(res)
+
+    def test_release_not_held(self):
+        other = KeeperClient(port=self.server.port)
+        try:
+            res = other.get()
+            with self.assertRaises(KeyError):
+                self.client._call("release", res_id=res.res_id)
+            with self.assertRaises(KeyError):
+                self.client._call("release", res_id=42)
+            with self.assertRaises(KeyError):
+                self.client.release_many([self.client.get(), res])
+            self.assertEqual(self.client.stats()["avail_num"], 0)
+        finally:
+            other.close()
+
+    def test_remove_held(self):
+        res = self.client.get()
+        res_id = res.res_id
+        self.client.remove(res)
+        self.assertNotIn(res_id, self.server._holders)
+        with self.assertRaises(KeyError):
+            self.client._call("release", res_id=res_id)
+        self.client.close()
+        self.client = KeeperClient(port=self.server.port)
+        self.assertEqual(self.client.stats(), {"size": 1, "avail_num": 1})
+
+    def test_session_shared_by_connections(self):
+        other = KeeperClient(port=self.server.port, pool_size=2)
+        try:
+            res = other.get_many(2)[0]
+            held = []
+            # a blocking get keeps one connection busy
+            waiter = threading.Thread(
+                target=lambda: held.append(other.get(timeout=5)))
+            waiter.start()
+            time.sleep(0.05)
+            other.release(res)
+            waiter.join()
+            self.assertEqual(len(other._conns), 2)
+            other._conns[0].close()
+            time.sleep(0.05)
+            # the other connection of the session still holds them
+            self.assertEqual(self.client.stats()["avail_num"], 0)
+        finally:
+            other.close()
+        # the server releases them once it notices the disconnect
+        end = time.monotonic() + 5
+        while (self.client.stats()["avail_num"] < 2 and 
+                time.monotonic() < end):
+            time.sleep(0.01)
+        self.assertEqual(self.client.stats()["avail_num"], 2)
+
+    def test_request_over_limit(self):
+        self.server.limit = 1024
+        asyncio.run_coroutine_threadsafe(
+            self.server.close(), self.loop).result(5)
+        asyncio.run_coroutine_threadsafe(
+            self.server.start(), self.loop).result(5)
+        client = KeeperClient(port=self.server.port)
+        try:
+            with self.assertRaises(KeeperError):
+                client.add("x" * 5000)
+            self.assertEqual(client.add("y"), 3)
+            conn = client._conns[0]
+            conn.sock.sendall(b"x" * 3000 + b'\n{"id": 7, "op": "stats"}\n')
+            error = json.loads(conn.reader.readline())
+            self.assertEqual(error["error"], "ValueError")
+            self.assertEqual(json.loads(conn.reader.readline())["result"],
+                             {"size": 3, "avail_num": 3})
+        finally:
+            client.close()
+
+    def test_pipeline(self):
+        res = self.client.get()
+        pipe = self.client.pipeline()
+        pipe.release(res).get().add("r3")
+        released, res2, res_id = pipe.execute()
+        self.assertIsNone(released)
+        self.assertEqual(res2.data, "r2")
+        self.assertEqual(res_id, 3)
+
+    def test_release_on_disconnect(self):
+        other = KeeperClient(port=self.server.port)
+        other.get_many(2)
+        self.assertEqual(self.client.stats()["avail_num"], 0)
+        other.close()
+        res = self.client.get(timeout=5)
+        self.assertIsNotNone(res)
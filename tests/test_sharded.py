@@ -0,0 +1,137 @@
+import threading
+import time
+import unittest
+
+from reskeeper import ShardedResourceKeeper, availsets
+
+
+class ShardedTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.rk = ShardedResourceKeeper(list(range(10)), num_shards=4)
+
+    def test_load(self):
+        self.assertEqual(self.rk.size, 10)
+        self.assertEqual(self.rk.avail_num, 10)
+        self.assertEqual([shard.size for shard in self.rk.shards], 
+                         [3, 3, 2, 2])
+
+    def test_res_id_encodes_shard(self):
+        resources = self.rk.get_many(10)
+        self.assertEqual(len({res.res_id for res in resources}), 10)
+        for res in resources:
+            shard = self.rk.shards[res.res_id % 4]
+            local_id = res.res_id // 4
+            self.assertEqual(shard.pool.get(local_id), res.data)
+        self.assertEqual(sorted(res.data for res in resources), 
+                         list(range(10)))
+
+    def test_release(self):
+        res = self.rk.get()
+        self.assertEqual(self.rk.avail_num, 9)
+        self.rk.release(res)
+        self.assertEqual(self.rk.avail_num, 10)
+        self.assertIsNone(res.res_id)
+        self.rk.release(res)
+        self.assertEqual(self.rk.avail_num, 10)
+
+    def test_steal(self):
+        resources = [self.rk.get(block=False) for _ in range(10)]
+        self.assertNotIn(None, resources)
+        self.assertIsNone(self.rk.get(block=False))
+        self.assertIsNone(self.rk.get(timeout=0.01))
+
+    def test_affinity(self):
+        res = self.rk.get()
+        home = res.res_id % 4
+        self.rk.release(res)
+        self.assertEqual(self.rk.get().res_id % 4, home)
+
+    def test_get_many_all_or_nothing(self):
+        self.assertEqual(self.rk.get_many(11, all_or_nothing=True), [])
+        self.assertEqual(len(self.rk.get_many(10, all_or_nothing=True)), 10)
+
+    def test_add_remove(self):
+        self.rk.add(10)
+        self.assertEqual(self.rk.size, 11)
+        res = self.rk.get_many(11)[-1]
+        self.rk.remove(res)
+        self.assertEqual(self.rk.size, 10)
+        with self.assertRaises(KeyError):
+            self.rk.remove(res)
+
+    def test_lease(self):
+        lease = self.rk.get(ttl=10)
+        global_id = lease.res_id
+        lease.renew(ttl=20)
+        self.assertEqual(lease.res_id, global_id)
+        self.assertGreater(lease.remaining(), 10)
+        self.rk.release(lease)
+        self.assertEqual(self.rk.avail_num, 10)
+
+    def test_acquire(self):
+        with self.rk.acquire() as res:
+            self.assertEqual(self.rk.avail_num, 9)
+        self.assertEqual(self.rk.avail_num, 10)
+
+    def test_where(self):
+        rk = ShardedResourceKeeper([{"region": "EU"}, {"region": "US"}], 
+            num_shards=2, index_on=("region",))
+        self.assertEqual(rk.get(where={"region": "US"}).data["region"], "US")
+        self.assertIsNone(rk.get(where={"region": "US"}, timeout=0.01))
+
+    def test_factories(self):
+        rk = ShardedResourceKeeper([1, 2], num_shards=2,
+            avail_set_factory=availsets.HashStack)
+        self.assertIsInstance(rk.shards[1].available, availsets.HashStack)
+        with self.assertRaises(TypeError):
+            ShardedResourceKeeper(avail_set=availsets.HashStack())
+        with self.assertRaises(ValueError):
+            ShardedResourceKeeper(num_shards=0)
+
+
+class ShardedThreadTestCase(unittest.TestCase):
+
+    def test_wait_for_release(self):
+        rk = ShardedResourceKeeper([1], num_shards=4)
+        res = rk.get()
+        timer = threading.Timer(0.05, rk.release, (res,))
+        timer.start()
+        self.assertIsNotNone(rk.get(timeout=5))
+        timer.join()
+
+    def test_wait_for_expiry(self):
+        rk = ShardedResourceKeeper([1], num_shards=2)
+        rk.get(ttl=0.05)
+        start = time.monotonic()
+        self.assertIsNotNone(rk.get(timeout=5))
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_exclusive(self):
+        rk = ShardedResourceKeeper(list(range(4)), num_shards=4)
+        holding = set()
+        errors = []
+        guard = threading.Lock()
+
+        def worker():
+            for _ in range(300):
+                res = rk.get(timeout=5)
+                with guard:
+                    if res.data in holding:
+                        errors.append(res.data)
+                    holding.add(res.data)
+                with guard:
+                    holding.discard(res.data)
+                rk.release(res)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(rk.avail_num, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import multiprocessing
+import unittest
+
+from reskeeper.shared import SharedResourceKeeper
+
+
+def hold_one(keeper, barrier, queue):
+    res = keeper.get(timeout=10)
+    queue.put(res.res_id)
+    # every worker holds its resource at the same time here
+    barrier.wait(10)
+    keeper.release(res)
+    keeper.close()
+
+
+def churn(keeper, rounds, queue):
+    count = 0
+    for _ in range(rounds):
+        res = keeper.get(timeout=10)
+        if res is not None:
+            count += 1
+            keeper.release(res)
+    queue.put(count)
+    keeper.close()
+
+
+class SharedKeeperTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.keeper = SharedResourceKeeper(["r1", "r2", "r3"])
+
+    def tearDown(self):
+        self.keeper.unlink()
+
+    def test_get_release(self):
+        res = self.keeper.get()
+        self.assertEqual(res.to_dict(), {"res_id": 1, "data": "r1"})
+        self.assertEqual(self.keeper.avail_num, 2)
+        self.keeper.release(res)
+        self.assertEqual(self.keeper.avail_num, 3)
+        self.assertEqual([self.keeper.get().data for _ in range(3)],
+            ["r2", "r3", "r1"])
+        self.assertIsNone(self.keeper.get(block=False))
+        self.assertIsNone(self.keeper.get(timeout=0.01))
+
+    def test_release_repeatedly(self):
+        res = self.keeper.get()
+        res_id = res.res_id
+        self.keeper.release(res)
+        res.res_id = res_id
+        self.keeper.release(res)
+        self.assertEqual(self.keeper.avail_num, 3)
+
+    def test_exclusive_across_processes(self):
+        ctx = multiprocessing.get_context()
+        barrier = ctx.Barrier(3)
+        queue = ctx.Queue()
+        procs = [ctx.Process(target=hold_one,
+            args=(self.keeper, barrier, queue)) for _ in range(3)]
+        for p in procs:
+            p.start()
+        res_ids = sorted(queue.get(timeout=10) for _ in procs)
+        for p in procs:
+            p.join(10)
+        self.assertEqual(res_ids, [1, 2, 3])
+        self.assertEqual(self.keeper.avail_num, 3)
+
+    def test_churn_across_processes(self):
+        ctx = multiprocessing.get_context()
+        queue = ctx.Queue()
+        procs = [ctx.Process(target=churn, args=(self.keeper, 200, queue))
+            for _ in range(4)]
+        for p in procs:
+            p.start()
+        counts = [queue.get(timeout=30) for _ in procs]
+        for p in procs:
+            p.join(10)
+        self.assertEqual(counts, [200] * 4)
+        self.assertEqual(self.keeper.avail_num, 3)
@@ -0,0 +1,151 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from reskeeper import ResourceKeeper, ThreadSafeResourceKeeper
+from reskeeper import PersistentResourceKeeper, availsets, poolmaps
+from reskeeper import snapshots
+
+
+class SnapshotTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "keeper.snap")
+        self.rk = ResourceKeeper([{"n": i} for i in range(10)])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_round_trip(self):
+        self.rk.get()
+        self.rk.remove(self.rk.get())
+        self.rk.snapshot(self.path)
+        restored = ResourceKeeper.restore(self.path)
+        self.assertEqual(restored.size, 9)
+        self.assertEqual(restored.avail_num, 9)
+        self.assertEqual(restored._max_id, 10)
+        self.assertIsNone(restored.pool.get(2))
+        self.assertEqual(sorted(res.data["n"] for res in 
+                                restored.get_many(10)), 
+                         [0] + list(range(2, 10)))
+        restored.add({"n": 10})
+        self.assertEqual(restored.get().res_id, 11)
+
+    def test_reclaim(self):
+        self.rk.get_many(3)
+        self.rk.get(ttl=60)
+        self.rk.snapshot(self.path)
+        restored = ResourceKeeper.restore(self.path, reclaim=True)
+        self.assertEqual(restored.avail_num, 10)
+        self.assertIsNone(restored._reaper)
+
+    def test_checked_out_without_lease(self):
+        held = self.rk.get_many(3)
+        lease = self.rk.get(ttl=60)
+        self.rk.snapshot(self.path)
+        restored = ResourceKeeper.restore(self.path)
+        self.assertEqual(restored.avail_num, 9)
+        for res in held:
+            self.assertTrue(restored.available.contain(res.res_id))
+        self.assertFalse(restored.available.contain(lease.res_id))
+        self.assertIn(lease.res_id, restored._reaper.active)
+
+    def test_leases(self):
+        lease = self.rk.get(ttl=0.05)
+        self.rk.snapshot(self.path)
+        restored = ResourceKeeper.restore(self.path)
+        self.assertEqual(restored.avail_num, 9)
+        self.assertFalse(restored.available.contain(lease.res_id))
+        time.sleep(0.06)
+        self.assertEqual(len(restored.get_many(10)), 10)
+
+    def test_cooling_saved_as_available(self):
+        rk = ResourceKeeper(["a"], cooldown=60)
+        rk.release(rk.get())
+        self.assertEqual(rk.cooling_num, 1)
+        rk.snapshot(self.path)
+        self.assertEqual(ResourceKeeper.restore(self.path).avail_num, 1)
+
+    def test_keeper_options(self):
+        rk = ResourceKeeper([{"region": "EU"}, {"region": "US"}])
+        rk.snapshot(self.path)
+        restored = ThreadSafeResourceKeeper.restore(self.path,
+            avail_set=availsets.HashStack(), index_on=("region",))
+        self.assertIsInstance(restored, ThreadSafeResourceKeeper)
+        self.assertIsInstance(restored.available, availsets.HashStack)
+        res = restored.get(where={"region": "US"}, block=False)
+        self.assertEqual(res.data, {"region": "US"})
+        self.assertIsNone(restored.get(where={"region": "US"}, block=False))
+
+    def test_not_empty(self):
+        self.rk.snapshot(self.path)
+        with self.assertRaises(ValueError):
+            ResourceKeeper.restore(self.path, resources=["a"])
+
+    def test_bad_files(self):
+        with open(self.path, "wb") as f:
+            f.write(b"not a snapshot at all, really not one, nope, no")
+        with self.assertRaises(ValueError):
+            ResourceKeeper.restore(self.path)
+        self.rk.snapshot(self.path)
+        with open(self.path, "rb") as f:
+            content = f.read()
+        with open(self.path, "wb") as f:
+            f.write(content[:-1])
+        with self.assertRaises(ValueError):
+            ResourceKeeper.restore(self.path)
+        with open(self.path, "wb") as f:
+            f.write(content[:8] + b"\x09" + content[9:])
+        with self.assertRaises(ValueError):
+            ResourceKeeper.restore(self.path)
+
+    def test_format(self):
+        self.rk.get()
+        self.rk.snapshot(self.path)
+        snap = snapshots.read(self.path)
+        self.assertEqual(snap.max_id, 10)
+        self.assertEqual(snap.avail_ids.tolist(), list(range(2, 11)))
+        self.assertEqual(len(snap.data), 10)
+        self.assertFalse(os.path.exists(self.path + ".tmp"))
+
+    def test_log_map(self):
+        pool_map = poolmaps.LogMap(os.path.join(self.tmpdir, "pool.log"))
+        rk = ResourceKeeper([b"a", b"b"], pool_map=pool_map)
+        rk.snapshot(self.path)
+        pool_map.close()
+        restored = ResourceKeeper.restore(self.path)
+        self.assertEqual(restored.get().data, b"a")
+
+    def test_persistent(self):
+        self.rk.snapshot(self.path)
+        db_path = os.path.join(self.tmpdir, "keeper.db")
+        restored = PersistentResourceKeeper.restore(self.path, 
+            db_path=db_path, codec="json")
+        self.assertEqual(restored.avail_num, 10)
+        restored.close()
+        reopened = PersistentResourceKeeper(db_path, codec="json")
+        self.assertEqual(reopened.size, 10)
+        self.assertEqual(reopened._max_id, 10)
+        self.assertEqual(reopened.get().data, {"n": 0})
+        reopened.close()
+
+    def test_persistent_leases(self):
+        lease = self.rk.get(ttl=60)
+        self.rk.snapshot(self.path)
+        db_path = os.path.join(self.tmpdir, "keeper.db")
+        restored = PersistentResourceKeeper.restore(self.path, 
+            db_path=db_path, codec="json")
+        self.assertEqual(list(restored.leases()), [lease.res_id])
+        restored.close()
+        reopened = PersistentResourceKeeper(db_path, codec="json")
+        self.assertEqual((reopened.size, reopened.avail_num), (10, 9))
+        self.assertEqual(reopened.recover_leases(), [lease.res_id])
+        self.assertEqual(reopened.avail_num, 10)
+        reopened.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from reskeeper import poolmaps
+from reskeeper.core import ResourceKeeper
+
+
+class SqliteMapTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.map = poolmaps.SqliteMap(":memory:")
+
+    def tearDown(self):
+        self.map.close()
+
+    def test_put_get(self):
+        self.map.put(1, "123")
+        self.assertEqual(self.map.get(1), "123")
+        self.map.put(1, "abc")
+        self.assertEqual(self.map.get(1), "abc")
+        self.assertIsNone(self.map.get(2))
+
+    def test_put_quotes(self):
+        self.map.put(1, "a'b\"c")
+        self.assertEqual(self.map.get(1), "a'b\"c")
+
+    def test_put_not_str_error(self):
+        with self.assertRaises(TypeError):
+            self.map.put(1, 123)
+        with self.assertRaises(TypeError):
+            self.map.put_many([(1, "1"), (2, 2)])
+        self.assertIsNone(self.map.get(1))
+
+    def test_delete(self):
+        self.map.put(1, "123")
+        self.map.delete(1)
+        self.assertIsNone(self.map.get(1))
+        with self.assertRaises(KeyError):
+            self.map.delete(1)
+
+    def test_put_many_get_many(self):
+        self.map.put_many((i, str(i)) for i in range(2000))
+        self.assertEqual(self.map.get_many([3, 1999, 2000]),
+            ["3", "1999", None])
+
+    def test_memory_outlives_threads(self):
+        # created by a thread that ended, with it its connection
+        maps = []
+        t = threading.Thread(
+            target=lambda: maps.append(poolmaps.SqliteMap(":memory:")))
+        t.start()
+        t.join()
+        maps[0].put(1, "abc")
+        self.assertEqual(maps[0].get(1), "abc")
+        maps[0].close()
+
+    def test_bad_synchronous(self):
+        with self.assertRaises(ValueError):
+            poolmaps.SqliteMap(":memory:", synchronous="sometimes")
+
+
+class SqliteMapFileTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmpdir, "pool.db")
+        self.map = poolmaps.SqliteMap(self.db_path)
+
+    def tearDown(self):
+        self.map.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_wal_mode(self):
+        mode = self.map.conn.execute("pragma journal_mode").fetchone()[0]
+        self.assertEqual(mode.lower(), "wal")
+
+    def test_reopen(self):
+        self.map.put(1, "123")
+        self.map.close()
+        self.map = poolmaps.SqliteMap(self.db_path)
+        self.assertEqual(self.map.get(1), "123")
+
+    def test_read_from_threads(self):
+        self.map.put_many((i, str(i)) for i in range(100))
+        results = []
+
+        def reader():
+            results.append(self.map.get_many(range(100)))
+
+        threads = [threading.Thread(target=reader) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(results), 4)
+        self.assertEqual(results[0], [str(i) for i in range(100)])
+        # only the connection of the main thread is left
+        self.assertEqual(len(self.map._conns), 1)
+
+    def test_many_short_threads(self):
+        self.map.put(1, "1")
+        for _ in range(50):
+            t = threading.Thread(target=self.map.get, args=(1,))
+            t.start()
+            t.join()
+        self.assertEqual(len(self.map._conns), 1)
+        self.assertEqual(self.map.get(1), "1")
+
+    def test_keeper_load(self):
+        keeper = ResourceKeeper(pool_map=self.map)
+        keeper.load((str(i) for i in range(2500)), batch_size=1000)
+        self.assertEqual(keeper.size, 2500)
+        self.assertEqual(keeper.avail_num, 2500)
+        self.assertEqual(keeper.get().data, "0")
@@ -0,0 +1,86 @@
+import threading
+import time
+import unittest
+
+from reskeeper.core import ThreadSafeResourceKeeper
+
+
+class BlockingGetTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.keeper = ThreadSafeResourceKeeper(["res1"])
+
+    def test_get_nowait_empty(self):
+        self.keeper.get()
+        self.assertIsNone(self.keeper.get(block=False))
+
+    def test_get_timeout(self):
+        self.keeper.get()
+        start = time.monotonic()
+        self.assertIsNone(self.keeper.get(timeout=0.05))
+        self.assertGreaterEqual(time.monotonic() - start, 0.04)
+
+    def test_release_wakes_waiter(self):
+        res = self.keeper.get()
+        got = []
+        waiter = threading.Thread(
+            target=lambda: got.append(self.keeper.get(timeout=5)))
+        waiter.start()
+        time.sleep(0.05)
+        self.keeper.release(res)
+        waiter.join()
+        self.assertEqual(got[0].data, "res1")
+        self.assertEqual(self.keeper.avail_num, 0)
+
+
+class ConcurrentUseTestCase(unittest.TestCase):
+
+    def test_exclusive_under_contention(self):
+        keeper = ThreadSafeResourceKeeper(range(4))
+        holders = set()
+        errors = []
+        guard = threading.Lock()
+
+        def worker():
+            for _ in range(200):
+                res = keeper.get(timeout=5)
+                with guard:
+                    if res.res_id in holders:
+                        errors.append(res.res_id)
+                    holders.add(res.res_id)
+                with guard:
+                    holders.discard(res.res_id)
+                keeper.release(res)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(keeper.size, 4)
+        self.assertEqual(keeper.avail_num, 4)
+
+
+class BlockingGetManyTestCase(unittest.TestCase):
+
+    def test_get_many_all_or_nothing_waits(self):
+        keeper = ThreadSafeResourceKeeper(range(3))
+        held = keeper.get_many(2)
+        got = []
+        waiter = threading.Thread(target=lambda: got.append(
+            keeper.get_many(3, all_or_nothing=True, timeout=5)))
+        waiter.start()
+        time.sleep(0.05)
+        keeper.release(held[0])
+        time.sleep(0.02)
+        self.assertEqual(got, [])
+        keeper.release(held[1])
+        waiter.join()
+        self.assertEqual(len(got[0]), 3)
+
+    def test_get_many_timeout(self):
+        keeper = ThreadSafeResourceKeeper(range(1))
+        self.assertEqual(
+            keeper.get_many(2, all_or_nothing=True, timeout=0.01), [])
+        self.assertEqual(keeper.avail_num, 1)